@@ -0,0 +1,330 @@
+# Arena com várias bolas (modo festa e teste de carga do engine): todas as
+# bolas vivem em arrays NumPy (N, ...) e cada regra do engine.Match vira uma
+# operação em lote sobre elas: paredes, spin e atrito, ângulo na raquete
+# (handle_paddle_collision), obstáculos e pontos. Bola com bola usa uma grade
+# uniforme em arrays, a versão vetorizada de entities.UniformGrid: as bolas
+# são ordenadas pela célula e cada uma só é comparada com as das células
+# vizinhas. Sem pygame.
+import math
+import random
+
+import numpy as np
+
+from batch import LEFT, RIGHT, MAX_ANGLE, TOP, BOTTOM, sweep_circle_rects
+from engine import (WIDTH, HEIGHT, MAX_BOUNCES, DECAY_RATE, SPIN_DECAY, PADDLE_HIT, OBSTACLE_HIT, SCORE,
+                    IDLE, Event, Paddle, Obstacle, Rect, AIController, predict_intercept)
+
+BALLS = 100
+RADIUS = 5  # menor que a bola normal: 500 bolas de raio 10 cobririam um terço do campo
+BALL_SPEED = 300
+FIRST_OBSTACLE = 4  # contatos em move_balls: 0 teto, 1 chão, 2 + lado para raquetes, 4 + i para obstáculos
+SIDES = ("left", "right")
+# Vizinhas de uma célula na grade (metade do estêncil 3x3: cada par aparece uma vez)
+NEIGHBORS = ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+def contact_normals(px, py, left, top, width, height):
+    # Normal do contato de cada bola com o retângulo, a partir do centro dela:
+    # face quando o centro está na faixa do lado, diagonal na quina e, com o
+    # centro já dentro, o eixo de menor penetração (como engine.sweep_circle_rect)
+    right, bottom = left + width, top + height
+    dx = px - np.clip(px, left, right)
+    dy = py - np.clip(py, top, bottom)
+    dist = np.hypot(dx, dy)
+    inside = dist == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        nx, ny = dx / dist, dy / dist
+    if inside.any():
+        axis = np.stack((px - left, right - px, py - top, bottom - py), axis=1).argmin(axis=1)
+        nx = np.where(inside, np.array([-1.0, 1.0, 0.0, 0.0])[axis], nx)
+        ny = np.where(inside, np.array([0.0, 0.0, -1.0, 1.0])[axis], ny)
+    return nx, ny
+
+class ArenaAI(AIController):
+    # A IA preditiva do engine apontada para a bola mais ameaçadora (Arena.threat).
+    # Trocar de bola não adia a reação já em curso: com centenas de bolas o alvo
+    # muda antes de a reação vencer e a raquete ficaria parada.
+    def __init__(self, side, difficulty="Medium", rng=None, **kwargs):
+        super().__init__(side, difficulty, rng, **kwargs)
+        self.watch = None  # índice da bola seguida
+    def predict(self, arena):
+        i = self.watch
+        if i is None:
+            return arena.height / 2
+        r = arena.radius
+        face = arena.left_paddle.rect.right + r if self.side == "left" else arena.right_paddle.rect.left - r
+        px, py = arena.pos[i].tolist()
+        vx, vy = arena.vel[i].tolist()
+        self.predictions += 1
+        hit = predict_intercept(px, py, vx, vy, float(arena.spin[i]), r, face, arena.height)
+        if hit is None:
+            return arena.height / 2
+        return hit[0] + (self.rng.gauss(0, self.noise) if self.noise else 0.0)
+    def command(self, arena, dt):
+        self.clock += dt
+        self.watch = arena.threat(self.side)
+        key = None if self.watch is None else (self.watch, int(arena.version[self.watch]))
+        if key != self.version:
+            self.version = key
+            due = self.clock + self.reaction if self.pending is None else self.pending[1]
+            self.pending = (self.predict(arena), due)
+        return self.steer(arena, dt)
+
+class Arena:
+    PADDLE_WIDTH = 10
+    def __init__(self, balls=BALLS, difficulty="Medium", seed=None, ai_sides=(False, True), obstacles=0,
+                 radius=RADIUS, ball_speed=BALL_SPEED, width=WIDTH, height=HEIGHT):
+        self.n = balls
+        self.difficulty = difficulty
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.ball_speed = ball_speed
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.rng = np.random.default_rng(self.seed)
+        paddle_height = 100
+        self.left_paddle = Paddle(20, (height - paddle_height) // 2, self.PADDLE_WIDTH, paddle_height, 300, height)
+        self.right_paddle = Paddle(width - 20 - self.PADDLE_WIDTH, (height - paddle_height) // 2,
+                                   self.PADDLE_WIDTH, paddle_height, 300, height)
+        self.paddles = (self.left_paddle, self.right_paddle)
+        self.controllers = {}
+        for side, ai in zip(SIDES, ai_sides):
+            if ai:
+                self.controllers[side] = ArenaAI(side, difficulty, random.Random(self.seed + 1 + len(self.controllers)))
+        # Obstáculos parados na faixa central, como os do Survival, com folga de uma
+        # bola entre eles: bola presa entre dois obstáculos sobrepostos gasta todos os contatos do tick
+        self.obstacles = []
+        gap = 4 * radius
+        for _ in range(obstacles * 20):
+            if len(self.obstacles) == obstacles:
+                break
+            x = int(self.rng.integers(width // 3, 2 * width // 3 - 20))
+            y = int(self.rng.integers(height // 4, 3 * height // 4 - 100))
+            rect = Rect(x - gap, y - gap, 20 + 2 * gap, 100 + 2 * gap)
+            if not any(rect.colliderect(obs.rect) for obs in self.obstacles):
+                self.obstacles.append(Obstacle(Rect(x, y, 20, 100)))
+        self.obstacle_rects = np.array([tuple(obs.rect) for obs in self.obstacles], dtype=float).reshape(-1, 4)
+        self.pos = np.column_stack((self.rng.uniform(width / 4, 3 * width / 4, balls),
+                                    self.rng.uniform(radius, height - radius, balls)))
+        self.vel = np.zeros((balls, 2))
+        self.spin = np.zeros(balls)
+        self.version = np.zeros(balls, dtype=np.int64)  # muda a cada alteração da trajetória (ver engine.Ball)
+        self.last_hitter = np.full(balls, -1, dtype=np.int8)
+        self.score_left = 0
+        self.score_right = 0
+        self.wall_hits = 0  # contatos sem evento próprio (seriam centenas por tick)
+        self.ball_hits = 0
+        self.tick = 0
+        self.paused = False
+        self.reset_direction(np.ones(balls, dtype=bool))
+    def reset_direction(self, mask):
+        # Mesmo sorteio de engine.Ball.reset_direction
+        count = int(np.count_nonzero(mask))
+        if count == 0:
+            return
+        angle = self.rng.uniform(-math.pi/4, math.pi/4, count)
+        direction = self.rng.choice([-1.0, 1.0], count)
+        self.version[mask] += 1
+        self.vel[mask, 0] = direction * self.ball_speed * np.cos(angle)
+        self.vel[mask, 1] = self.ball_speed * np.sin(angle)
+    def respawn(self, mask):
+        # Volta ao meio numa altura sorteada (todas no mesmo ponto se empilhariam) e
+        # com a velocidade inicial: o +5% por ponto do engine dispararia com centenas de bolas
+        count = int(np.count_nonzero(mask))
+        self.pos[mask, 0] = self.width / 2
+        self.pos[mask, 1] = self.rng.uniform(self.height / 4, 3 * self.height / 4, count)
+        self.spin[mask] = 0
+        self.last_hitter[mask] = -1
+        self.reset_direction(mask)
+    def threat(self, side):
+        # Bola que chega primeiro à frente da raquete 'side', ou None se nenhuma vem para lá
+        r = self.radius
+        if side == "left":
+            gap = self.pos[:, 0] - (self.left_paddle.rect.right + r)
+            closing = -self.vel[:, 0]
+        else:
+            gap = (self.right_paddle.rect.left - r) - self.pos[:, 0]
+            closing = self.vel[:, 0]
+        coming = (closing > 0) & (gap >= 0)
+        if not coming.any():
+            return None
+        with np.errstate(divide="ignore", invalid="ignore"):
+            arrival = np.where(coming, gap / closing, np.inf)
+        return int(arrival.argmin())
+    def step(self, dt, left=IDLE, right=IDLE):
+        # Avança dt segundos; devolve os eventos de raquete, obstáculo e ponto
+        # (parede e bola com bola só contam em wall_hits e ball_hits)
+        events = []
+        if self.paused:
+            return events
+        self.tick += 1
+        for side, paddle, command in zip(SIDES, self.paddles, (left, right)):
+            controller = self.controllers.get(side)
+            paddle.apply(controller.command(self, dt) if controller else command or IDLE, dt)
+        self.vel[:, 1] += self.spin * dt
+        self.move_balls(dt, events)
+        self.collide_balls()
+        self.spin *= SPIN_DECAY ** (dt * DECAY_RATE)
+        self.score(events)
+        return events
+    def move_balls(self, dt, events):
+        # Varredura contínua de engine.Match.move_ball em lote: a cada rodada as
+        # bolas avançam até o próximo contato, e só as que bateram seguem na próxima
+        r = self.radius
+        obstacles = self.obstacle_rects
+        idx = np.arange(self.n)
+        remaining = np.full(self.n, float(dt))
+        skip = np.full(self.n, -1)
+        for _ in range(MAX_BOUNCES):
+            px, py = self.pos[idx, 0], self.pos[idx, 1]
+            vx, vy = self.vel[idx, 0], self.vel[idx, 1]
+            times = np.full((idx.size, FIRST_OBSTACLE + len(obstacles)), np.inf)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                times[:, TOP] = np.where((vy < 0) & (skip != TOP), np.maximum(0.0, (r - py) / vy), np.inf)
+                times[:, BOTTOM] = np.where((vy > 0) & (skip != BOTTOM),
+                                            np.maximum(0.0, (self.height - r - py) / vy), np.inf)
+            reach_x = np.abs(vx) * remaining + r
+            reach_y = np.abs(vy) * remaining + r
+            # Só varre as bolas cuja caixa de movimento alcança o retângulo
+            for side, approaching in ((LEFT, vx < 0), (RIGHT, vx > 0)):
+                rect = self.paddles[side].rect
+                near = approaching & (skip != 2 + side) & (px + reach_x >= rect.x) & (px - reach_x <= rect.right)
+                near &= (py + reach_y >= rect.y) & (py - reach_y <= rect.bottom)
+                hit = np.flatnonzero(near)
+                if hit.size:
+                    times[hit, 2 + side] = sweep_circle_rects(px[hit], py[hit], vx[hit], vy[hit], r, rect.x, rect.y,
+                                                              rect.width, rect.height, remaining[hit])
+            for k, (left, top, width, height) in enumerate(obstacles.tolist()):
+                near = (skip != FIRST_OBSTACLE + k) & (px + reach_x >= left) & (px - reach_x <= left + width)
+                near &= (py + reach_y >= top) & (py - reach_y <= top + height)
+                hit = np.flatnonzero(near)
+                if not hit.size:
+                    continue
+                t = sweep_circle_rects(px[hit], py[hit], vx[hit], vy[hit], r, left, top, width, height,
+                                       remaining[hit])
+                # Obstáculo só reflete quem está entrando (como no engine)
+                finite = np.isfinite(t)
+                tf = np.where(finite, t, 0.0)
+                nx, ny = contact_normals(px[hit] + vx[hit] * tf, py[hit] + vy[hit] * tf, left, top, width, height)
+                entering = finite & (vx[hit] * nx + vy[hit] * ny < 0)
+                times[hit, FIRST_OBSTACLE + k] = np.where(entering, t, np.inf)
+            which = times.argmin(axis=1)
+            t = times[np.arange(idx.size), which]
+            hit = t <= remaining
+            self.pos[idx] += self.vel[idx] * np.where(hit, t, remaining)[:, None]
+            if not hit.any():
+                return
+            idx, t, which = idx[hit], t[hit], which[hit]
+            remaining = remaining[hit] - t
+            skip = which
+            self.version[idx] += 1
+            wall = idx[which <= BOTTOM]
+            self.vel[wall, 1] = -self.vel[wall, 1]
+            self.wall_hits += wall.size
+            for side in (LEFT, RIGHT):
+                paddle = idx[which == 2 + side]
+                if paddle.size:
+                    self.paddle_hit(side, paddle, events)
+            for k in np.unique(which[which >= FIRST_OBSTACLE]).tolist():
+                self.obstacle_hit(k - FIRST_OBSTACLE, idx[which == k], t[which == k] == 0, events)
+        # Contatos esgotados: o resto do tick anda sem colisão (como no engine)
+        self.pos[idx] += self.vel[idx] * remaining[:, None]
+        self.pos[idx, 1] = np.clip(self.pos[idx, 1], r, self.height - r)
+    def paddle_hit(self, side, hit, events):
+        # Mesmo ângulo de engine.Match.handle_paddle_collision
+        rect = self.paddles[side].rect
+        normalized = (self.pos[hit, 1] - rect.centery) / (rect.height / 2)
+        angle = normalized * MAX_ANGLE
+        speed = np.hypot(self.vel[hit, 0], self.vel[hit, 1])
+        vx = np.abs(speed * np.cos(angle))
+        self.vel[hit, 0] = vx if side == LEFT else -vx
+        self.vel[hit, 1] = speed * np.sin(angle)
+        self.spin[hit] = normalized * 50 if side == LEFT else -normalized * 50
+        self.last_hitter[hit] = side
+        events.extend(Event(PADDLE_HIT, x, y, SIDES[side]) for x, y in self.pos[hit].tolist())
+    def obstacle_hit(self, k, hit, inside, events):
+        left, top, width, height = self.obstacle_rects[k].tolist()
+        r = self.radius
+        px, py = self.pos[hit, 0], self.pos[hit, 1]
+        nx, ny = contact_normals(px, py, left, top, width, height)
+        # Começou o intervalo dentro do obstáculo: empurra para fora pela normal (engine.push_out)
+        px = np.where(inside & (nx > 0), np.maximum(px, left + width + r), px)
+        px = np.where(inside & (nx < 0), np.minimum(px, left - r), px)
+        py = np.where(inside & (ny > 0), np.maximum(py, top + height + r), py)
+        py = np.where(inside & (ny < 0), np.minimum(py, top - r), py)
+        self.pos[hit, 0], self.pos[hit, 1] = px, py
+        dot = self.vel[hit, 0] * nx + self.vel[hit, 1] * ny
+        self.vel[hit, 0] -= 2 * dot * nx
+        self.vel[hit, 1] -= 2 * dot * ny
+        events.extend(Event(OBSTACLE_HIT, x, y) for x, y in self.pos[hit].tolist())
+    def pairs(self):
+        # Pares (i, j) de bolas em células vizinhas da grade de lado 2r: a chave
+        # da célula de cada bola é ordenada e as vizinhas saem por searchsorted
+        cell = 2 * self.radius
+        cols = int(self.width // cell) + 3
+        # +1 nas células: bolas um pouco fora do campo (prestes a pontuar) não viram índice negativo
+        cx = np.floor(self.pos[:, 0] / cell).astype(np.int64) + 1
+        cy = np.floor(self.pos[:, 1] / cell).astype(np.int64) + 1
+        keys = cy * cols + cx
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        first, second = [], []
+        for dx, dy in NEIGHBORS:
+            target = keys + dy * cols + dx
+            start = np.searchsorted(sorted_keys, target, "left")
+            counts = np.searchsorted(sorted_keys, target, "right") - start
+            total = int(counts.sum())
+            if not total:
+                continue
+            i = np.repeat(np.arange(self.n), counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(start, counts) + offsets]
+            if (dx, dy) == (0, 0):
+                keep = i < j  # na mesma célula cada par aparece duas vezes (e a bola com ela mesma)
+                i, j = i[keep], j[keep]
+            first.append(i)
+            second.append(j)
+        if not first:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(first), np.concatenate(second)
+    def collide_balls(self):
+        # Choque elástico entre bolas de mesma massa: troca as componentes normais
+        # das velocidades e separa a sobreposição meio a meio
+        i, j = self.pairs()
+        if not i.size:
+            return
+        d = self.pos[j] - self.pos[i]
+        dist = np.hypot(d[:, 0], d[:, 1])
+        touching = dist < 2 * self.radius
+        if not touching.any():
+            return
+        i, j, d, dist = i[touching], j[touching], d[touching], dist[touching]
+        # Bolas no mesmo ponto: separa na horizontal
+        normal = np.where(dist[:, None] > 0, d / np.maximum(dist, 1e-12)[:, None], (1.0, 0.0))
+        push = ((2 * self.radius - dist) / 2)[:, None] * normal
+        np.subtract.at(self.pos, i, push)
+        np.add.at(self.pos, j, push)
+        closing = np.einsum("ij,ij->i", self.vel[j] - self.vel[i], normal)
+        approaching = closing < 0
+        if approaching.any():
+            i, j = i[approaching], j[approaching]
+            impulse = closing[approaching, None] * normal[approaching]
+            np.add.at(self.vel, i, impulse)
+            np.subtract.at(self.vel, j, impulse)
+            np.add.at(self.version, i, 1)
+            np.add.at(self.version, j, 1)
+            self.ball_hits += i.size
+    def score(self, events):
+        r = self.radius
+        for side, out in ((RIGHT, self.pos[:, 0] - r < 0), (LEFT, self.pos[:, 0] + r > self.width)):
+            count = int(np.count_nonzero(out))
+            if not count:
+                continue
+            if side == LEFT:
+                self.score_left += count
+            else:
+                self.score_right += count
+            events.extend(Event(SCORE, x, y, SIDES[side]) for x, y in self.pos[out].tolist())
+            self.respawn(out)
+    def run(self, ticks, dt):
+        for _ in range(ticks):
+            self.step(dt)
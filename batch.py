@@ -0,0 +1,363 @@
+# Simulador em lote: N partidas independentes avançam juntas, com todo o
+# estado em arrays NumPy (N, ...). Segue as mesmas regras de engine.Match
+# (paredes, ângulo na raquete, spin, atrito, pontos, IA adaptativa ou
+# preditiva e power-ups) para balancear dificuldade sem abrir janela.
+import copy
+import math
+
+import numpy as np
+
+from engine import (WIDTH, HEIGHT, TICK_DT, MAX_BOUNCES, POWERUP_TYPES, MAX_POWERUPS, POWERUP_LIFETIME, DECAY_RATE,
+                    SPIN_DECAY, FRICTION, AI_PRESETS)
+
+LEFT, RIGHT = 0, 1
+NO_HITTER = -1
+ENLARGE, SHRINK, SPEED, SLOW = range(4)  # índices em POWERUP_TYPES
+MAX_ANGLE = math.radians(75)
+TOP, BOTTOM = 0, 1  # contatos em move_balls: 0 teto, 1 chão, 2 + lado para raquetes
+
+def sweep_circle_rects(px, py, vx, vy, radius, left, top, width, height, t_max):
+    # Versão vetorizada de engine.sweep_circle_rect; devolve só o instante de
+    # impacto (inf quando não há contato em [0, t_max])
+    right, bottom = left + width, top + height
+    x0, x1 = left - radius, right + radius
+    y0, y1 = top - radius, bottom + radius
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slabs = []
+        for p, v, lo, hi in ((px, vx, x0, x1), (py, vy, y0, y1)):
+            t1, t2 = (lo - p) / v, (hi - p) / v
+            inside = (p >= lo) & (p <= hi)
+            near = np.where(v == 0, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+            far = np.where(v == 0, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+            slabs.append((near, far))
+        t_enter = np.maximum(slabs[0][0], slabs[1][0])
+        t_exit = np.minimum(slabs[0][1], slabs[1][1])
+        hit = (t_enter <= t_exit) & (t_exit >= 0) & (t_enter <= t_max)
+        t_enter = np.maximum(t_enter, 0.0)
+        hx, hy = px + vx * t_enter, py + vy * t_enter
+        cx = np.where(hx < left, left, np.where(hx > right, right, np.nan))
+        cy = np.where(hy < top, top, np.where(hy > bottom, bottom, np.nan))
+        corner = ~np.isnan(cx) & ~np.isnan(cy)
+        # Entrada pela região da quina: contato com o círculo da quina
+        dx, dy = px - cx, py - cy
+        a = vx * vx + vy * vy
+        b = dx * vx + dy * vy
+        c = dx * dx + dy * dy - radius * radius
+        disc = b * b - a * c
+        t_corner = (-b - np.sqrt(disc)) / a
+        t_corner = np.where(c <= 0, 0.0,
+                            np.where((a > 0) & (disc >= 0) & (t_corner >= 0) & (t_corner <= t_max), t_corner, np.inf))
+    return np.where(hit, np.where(corner, t_corner, t_enter), np.inf)
+
+def predict_intercepts(px, py, vx, vy, spin, radius, target_x, height):
+    # Versão vetorizada de engine.predict_intercept: y previsto em target_x e
+    # máscara das bolas que de fato chegam lá
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (target_x - px) / vx
+    valid = (vx != 0) & (t >= 0)
+    t = np.where(valid, t, 0.0)
+    k = -math.log(SPIN_DECAY) * DECAY_RATE
+    drift = spin / k * (t - (1 - np.exp(-k * t)) / k)
+    lo, span = radius, height - 2 * radius
+    m = (py + vy * t + drift - lo) % (2 * span)
+    return lo + np.where(m > span, 2 * span - m, m), valid
+
+class BatchSimulator:
+    PADDLE_WIDTH = 10
+    POWERUP_SIZE = 20
+    POWERUP_SLOTS = MAX_POWERUPS  # power-ups simultâneos por partida (o mais antigo é reciclado)
+    def __init__(self, n, seed=None, base_error=10, ai_speed=300, ai_speed_gain=50,
+                 ai_sides=(False, True), powerups=True, radius=10, ball_speed=300,
+                 paddle_height=100, paddle_speed=300, width=WIDTH, height=HEIGHT,
+                 ai="adaptive", difficulty="Medium", reaction=None, noise=None, max_speed=None):
+        self.n = n
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.rng = np.random.default_rng(seed)
+        # Parâmetros da IA por partida e por lado: arrays (N, 2)
+        self.base_error = self._per_side(base_error)
+        self.ai_speed = self._per_side(ai_speed)
+        self.ai_speed_gain = self._per_side(ai_speed_gain)
+        self.ai_sides = tuple(ai_sides)
+        # IA preditiva (engine.AIController): presets da dificuldade, sobrescritos por partida/lado
+        self.ai = ai
+        preset = AI_PRESETS.get(difficulty, AI_PRESETS["Medium"])
+        self.reaction = self._per_side(preset["reaction"] if reaction is None else reaction)
+        self.noise = self._per_side(preset["noise"] if noise is None else noise)
+        self.max_speed = self._per_side(preset["max_speed"] if max_speed is None else max_speed)
+        self.ai_clock = 0.0
+        self.ai_version = np.full((n, 2), -1, dtype=np.int64)
+        self.ai_pending = np.zeros((n, 2))
+        self.ai_pending_at = np.full((n, 2), np.inf)
+        self.ai_target = np.full((n, 2), height / 2)
+        self.predictions = 0
+        self.powerups = powerups
+        self.paddle_speed = paddle_speed
+        self.paddle_x = np.array([20, width - 20 - self.PADDLE_WIDTH], dtype=float)
+        self.paddle_y = np.full((n, 2), (height - paddle_height) // 2, dtype=float)
+        self.paddle_h = np.full((n, 2), paddle_height, dtype=float)
+        self.pos = np.tile([width / 2, height / 2], (n, 1)).astype(float)
+        self.vel = np.zeros((n, 2))
+        self.spin = np.zeros(n)
+        self.speed = np.full(n, float(ball_speed))
+        self.version = np.zeros(n, dtype=np.int64)  # muda a cada alteração da trajetória (ver engine.Ball)
+        self.score = np.zeros((n, 2), dtype=np.int64)
+        self.hits = np.zeros((n, 2), dtype=np.int64)  # rebatidas por lado
+        self.last_hitter = np.full(n, NO_HITTER, dtype=np.int8)
+        k = self.POWERUP_SLOTS
+        self.pu_active = np.zeros((n, k), dtype=bool)
+        self.pu_type = np.zeros((n, k), dtype=np.int8)
+        self.pu_pos = np.zeros((n, k, 2))
+        self.pu_born = np.zeros(k, dtype=np.int64)  # tick do spawn de cada slot (igual em todas as partidas)
+        self.pu_spawned = 0
+        self.powerup_timer = 0.0
+        self.ticks = 0
+        self.reset_direction(np.ones(n, dtype=bool))
+    def _per_side(self, value):
+        # Escalar ou (N,) vale para os dois lados; (N, 2) define cada lado
+        arr = np.asarray(value, dtype=float)
+        if arr.ndim < 2:
+            arr = np.broadcast_to(arr, (self.n,))[:, None]
+        return np.broadcast_to(arr, (self.n, 2)).copy()
+    @classmethod
+    def from_matches(cls, matches, **kwargs):
+        # Copia o estado de partidas escalares (engine.Match) para comparar os dois motores
+        first = matches[0]
+        ai = first.controllers.get("right")
+        if ai is not None:
+            # IA preditiva: mesmos parâmetros do controlador de cada partida
+            kwargs.setdefault("ai", "predictive")
+            for name in ("reaction", "noise", "max_speed"):
+                kwargs.setdefault(name, [getattr(m.controllers["right"], name) for m in matches])
+        sim = cls(len(matches), width=first.width, height=first.height, radius=first.ball.radius, **kwargs)
+        for i, m in enumerate(matches):
+            sim.pos[i] = m.ball.pos
+            sim.vel[i] = m.ball.vel
+            sim.spin[i] = m.ball.spin
+            sim.speed[i] = m.ball.speed
+            sim.paddle_y[i] = m.left_paddle.rect.y, m.right_paddle.rect.y
+            sim.paddle_h[i] = m.left_paddle.rect.height, m.right_paddle.rect.height
+            sim.score[i] = m.score_left, m.score_right
+            sim.last_hitter[i] = {"left": LEFT, "right": RIGHT}.get(m.last_hitter, NO_HITTER)
+        sim.powerup_timer = first.powerup_timer
+        return sim
+    def reset_direction(self, mask):
+        count = int(np.count_nonzero(mask))
+        if count == 0:
+            return
+        angle = self.rng.uniform(-math.pi/4, math.pi/4, count)
+        direction = self.rng.choice([-1.0, 1.0], count)
+        speed = self.speed[mask]
+        self.version[mask] += 1
+        self.vel[mask, 0] = direction * speed * np.cos(angle)
+        self.vel[mask, 1] = speed * np.sin(angle)
+    def reset_ball(self, mask):
+        self.pos[mask] = self.width / 2, self.height / 2
+        self.speed[mask] *= 1.05
+        self.reset_direction(mask)
+    def move_paddles(self, side, dy, mask):
+        # Mesmo clamp de engine.Paddle.move (topo primeiro, depois o fundo), só onde houve movimento
+        y = np.maximum(self.paddle_y[:, side] + dy, 0)
+        h = self.paddle_h[:, side]
+        y = np.where(y + h > self.height, self.height - h, y)
+        self.paddle_y[:, side] = np.where(mask, y, self.paddle_y[:, side])
+    def run_ai(self, side, dt):
+        # IA adaptativa vetorizada (mesma regra de Match.run_ai)
+        score_diff = self.score[:, LEFT] - self.score[:, RIGHT]
+        if side == LEFT:
+            score_diff = -score_diff
+        error_margin = np.maximum(0, self.base_error[:, side] - score_diff)
+        ai_speed = self.ai_speed[:, side] + self.ai_speed_gain[:, side] * np.abs(score_diff)
+        centery = self.paddle_y[:, side] + self.paddle_h[:, side] / 2
+        ball_y = self.pos[:, 1]
+        direction = np.where(ball_y < centery - error_margin, -1.0,
+                             np.where(ball_y > centery + error_margin, 1.0, 0.0))
+        moving = direction != 0
+        if moving.any():
+            self.move_paddles(side, direction * ai_speed * dt, moving)
+    def run_predictive_ai(self, side, dt):
+        # engine.AIController vetorizado: só as partidas cuja trajetória mudou refazem a previsão
+        changed = np.flatnonzero(self.version != self.ai_version[:, side])
+        if changed.size:
+            self.ai_version[changed, side] = self.version[changed]
+            r = self.radius
+            face = self.paddle_x[LEFT] + self.PADDLE_WIDTH + r if side == LEFT else self.paddle_x[RIGHT] - r
+            y, valid = predict_intercepts(self.pos[changed, 0], self.pos[changed, 1], self.vel[changed, 0],
+                                          self.vel[changed, 1], self.spin[changed], r, face, self.height)
+            noise = self.rng.normal(0.0, 1.0, changed.size) * self.noise[changed, side]
+            self.ai_pending[changed, side] = np.where(valid, y + noise, self.height / 2)
+            self.ai_pending_at[changed, side] = self.ai_clock + self.reaction[changed, side]
+            self.predictions += changed.size
+        ready = self.ai_clock >= self.ai_pending_at[:, side]
+        self.ai_target[ready, side] = self.ai_pending[ready, side]
+        self.ai_pending_at[ready, side] = np.inf
+        centery = self.paddle_y[:, side] + self.paddle_h[:, side] / 2
+        step = self.max_speed[:, side] * dt
+        dy = np.clip(self.ai_target[:, side] - centery, -step, step)
+        self.move_paddles(side, dy, dy != 0)
+    def ball_overlaps(self, x, y, w, h):
+        # colliderect entre o retângulo da bola e retângulos (x, y, w, h) broadcast
+        r = self.radius
+        bx = self.pos[:, 0] - r
+        by = self.pos[:, 1] - r
+        if np.ndim(x) == 2:
+            bx, by = bx[:, None], by[:, None]
+        return (bx < x + w) & (x < bx + 2 * r) & (by < y + h) & (y < by + 2 * r)
+    def paddle_hit(self, side, hit):
+        centery = self.paddle_y[hit, side] + self.paddle_h[hit, side] / 2
+        normalized = (self.pos[hit, 1] - centery) / (self.paddle_h[hit, side] / 2)
+        angle = normalized * MAX_ANGLE
+        speed = np.hypot(self.vel[hit, 0], self.vel[hit, 1])
+        vx = np.abs(speed * np.cos(angle))
+        self.vel[hit, 0] = vx if side == LEFT else -vx
+        self.vel[hit, 1] = speed * np.sin(angle)
+        self.spin[hit] = normalized * 50 if side == LEFT else -normalized * 50
+        self.last_hitter[hit] = side
+        self.hits[hit, side] += 1
+    def move_balls(self, dt):
+        # Mesma varredura de engine.Match.move_ball, com teto, chão e raquetes:
+        # a cada rodada todas as bolas avançam até seu próximo contato
+        r = self.radius
+        n = self.n
+        rows = np.arange(n)
+        remaining = np.full(n, float(dt))
+        skip = np.full(n, -1)
+        for _ in range(MAX_BOUNCES):
+            px, py = self.pos[:, 0], self.pos[:, 1]
+            vx, vy = self.vel[:, 0], self.vel[:, 1]
+            times = np.full((n, 4), np.inf)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                times[:, TOP] = np.where((vy < 0) & (skip != TOP), np.maximum(0.0, (r - py) / vy), np.inf)
+                times[:, BOTTOM] = np.where((vy > 0) & (skip != BOTTOM),
+                                            np.maximum(0.0, (self.height - r - py) / vy), np.inf)
+            reach = np.abs(vx) * remaining + r
+            for side, approaching in ((LEFT, vx < 0), (RIGHT, vx > 0)):
+                # Só varre as bolas que conseguem alcançar a raquete neste intervalo
+                x0 = self.paddle_x[side]
+                near = (px + reach >= x0) & (px - reach <= x0 + self.PADDLE_WIDTH)
+                idx = np.flatnonzero(approaching & near & (skip != 2 + side))
+                if idx.size:
+                    times[idx, 2 + side] = sweep_circle_rects(
+                        px[idx], py[idx], vx[idx], vy[idx], r, x0, self.paddle_y[idx, side],
+                        self.PADDLE_WIDTH, self.paddle_h[idx, side], remaining[idx])
+            which = times.argmin(axis=1)
+            t = times[rows, which]
+            hit = t <= remaining
+            self.pos += self.vel * np.where(hit, t, remaining)[:, None]
+            if not hit.any():
+                return
+            remaining = np.where(hit, remaining - t, 0.0)
+            self.version[hit] += 1
+            skip = np.where(hit, which, skip)
+            wall = hit & (which <= BOTTOM)
+            self.vel[wall, 1] = -self.vel[wall, 1]
+            for side in (LEFT, RIGHT):
+                paddle = hit & (which == 2 + side)
+                if paddle.any():
+                    self.paddle_hit(side, paddle)
+        # Contatos esgotados: o resto do tick anda sem colisão (como no engine)
+        self.pos += self.vel * remaining[:, None]
+        np.clip(self.pos[:, 1], r, self.height - r, out=self.pos[:, 1])
+    def spawn_powerups(self):
+        # Todas as partidas avançam juntas, então o spawn acontece no mesmo tick
+        slot = self.pu_spawned % self.POWERUP_SLOTS
+        self.pu_spawned += 1
+        n = self.n
+        self.pu_type[:, slot] = self.rng.integers(0, len(POWERUP_TYPES), n)
+        self.pu_pos[:, slot, 0] = self.rng.integers(self.width // 4, 3 * self.width // 4 + 1, n)
+        self.pu_pos[:, slot, 1] = self.rng.integers(self.height // 4, 3 * self.height // 4 + 1, n)
+        self.pu_active[:, slot] = True
+        self.pu_born[slot] = self.ticks
+    def apply_powerups(self):
+        size = self.POWERUP_SIZE
+        touched = self.pu_active & self.ball_overlaps(self.pu_pos[:, :, 0], self.pu_pos[:, :, 1], size, size)
+        if not touched.any():
+            return
+        for slot in np.flatnonzero(touched.any(axis=0)):
+            hit = touched[:, slot]
+            kind = self.pu_type[:, slot]
+            hitter = self.last_hitter
+            for side in (LEFT, RIGHT):
+                grow = hit & (kind == ENLARGE) & (hitter == side)
+                self.paddle_h[grow, side] = np.minimum(self.height, self.paddle_h[grow, side] + 20)
+                shrink = hit & (kind == SHRINK) & (hitter == 1 - side)
+                self.paddle_h[shrink, side] = np.maximum(20, self.paddle_h[shrink, side] - 20)
+            faster = hit & (kind == SPEED)
+            slower = hit & (kind == SLOW)
+            self.speed[faster] *= 1.2
+            self.speed[slower] *= 0.8
+            self.reset_direction(faster | slower)
+            self.pu_active[hit, slot] = False
+    def step(self, dt, left=None, right=None):
+        # left/right: arrays (N,) com direção em {-1, 0, 1} para lados sem IA
+        self.ticks += 1
+        self.ai_clock += dt
+        if self.powerups:
+            # Mesma validade do engine: o slot vencido some em todas as partidas
+            self.pu_active[:, self.ticks - self.pu_born >= POWERUP_LIFETIME] = False
+            self.powerup_timer += dt
+            if self.powerup_timer > 10:
+                self.spawn_powerups()
+                self.powerup_timer = 0
+        for side, command in ((LEFT, left), (RIGHT, right)):
+            if self.ai_sides[side]:
+                if self.ai == "predictive":
+                    self.run_predictive_ai(side, dt)
+                else:
+                    self.run_ai(side, dt)
+            elif command is not None:
+                command = np.asarray(command, dtype=float)
+                moving = command != 0
+                if moving.any():
+                    self.move_paddles(side, command * self.paddle_speed * dt, moving)
+        # Bola: spin, movimento com colisão contínua, decaimento e atrito
+        self.vel[:, 1] += self.spin * dt
+        self.move_balls(dt)
+        self.spin *= SPIN_DECAY ** (dt * DECAY_RATE)
+        self.speed *= FRICTION ** (dt * DECAY_RATE)
+        # Power-ups são coletados por sobreposição no fim do tick (o engine varre o caminho)
+        if self.powerups:
+            self.apply_powerups()
+        scored_right = self.pos[:, 0] - self.radius < 0
+        self.score[scored_right, RIGHT] += 1
+        self.reset_ball(scored_right)
+        scored_left = self.pos[:, 0] + self.radius > self.width
+        self.score[scored_left, LEFT] += 1
+        self.reset_ball(scored_left)
+    def run(self, ticks, dt=TICK_DT):
+        for _ in range(ticks):
+            self.step(dt)
+        return self.score
+
+def max_divergence(matches, ticks, dt=TICK_DT):
+    # Avança cópias de partidas escalares (modo "single", raquete esquerda parada) e o lote
+    # equivalente lado a lado. Cada partida é comparada até o primeiro evento
+    # aleatório (ponto ou power-up), quando os geradores deixam de coincidir.
+    # O ruído da IA preditiva também sai do gerador de cada motor, então fica
+    # zerado nos dois: sem ele a previsão é determinística e precisa coincidir.
+    # As partidas do chamador não mudam: a comparação roda em cópias.
+    matches = [copy.deepcopy(m) for m in matches]
+    for m in matches:
+        for controller in m.controllers.values():
+            controller.noise = 0.0
+    sim = BatchSimulator.from_matches(matches, powerups=False, noise=0.0)
+    live = np.ones(len(matches), dtype=bool)
+    worst = 0.0
+    for _ in range(ticks):
+        scores = [(m.score_left, m.score_right) for m in matches]
+        spawned = [m.powerups.added for m in matches]
+        for m in matches:
+            m.step(dt)
+        sim.step(dt)
+        for i, m in enumerate(matches):
+            if (m.score_left, m.score_right) != scores[i] or m.powerups.added != spawned[i]:
+                live[i] = False
+            if not live[i]:
+                continue
+            worst = max(worst,
+                        float(np.abs(sim.pos[i] - m.ball.pos).max()),
+                        float(np.abs(sim.vel[i] - m.ball.vel).max()),
+                        abs(sim.paddle_y[i, RIGHT] - m.right_paddle.rect.y),
+                        abs(sim.paddle_h[i, LEFT] - m.left_paddle.rect.height))
+    return worst
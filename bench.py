@@ -0,0 +1,296 @@
+# Benchmark sem janela (drivers "dummy" do SDL) com cenários roteirizados e
+# seed fixa. Cada cenário roda num processo próprio, para o pico de RSS e os
+# caches globais (partículas, sprites, texto) não vazarem de um para outro.
+# Mede duas passadas: uma limpa (FPS e tempo de frame) e outra com o profiler
+# ligado (tempo e blocos alocados por fase, ver profiler.py). A passada limpa
+# também anota o crescimento de blocos retidos por frame.
+#   python bench.py --out bench.json
+#   python bench.py --scenario particles --scenario menu --scale 0.2
+#   python bench.py --baseline bench.json --threshold 10   (sai com 1 se regrediu)
+#   python bench.py --compare antigo.json novo.json
+# FPS é o que o frame permite (frames / tempo ocupado): o cenário online anda
+# no ritmo real da rede e o tempo dormindo não conta.
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+SCENARIOS = ["particles", "ball_glow", "survival", "replay", "menu", "online", "arena"]
+THRESHOLD = 10.0  # % de piora que conta como regressão
+# métrica -> 1 se maior é melhor, -1 se menor é melhor
+CHECKS = {"fps": 1, "frame_p95_ms": -1, "peak_rss_kb": -1}
+
+class Scenario:
+    # frames a 60 FPS com dt fixo; 'scale' encurta ou alonga a sessão
+    frames = 600
+    def __init__(self, screen, seed, scale):
+        self.screen = screen
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.frames = max(1, int(self.frames * scale))
+    def setup(self):
+        pass
+    def frame(self, i):
+        pong.pygame.display.flip()  # cenário vazio: só apresenta a tela, mede o piso do frame
+    def teardown(self):
+        pass
+
+class ParticleStorm(Scenario):
+    # 40 explosões de 50 partículas por frame: o pool enche e passa a reciclar as mais antigas
+    frames = 900
+    def frame(self, i):
+        pool = pong.particle_pool
+        for _ in range(40):
+            pool.spawn((self.rng.uniform(0, pong.WIDTH), self.rng.uniform(0, pong.HEIGHT)), 50)
+        pool.update(1 / 60)
+        self.screen.fill((0, 0, 0))
+        pool.draw(self.screen)
+        pong.pygame.display.flip()
+
+class BallGlow(Scenario):
+    # 200 bolas (sprite com sombra) por frame, um terço da sessão em cada tema
+    frames = 900
+    def frame(self, i):
+        names = list(pong.themes)
+        theme = pong.themes[names[i * len(names) // self.frames]]
+        ball = engine.Ball(0, 0, 10, 0)
+        self.screen.fill(theme["background"])
+        for _ in range(200):
+            pong.draw_ball(self.screen, ball, theme, (self.rng.uniform(0, pong.WIDTH), self.rng.uniform(0, pong.HEIGHT)))
+        pong.pygame.display.flip()
+
+class Survival(Scenario):
+    # Sessão longa de Survival com dezenas de obstáculos e power-ups no campo
+    # (tetos do engine levantados só aqui, para carregar a grade e o desenho)
+    frames = 3600
+    ENTITIES = 36
+    def setup(self):
+        self.game = pong.Game("single", "Hard", "Survival", "Neon", self.seed)
+        sim = self.game.sim
+        sim.obstacles.cap = sim.powerups.cap = self.ENTITIES
+        sim.powerups.lifetime = None
+        for _ in range(self.ENTITIES):
+            sim.spawn_obstacle()
+            sim.spawn_powerup()
+    def frame(self, i):
+        self.game.update(1 / 60)
+        self.game.draw(self.screen)
+        pong.pygame.display.flip()
+
+class ReplaySession(Scenario):
+    # 30 minutos de partida gravados tick a tick e depois tocados, com buscas
+    # para atravessar o arquivo inteiro
+    frames = 30 * 60 * 60
+    PLAYBACK = 1200
+    def setup(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "bench.rpl")
+        pong.replay_recorder.path = self.path
+        self.game = pong.Game("single", "Medium", "Classic", "Classic", self.seed)
+        self.recording = self.frames
+        self.frames += self.PLAYBACK
+        self.viewer = None
+    def frame(self, i):
+        if i < self.recording:
+            self.game.update(1 / 60)
+            return
+        if self.viewer is None:
+            pong.replay_recorder.stop()
+            self.viewer = pong.ReplayViewer(self.path, pong.themes["Classic"])
+        if i % 60 == 0:
+            self.viewer.player.seek_seconds(self.recording / 60 / (self.PLAYBACK / 60))
+        self.viewer.update(1 / 60)
+        self.viewer.draw(self.screen)
+        pong.pygame.display.flip()
+    def teardown(self):
+        if self.viewer:
+            self.viewer.close()
+        os.remove(self.path)
+
+class MenuIdle(Scenario):
+    # Menu parado passando pelo SceneManager, como no jogo: uma troca de opção
+    # por segundo; nos outros frames não há o que desenhar nem apresentar
+    def setup(self):
+        self.menu = pong.Menu()
+        self.scenes = pong.SceneManager(self.screen)
+        self.scenes.switch(self.menu)
+    def frame(self, i):
+        if i % 60 == 59:
+            self.menu.selected = (self.menu.selected + 1) % len(self.menu.options)
+        self.scenes.update(1 / 60)
+        if self.scenes.draw():
+            pong.pygame.display.flip()
+
+class OnlineLoopback(Scenario):
+    # Host e cliente roteirizados (netbot.py) ligados direto em loopback, UDP, no ritmo real
+    frames = 600
+    port = 23700
+    def setup(self):
+        import netbot
+        self.probe = netbot.Probe()
+        port = self.port + self.rng.randrange(1000)
+        self.host = netbot.HostBot(port, "udp", self.probe, self.seed)
+        time.sleep(0.05)
+        self.client = netbot.ClientBot(port, "udp", self.probe, self.seed + 1)
+        while self.client.transport is None:
+            time.sleep(0.01)
+        self.next_frame = time.perf_counter()
+    def frame(self, i):
+        self.host.update(1 / 60)
+        self.client.update(1 / 60)
+        self.client.draw(self.screen)
+        pong.pygame.display.flip()
+    def pace(self):
+        self.next_frame += 1 / 60
+        time.sleep(max(0.0, self.next_frame - time.perf_counter()))
+    def teardown(self):
+        self.host.stop_network()
+        self.client.stop_network()
+
+class MultiBall(Scenario):
+    # Arena com 500 bolas e IA dos dois lados: física em lote, grade de bola com bola e desenho com blits
+    frames = 900
+    BALLS = 500
+    def setup(self):
+        self.game = pong.ArenaGame(self.BALLS, "Hard", "Neon", self.seed, ai_sides=(True, True))
+    def frame(self, i):
+        self.game.update(1 / 60)
+        self.game.draw(self.screen)
+        pong.pygame.display.flip()
+
+CLASSES = {"particles": ParticleStorm, "ball_glow": BallGlow, "survival": Survival, "replay": ReplaySession,
+           "menu": MenuIdle, "online": OnlineLoopback, "arena": MultiBall}
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+def run_pass(name, screen, seed, scale, profiled):
+    scenario = CLASSES[name](screen, seed, scale)
+    scenario.setup()
+    pace = getattr(scenario, "pace", None)
+    if profiled:
+        profiler.history = scenario.frames
+        profiler.enable()
+    times = []
+    # Variação líquida dos blocos vivos na passada: mede o que fica retido
+    # (vazamento, cache crescendo), não quantas alocações cada frame faz
+    blocks = sys.getallocatedblocks()
+    for i in range(scenario.frames):
+        profiler.begin_frame()
+        start = time.perf_counter()
+        scenario.frame(i)
+        times.append(time.perf_counter() - start)
+        profiler.end_frame()
+        if pace:
+            pace()
+    blocks = sys.getallocatedblocks() - blocks
+    scenario.teardown()
+    if profiled:
+        summary = profiler.summary()
+        profiler.disable()
+        return {phase: {key: round(value, 4) for key, value in stats.items()}
+                for phase, stats in summary.items() if phase not in ("frame", "busy") and stats}
+    times.sort()
+    busy = sum(times)
+    return {"frames": len(times), "seconds": round(busy, 3), "fps": round(len(times) / busy, 1),
+            "frame_p50_ms": round(percentile(times, 0.50) * 1000, 3),
+            "frame_p95_ms": round(percentile(times, 0.95) * 1000, 3),
+            "frame_p99_ms": round(percentile(times, 0.99) * 1000, 3),
+            "frame_max_ms": round(times[-1] * 1000, 3),
+            "retained_blocks_per_frame": round(blocks / len(times), 2)}
+
+def run_child(name, seed, scale):
+    # Dentro do subprocesso: passada limpa, passada com profiler e pico de RSS
+    global engine, pong, profiler
+    import engine
+    import pong
+    from profiler import profiler
+    screen = pong.init_display()
+    pong.replay_recorder.path = os.path.join(tempfile.gettempdir(), "bench-game.rpl")
+    pong.register_profiler_hooks()
+    result = run_pass(name, screen, seed, scale, False)
+    result["phases"] = run_pass(name, screen, seed, scale, True)
+    result["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB no Linux
+    pong.replay_recorder.stop()
+    return result
+
+def run(names, seed, scale):
+    results = {}
+    for name in names:
+        output = subprocess.run([sys.executable, __file__, "--child", name, "--seed", str(seed), "--scale", str(scale)],
+                                stdout=subprocess.PIPE, check=True, text=True).stdout
+        # O pygame, o jogo e as threads de rede também imprimem: o resultado é a linha em JSON
+        results[name] = json.loads([line for line in output.splitlines() if line.startswith("{")][-1])
+        r = results[name]
+        print("%-10s %8.1f FPS  frame p50/p95/p99 %.2f/%.2f/%.2f ms  RSS %d KB  %+.2f blocos retidos/frame" % (
+            name, r["fps"], r["frame_p50_ms"], r["frame_p95_ms"], r["frame_p99_ms"], r["peak_rss_kb"],
+            r["retained_blocks_per_frame"]))
+    return {"seed": seed, "scale": scale, "python": sys.version.split()[0], "scenarios": results}
+
+def compare(baseline, current, threshold=THRESHOLD):
+    # Diferença por cenário e métrica; devolve as regressões acima de threshold %
+    regressions = []
+    for name, new in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        parts = []
+        for metric, direction in CHECKS.items():
+            if not old.get(metric):
+                continue
+            change = (new[metric] - old[metric]) / old[metric] * 100
+            worse = -change * direction
+            flag = ""
+            if worse > threshold:
+                flag = " REGRESSÃO"
+                regressions.append((name, metric, old[metric], new[metric]))
+            parts.append("%s %s -> %s (%+.1f%%)%s" % (metric, old[metric], new[metric], change, flag))
+        print("%-10s %s" % (name, "  ".join(parts)))
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pong 1972 - Ultimate: benchmark sem janela")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="padrão: todos")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplica a duração dos cenários")
+    parser.add_argument("--out", help="grava os resultados em JSON")
+    parser.add_argument("--baseline", help="compara com resultados salvos antes")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="%% de piora aceita")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NOVO"), help="só compara dois arquivos")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        result = run_child(args.child, args.seed, args.scale)
+        sys.stdout.flush()
+        print(json.dumps(result))
+        return 0
+    if args.compare:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            baseline, current = json.load(f), json.load(g)
+    else:
+        current = run(args.scenario or SCENARIOS, args.seed, args.scale)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(current, f, indent=2)
+        if not args.baseline:
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print("%d regressões acima de %g%%" % (len(regressions), args.threshold))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
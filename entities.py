@@ -0,0 +1,132 @@
+# Entidades paradas no campo (power-ups, obstáculos) com ciclo de vida e
+# índice espacial. A grade uniforme responde "o que está perto deste
+# retângulo" olhando só as células que ele cobre, então o custo por tick não
+# cresce com a duração da partida. Sem pygame nem engine: qualquer objeto com
+# .rect (x, y, width, height) serve, e a grade sozinha aceita chaves e
+# retângulos soltos (partículas, várias bolas).
+from collections import deque
+
+CELL_SIZE = 100  # px; uma bola de raio 10 varrida num tick ocupa 1-4 células
+
+class UniformGrid:
+    # Células quadradas de cell_size; cada chave fica em todas as células que o
+    # retângulo dela cobre. query() devolve as chaves em ordem crescente, para
+    # a consulta não depender da ordem de inserção nas células.
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> {chave: item}
+        self.where = {}  # chave -> células ocupadas
+    def cells_for(self, x, y, width, height):
+        size = self.cell_size
+        x0, y0 = int(x // size), int(y // size)
+        x1, y1 = int((x + width) // size), int((y + height) // size)
+        return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+    def insert(self, key, item, rect):
+        cells = self.cells_for(rect.x, rect.y, rect.width, rect.height)
+        self.where[key] = cells
+        for cell in cells:
+            self.cells.setdefault(cell, {})[key] = item
+    def remove(self, key):
+        for cell in self.where.pop(key, ()):
+            bucket = self.cells[cell]
+            del bucket[key]
+            if not bucket:
+                del self.cells[cell]
+    def move(self, key, item, rect):
+        # Só mexe nas células quando o retângulo mudou de célula
+        if self.where.get(key) != self.cells_for(rect.x, rect.y, rect.width, rect.height):
+            self.remove(key)
+            self.insert(key, item, rect)
+    def query(self, rect):
+        found = {}
+        cells = self.cells
+        for cell in self.cells_for(rect.x, rect.y, rect.width, rect.height):
+            bucket = cells.get(cell)
+            if bucket:
+                found.update(bucket)
+        return [found[key] for key in sorted(found)]
+    def clear(self):
+        self.cells.clear()
+        self.where.clear()
+
+class EntityStore:
+    # Entidades vivas na ordem de criação, com políticas de teto (cap: o mais
+    # antigo sai para o novo entrar) e de validade (lifetime, na mesma unidade
+    # do 'now' de add/expire; o Match usa ticks). Remover só marca a entrada
+    # como morta; a fila é compactada quando os mortos passam dos vivos.
+    def __init__(self, cap=None, lifetime=None, cell_size=CELL_SIZE):
+        self.cap = cap
+        self.lifetime = lifetime
+        self.entries = deque()  # [chave, entidade, nascimento]; entidade None = removida
+        self.index = {}  # id(entidade) -> entrada
+        self.grid = UniformGrid(cell_size)
+        self.next_key = 0
+        self.dead = 0
+        self.added = 0  # total já criado, para quem precisa saber se houve spawn
+        self.evicted = 0
+        self.expired = 0
+    def __iter__(self):
+        return (entry[1] for entry in self.entries if entry[1] is not None)
+    def __len__(self):
+        return len(self.index)
+    def __bool__(self):
+        return bool(self.index)
+    def add(self, entity, now=0):
+        if self.cap is not None and len(self.index) >= self.cap:
+            self.pop_oldest()
+            self.evicted += 1
+        entry = [self.next_key, entity, now]
+        self.next_key += 1
+        self.added += 1
+        self.entries.append(entry)
+        self.index[id(entity)] = entry
+        self.grid.insert(entry[0], entity, entity.rect)
+        return entity
+    def remove(self, entity):
+        entry = self.index.pop(id(entity), None)
+        if entry is None:
+            return False
+        self.grid.remove(entry[0])
+        entry[1] = None
+        self.dead += 1
+        if self.dead > len(self.index):
+            self.compact()
+        return True
+    def pop_oldest(self):
+        entries = self.entries
+        while entries[0][1] is None:
+            entries.popleft()
+            self.dead -= 1
+        self.remove(entries[0][1])
+    def expire(self, now):
+        # As mais antigas ficam na frente: para na primeira ainda válida
+        if self.lifetime is None:
+            return 0
+        entries = self.entries
+        count = 0
+        while entries and (entries[0][1] is None or now - entries[0][2] >= self.lifetime):
+            entry = entries.popleft()
+            if entry[1] is None:
+                self.dead -= 1
+                continue
+            del self.index[id(entry[1])]
+            self.grid.remove(entry[0])
+            count += 1
+        self.expired += count
+        return count
+    def compact(self):
+        self.entries = deque(entry for entry in self.entries if entry[1] is not None)
+        self.dead = 0
+    def query(self, rect):
+        # Candidatas nas células que 'rect' cobre, na ordem de criação
+        return self.grid.query(rect)
+    def replace(self, entities, now=0):
+        # Troca o conteúdo inteiro (ex.: estado recebido do host)
+        self.clear()
+        for entity in entities:
+            self.add(entity, now)
+    def clear(self):
+        self.entries.clear()
+        self.index.clear()
+        self.grid.clear()
+        self.dead = 0
@@ -0,0 +1,245 @@
+# Transportes do modo online. Os dois têm a mesma interface: send() enfileira
+# um quadro de protocol.py, flush() manda o que estiver na fila e poll(timeout)
+# devolve as mensagens recebidas já decodificadas.
+#   TcpTransport  stream confiável e ordenado (o fallback de sempre)
+#   UdpTransport  datagramas: snapshots velhos são descartados, entradas vão
+#                 redundantes e um canal confiável pequeno (ACK + reenvio)
+#                 carrega placar e fim de partida; handshake e timeout próprios
+import select
+import socket
+import time
+
+import protocol
+
+CONNECT_TIMEOUT = 30.0  # espera máxima pelo outro lado no handshake
+TIMEOUT = 5.0  # sem receber nada por esse tempo, a conexão caiu
+HANDSHAKE_INTERVAL = 0.25
+RESEND_INTERVAL = 0.2  # reenvio do canal confiável enquanto não vier o ACK
+MAX_DATAGRAM = 1200  # abaixo do MTU comum, para não fragmentar
+
+class Transport:
+    def __init__(self):
+        self.writer = protocol.MessageWriter()
+        self.queue = []
+        self.connected = True
+        self.last_received = time.perf_counter()
+        self.bytes_received = 0
+    @property
+    def bytes_sent(self):
+        return self.writer.bytes_sent
+    def send(self, msg_type, tick, body=b"", reliable=False):
+        self.queue.append(self.writer.frame(msg_type, tick, body))
+    def alive(self, now=None):
+        now = time.perf_counter() if now is None else now
+        return self.connected and now - self.last_received < TIMEOUT
+
+class TcpTransport(Transport):
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+        self.conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # O timeout do socket vale só para o envio: a espera do poll é um select,
+        # então um sendall nunca herda a espera curta de leitura e corta um quadro
+        self.conn.settimeout(TIMEOUT)
+        self.reader = protocol.FrameReader()
+    @classmethod
+    def listen(cls, port, running=lambda: True):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('', port))
+        sock.listen(1)
+        sock.settimeout(HANDSHAKE_INTERVAL)
+        deadline = time.perf_counter() + CONNECT_TIMEOUT
+        try:
+            while running() and time.perf_counter() < deadline:
+                try:
+                    conn, addr = sock.accept()
+                    print("Conectado com", addr)
+                    return cls(conn)
+                except socket.timeout:
+                    pass
+        finally:
+            sock.close()
+        return None
+    @classmethod
+    def connect(cls, host, port, running=lambda: True):
+        return cls(socket.create_connection((host, port), timeout=CONNECT_TIMEOUT))
+    def flush(self):
+        if self.queue:
+            data, self.queue = b"".join(self.queue), []
+            try:
+                self.conn.sendall(data)
+            except OSError:
+                # Queda ou outro lado parado por TIMEOUT: parte do quadro pode ter
+                # saído, então o fluxo não tem mais conserto
+                self.connected = False
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.conn], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = self.conn.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            self.connected = False
+            return []
+        self.last_received = time.perf_counter()
+        self.bytes_received += len(data)
+        return self.reader.feed(data)
+    def alive(self, now=None):
+        return self.connected  # o próprio TCP detecta a queda
+    def close(self):
+        self.connected = False
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+
+class UdpTransport(Transport):
+    def __init__(self, sock, peer):
+        super().__init__()
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.peer = peer
+        self.latest_snapshot = 0  # sequência do snapshot mais novo já entregue
+        self.stale = 0  # snapshots descartados por chegarem depois de um mais novo
+        # Canal confiável: id -> (quadro RELIABLE, último envio) até o ACK chegar
+        self.next_reliable = 1
+        self.unacked = {}
+        self.expected = 1  # próximo id confiável a entregar, em ordem
+        self.out_of_order = {}
+    @classmethod
+    def listen(cls, port, running=lambda: True):
+        # Host: espera um CONNECT, guarda o endereço do cliente e responde ACCEPT
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('', port))
+        deadline = time.perf_counter() + CONNECT_TIMEOUT
+        while running() and time.perf_counter() < deadline:
+            ready, _, _ = select.select([sock], [], [], HANDSHAKE_INTERVAL)
+            if not ready:
+                continue
+            data, addr = sock.recvfrom(MAX_DATAGRAM)
+            try:
+                messages = protocol.unpack_frames(data)
+            except protocol.ProtocolError:
+                continue
+            if any(m.type == protocol.CONNECT for m in messages):
+                print("Conectado com", addr)
+                transport = cls(sock, addr)
+                transport.send(protocol.ACCEPT, 0)
+                transport.flush()
+                return transport
+        sock.close()
+        return None
+    @classmethod
+    def connect(cls, host, port, running=lambda: True):
+        # Cliente: repete o CONNECT até vir o ACCEPT (o primeiro pode se perder)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        peer = (socket.gethostbyname(host), port)
+        transport = cls(sock, peer)
+        deadline = time.perf_counter() + CONNECT_TIMEOUT
+        while running() and time.perf_counter() < deadline:
+            transport.send(protocol.CONNECT, 0)
+            transport.flush()
+            ready, _, _ = select.select([sock], [], [], HANDSHAKE_INTERVAL)
+            if not ready:
+                continue
+            try:
+                data, addr = sock.recvfrom(MAX_DATAGRAM)
+                messages = protocol.unpack_frames(data)
+            except (OSError, protocol.ProtocolError):
+                continue  # ex.: ECONNREFUSED enquanto o host ainda não abriu a porta
+            if addr == peer and any(m.type == protocol.ACCEPT for m in messages):
+                transport.last_received = time.perf_counter()
+                return transport
+        sock.close()
+        return None
+    def send(self, msg_type, tick, body=b"", reliable=False):
+        if not reliable:
+            super().send(msg_type, tick, body)
+            return
+        inner = protocol.pack(msg_type, self.writer.seq + 1, tick, body)
+        reliable_id = self.next_reliable
+        self.next_reliable += 1
+        frame = self.writer.frame(protocol.RELIABLE, tick, protocol.RELIABLE_ID.pack(reliable_id) + inner)
+        self.unacked[reliable_id] = (frame, time.perf_counter())
+        self.queue.append(frame)
+    def flush(self):
+        now = time.perf_counter()
+        for reliable_id, (frame, sent) in list(self.unacked.items()):
+            if now - sent >= RESEND_INTERVAL:
+                self.unacked[reliable_id] = (frame, now)
+                self.queue.append(frame)
+        datagram = b""
+        for frame in self.queue:
+            if datagram and len(datagram) + len(frame) > MAX_DATAGRAM:
+                self.sendto(datagram)
+                datagram = b""
+            datagram += frame
+        if datagram:
+            self.sendto(datagram)
+        self.queue = []
+    def sendto(self, datagram):
+        try:
+            self.sock.sendto(datagram, self.peer)
+        except (BlockingIOError, ConnectionRefusedError):
+            pass  # UDP: o que não coube ou não chegou conta como perda
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        messages = []
+        while ready:
+            try:
+                data, addr = self.sock.recvfrom(MAX_DATAGRAM)
+            except (BlockingIOError, ConnectionRefusedError):
+                break
+            if addr != self.peer:
+                continue
+            try:
+                frames = protocol.unpack_frames(data)
+            except protocol.ProtocolError:
+                continue  # datagrama corrompido é descartado inteiro
+            self.last_received = time.perf_counter()
+            self.bytes_received += len(data)
+            for message in frames:
+                messages.extend(self.receive(message))
+        return messages
+    def receive(self, message):
+        if message.type == protocol.SNAPSHOT:
+            if message.seq <= self.latest_snapshot:
+                self.stale += 1
+                return []
+            self.latest_snapshot = message.seq
+        elif message.type == protocol.ACK:
+            for reliable_id in [i for i in self.unacked if i <= message.body]:
+                del self.unacked[reliable_id]
+            return []
+        elif message.type == protocol.RELIABLE:
+            reliable_id, inner = message.body
+            if reliable_id >= self.expected:
+                self.out_of_order[reliable_id] = inner
+            delivered = []
+            while self.expected in self.out_of_order:
+                delivered.append(self.out_of_order.pop(self.expected))
+                self.expected += 1
+            # ACK cumulativo: confirma tudo até o último entregue em ordem
+            self.send(protocol.ACK, message.tick, protocol.RELIABLE_ID.pack(self.expected - 1))
+            return delivered
+        elif message.type == protocol.DISCONNECT:
+            self.connected = False
+            return []
+        elif message.type in (protocol.CONNECT, protocol.ACCEPT):
+            if message.type == protocol.CONNECT:
+                self.send(protocol.ACCEPT, 0)  # o ACCEPT anterior se perdeu
+            return []
+        return [message]
+    def close(self):
+        if self.connected:
+            for _ in range(3):  # sem confirmação: alguns avisos bastam
+                self.send(protocol.DISCONNECT, 0)
+            self.flush()
+        self.connected = False
+        self.sock.close()
+
+TRANSPORTS = {"tcp": TcpTransport, "udp": UdpTransport}
@@ -0,0 +1,239 @@
+# Medições do modo online sem janela: host e cliente do pong.py no mesmo
+# processo, ligados pelo proxy do netem.py, com entradas roteirizadas por
+# seed. Os dois lados compartilham o relógio, então dá para medir de ponta a ponta:
+#   entrada     tecla no cliente -> host aplica (ida) e -> snapshot que a
+#               confirma volta ao cliente (ida e volta)
+#   snapshot    idade ao ser aplicado: host publicou o tick -> cliente aplicou
+#   dessincronia  % das entradas em que a raquete prevista pelo cliente difere
+#               da do host depois da mesma entrada; erro da bola contra o host
+#   banda       bytes por segundo de cada sentido, medidos no cliente
+#   python netbot.py --preset wifi --transport udp --duration 20
+#   python netbot.py --matrix --json netbot.json   (todos os presets, TCP e UDP)
+#   python netbot.py --check   (preset ideal: a entrada chega ao host em cerca de um tick)
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import engine
+import netem
+import pong
+from engine import InputCommand
+
+FRAME_DT = 1 / 120
+PADDLE_TOLERANCE = 0.5  # px entre a raquete prevista e a do host
+BALL_TOLERANCE = 8.0  # px; acima disso o frame conta como dessincronizado
+TRANSPORTS = ["tcp", "udp"]
+# --check, preset ideal: ida da entrada em ms. O cliente manda a 60 por segundo,
+# então até meio intervalo de envio de espera é normal além do tick do host
+CHECK_INPUT_P50 = 1.5 * engine.TICK_DT * 1000
+CHECK_INPUT_P95 = 3 * engine.TICK_DT * 1000
+
+class Script:
+    # Direção sorteada (seed fixa) e mantida por 12-90 ticks, como alguém apertando as teclas
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.move = 0
+        self.remaining = 0
+    def next(self):
+        if self.remaining <= 0:
+            self.move = self.rng.choice((-1, 0, 1))
+            self.remaining = self.rng.randint(12, 90)
+        self.remaining -= 1
+        return InputCommand(self.move)
+
+class Probe:
+    # Carimbos de tempo dos dois lados; só guarda amostras depois do aquecimento
+    def __init__(self):
+        self.active = False
+        self.published = {}  # tick -> hora em que o host publicou
+        self.sent = {}  # seq -> hora em que o cliente gerou a entrada
+        self.predicted = {}  # seq -> y da raquete prevista pelo cliente
+        self.authoritative = {}  # seq -> y da raquete no host depois de aplicar
+        self.last_applied = 0
+        self.last_acked = 0
+        self.input_one_way = []
+        self.input_round_trip = []
+        self.snapshot_age = []
+        self.ball_error = []
+    def host_tick(self, host):
+        now = time.perf_counter()
+        self.published[host.sim.tick] = now
+        seq = host.acked_input
+        if seq > self.last_applied:
+            self.last_applied = seq
+            self.authoritative[seq] = host.sim.right_paddle.rect.y
+            if self.active and seq in self.sent:
+                self.input_one_way.append(now - self.sent[seq])
+    def client_tick(self, client):
+        seq = client.inputs.seq
+        self.sent[seq] = time.perf_counter()
+        if self.active:
+            self.predicted[seq] = client.sim.right_paddle.rect.y
+    def snapshot(self, tick, state):
+        now = time.perf_counter()
+        if self.active and tick in self.published:
+            self.snapshot_age.append(now - self.published[tick])
+        ack = state.fields[pong.statesync.INDEX["ack"]]
+        for seq in range(self.last_acked + 1, ack + 1):
+            if self.active and seq in self.sent:
+                self.input_round_trip.append(now - self.sent[seq])
+        self.last_acked = max(self.last_acked, ack)
+    def frame(self, host, client):
+        if self.active and not (host.paused or client.paused):
+            dx, dy = host.sim.ball.pos - client.sim.ball.pos
+            self.ball_error.append((dx * dx + dy * dy) ** 0.5)
+    def desync(self):
+        compared = [seq for seq in self.predicted if seq in self.authoritative]
+        wrong = sum(abs(self.predicted[seq] - self.authoritative[seq]) > PADDLE_TOLERANCE for seq in compared)
+        return wrong / len(compared) if compared else None
+
+class HostBot(pong.OnlineGame):
+    # Host sem teclado: a raquete esquerda segue o roteiro
+    recording = False  # não sobrescreve o replay do jogador
+    def __init__(self, port, transport, probe, seed=0):
+        self.script = Script(seed)
+        self.probe = probe
+        super().__init__(True, "", port, "Medium", "Classic", "Classic", transport)
+    def read_input(self):
+        _, right = super().read_input()
+        return self.script.next(), right
+    def tick(self):
+        super().tick()
+        self.probe.host_tick(self)
+
+class ClientBot(pong.OnlineGame):
+    def __init__(self, port, transport, probe, seed=1):
+        self.script = Script(seed)
+        self.probe = probe
+        super().__init__(False, "127.0.0.1", port, "Medium", "Classic", "Classic", transport)
+    def read_input(self):
+        return engine.IDLE, self.script.next()
+    def tick(self):
+        super().tick()
+        self.probe.client_tick(self)
+    def reconcile(self, tick, state):
+        self.probe.snapshot(tick, state)
+        super().reconcile(tick, state)
+
+def percentiles(values, scale=1000.0):
+    # p50/p95/p99 (em ms por padrão); None sem amostras
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda p: round(values[min(len(values) - 1, int(p * len(values)))] * scale, 1)
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+def run(name, conditions, transport="udp", duration=10.0, port=23450, seed=0, warmup=1.0):
+    # Uma rodada: host na 'port', proxy na 'port + 1', cliente no proxy
+    probe = Probe()
+    proxy = netem.Proxy(port + 1, ("127.0.0.1", port), conditions, seed, udp=transport == "udp").start()
+    host = HostBot(port, transport, probe, seed * 2)
+    time.sleep(0.05)
+    client = ClientBot(port + 1, transport, probe, seed * 2 + 1)
+    start = last = time.perf_counter()
+    measured_at = None
+    bytes_mark = (0, 0)
+    while last - start < warmup + duration:
+        now = time.perf_counter()
+        dt, last = now - last, now
+        host.update(dt)
+        client.update(dt)
+        probe.frame(host, client)
+        if measured_at is None and now - start >= warmup and client.transport:
+            measured_at = now
+            bytes_mark = (client.transport.bytes_sent, client.transport.bytes_received)
+            probe.active = True
+        time.sleep(max(0.0, now + FRAME_DT - time.perf_counter()))
+    elapsed = time.perf_counter() - (measured_at or start)
+    transport_ok = client.transport is not None
+    up = (client.transport.bytes_sent - bytes_mark[0]) / elapsed if transport_ok else 0
+    down = (client.transport.bytes_received - bytes_mark[1]) / elapsed if transport_ok else 0
+    errors = probe.ball_error
+    result = {
+        "preset": name, "transport": transport, "seed": seed, "duration": round(elapsed, 2),
+        "conditions": conditions._asdict(),
+        "input_one_way_ms": percentiles(probe.input_one_way),
+        "input_round_trip_ms": percentiles(probe.input_round_trip),
+        "snapshot_age_ms": percentiles(probe.snapshot_age),
+        "paddle_desync": probe.desync(),
+        "ball_error_px": percentiles(errors, 1.0),
+        "ball_desync": sum(e > BALL_TOLERANCE for e in errors) / len(errors) if errors else None,
+        "snapshots_dropped": client.snapshots.dropped.total,
+        "upload_bps": round(up), "download_bps": round(down),
+        "proxy": proxy.stats(),
+    }
+    host.stop_network()
+    client.stop_network()
+    proxy.stop()
+    return result
+
+def describe(result):
+    show = lambda p: "-" if p is None else "%s/%s/%s" % (p["p50"], p["p95"], p["p99"])
+    rate = lambda r: "-" if r is None else "%.1f%%" % (r * 100)
+    return ("%-7s %s  entrada ida %s ms, ida e volta %s ms | snapshot %s ms | dessinc. raquete %s, bola %s "
+            "(erro %s px) | %d B/s sobe, %d B/s desce" % (
+                result["preset"], result["transport"].upper(), show(result["input_one_way_ms"]),
+                show(result["input_round_trip_ms"]), show(result["snapshot_age_ms"]),
+                rate(result["paddle_desync"]), rate(result["ball_desync"]), show(result["ball_error_px"]),
+                result["upload_bps"], result["download_bps"]))
+
+def check(result):
+    # Problemas encontrados numa rodada do preset ideal (lista vazia: ok)
+    latency = result["input_one_way_ms"]
+    if latency is None:
+        return ["nenhuma entrada medida"]
+    problems = []
+    if latency["p50"] > CHECK_INPUT_P50:
+        problems.append("entrada ida p50 %.1f ms > %.1f ms" % (latency["p50"], CHECK_INPUT_P50))
+    if latency["p95"] > CHECK_INPUT_P95:
+        problems.append("entrada ida p95 %.1f ms > %.1f ms" % (latency["p95"], CHECK_INPUT_P95))
+    if result["paddle_desync"]:
+        problems.append("raquete prevista dessincronizada em %.1f%% das entradas" % (result["paddle_desync"] * 100))
+    return problems
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pong 1972 - Ultimate: medições do modo online através do netem")
+    netem.add_condition_args(parser)
+    parser.add_argument("--transport", choices=TRANSPORTS, default="udp")
+    parser.add_argument("--matrix", action="store_true", help="todos os presets em TCP e UDP")
+    parser.add_argument("--check", action="store_true",
+                        help="preset ideal em TCP e UDP; sai com erro se a entrada atrasar mais de um tick")
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos medidos por rodada")
+    parser.add_argument("--port", type=int, default=23450)
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    pong.init_display()
+    if args.check:
+        runs = [("ideal", netem.PRESETS["ideal"], transport) for transport in TRANSPORTS]
+    elif args.matrix:
+        runs = [(name, netem.PRESETS[name], transport) for name in netem.PRESETS for transport in TRANSPORTS]
+    else:
+        runs = [(args.preset, netem.conditions_from_args(args), args.transport)]
+    results = []
+    failed = False
+    for i, (name, conditions, transport) in enumerate(runs):
+        # Portas novas a cada rodada: as da anterior podem estar em TIME_WAIT
+        result = run(name, conditions, transport, args.duration, args.port + 2 * i, args.seed)
+        print(describe(result))
+        results.append(result)
+        if args.check:
+            for problem in check(result):
+                print("  FALHOU:", problem)
+                failed = True
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
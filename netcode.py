@@ -0,0 +1,139 @@
+# Netcode do cliente online. A raquete local é prevista na hora e depois
+# reconciliada com a sequência de entradas que o host confirma em cada
+# snapshot; a raquete remota é desenhada a partir de um buffer de snapshots
+# com atraso de interpolação (e extrapolação limitada quando o buffer seca).
+import threading
+from collections import deque
+
+from engine import TICK_RATE
+
+class HostClock:
+    # Estima o relógio do host (tick / TICK_RATE) a partir dos snapshots: a
+    # diferença entre o tempo do snapshot e a hora local de chegada é suavizada;
+    # um salto grande (host pausou, rede travou) reinicia a estimativa.
+    def __init__(self, smoothing=0.1, reset=0.5):
+        self.smoothing = smoothing
+        self.reset = reset
+        self.offset = None
+    def observe(self, tick, received):
+        sample = tick / TICK_RATE - received
+        if self.offset is None or abs(sample - self.offset) > self.reset:
+            self.offset = sample
+        else:
+            self.offset += self.smoothing * (sample - self.offset)
+    def now(self, local, rtt=None):
+        # O snapshot chegou meia ida e volta depois de sair do host
+        if self.offset is None:
+            return None
+        return local + self.offset + (rtt or 0.0) / 2
+
+class SnapshotBuffer:
+    # Valores (tupla de floats) com carimbo de tempo do host, em ordem
+    def __init__(self, delay=0.1, max_extrapolation=0.05, size=64):
+        self.delay = delay  # quanto atrás do host o desenho fica
+        self.max_extrapolation = max_extrapolation
+        self.entries = deque(maxlen=size)
+        self.interpolated = 0
+        self.extrapolated = 0
+    def push(self, time, values):
+        if self.entries and time <= self.entries[-1][0]:
+            return False  # fora de ordem ou repetido
+        self.entries.append((time, values))
+        return True
+    def sample(self, host_now):
+        # Estado em host_now - delay: interpolado entre os dois snapshots em volta
+        # ou, se ainda não chegou nenhum tão novo, extrapolado por no máximo
+        # max_extrapolation segundos a partir dos dois últimos
+        entries = self.entries
+        if not entries:
+            return None
+        render_time = host_now - self.delay
+        if render_time <= entries[0][0] or len(entries) == 1:
+            return entries[0][1]
+        newest_time, newest = entries[-1]
+        if render_time >= newest_time:
+            self.extrapolated += 1
+            prev_time, prev = entries[-2]
+            ahead = min(render_time - newest_time, self.max_extrapolation) / (newest_time - prev_time)
+            return tuple(b + (b - a) * ahead for a, b in zip(prev, newest))
+        self.interpolated += 1
+        for i in range(len(entries) - 1, 0, -1):
+            t0, a = entries[i - 1]
+            if t0 <= render_time:
+                t1, b = entries[i]
+                alpha = (render_time - t0) / (t1 - t0)
+                return tuple(x + (y - x) * alpha for x, y in zip(a, b))
+        return entries[0][1]
+
+class InputHistory:
+    # Entradas previstas localmente e ainda não confirmadas pelo host. O loop
+    # principal adiciona e reconcilia; a thread de rede lê o que enviar.
+    def __init__(self, limit=256):
+        self.entries = deque(maxlen=limit)  # (seq, comando)
+        self.seq = 0
+        self.acked = 0
+        self.lock = threading.Lock()
+    def add(self, command):
+        with self.lock:
+            self.seq += 1
+            self.entries.append((self.seq, command))
+            return self.seq
+    def acknowledge(self, ack):
+        # Descarta o que o host já aplicou e devolve o resto, para re-aplicar
+        with self.lock:
+            self.acked = max(self.acked, ack)
+            while self.entries and self.entries[0][0] <= self.acked:
+                self.entries.popleft()
+            return list(self.entries)
+    def pending(self, after=0, limit=32):
+        # Até 'limit' entradas não confirmadas com seq > after, as mais antigas primeiro
+        with self.lock:
+            entries = [entry for entry in self.entries if entry[0] > after]
+        return entries[:limit]
+
+class RateCounter:
+    # Contagem total e taxa por segundo na última janela completa. As duas
+    # threads somam (ex.: descartes na rede e no loop principal) e o loop
+    # principal fecha a janela: "+=" não é atômico, então tudo passa pelo lock.
+    def __init__(self, window=1.0):
+        self.window = window
+        self.total = 0
+        self.rate = 0.0
+        self.mark = (None, 0)
+        self.lock = threading.Lock()
+    def add(self, n=1):
+        with self.lock:
+            self.total += n
+    def update(self, now):
+        with self.lock:
+            start, total = self.mark
+            if start is None:
+                self.mark = (now, self.total)
+            elif now - start >= self.window:
+                self.rate = (self.total - total) / (now - start)
+                self.mark = (now, self.total)
+            return self.rate
+
+class SnapshotExchange:
+    # Passagem de snapshots entre a thread de rede e o loop principal sem lock:
+    # o produtor só faz append e o consumidor só popleft (atômicos no CPython),
+    # e os itens são imutáveis (tuplas, bytes), então ninguém vê estado pela metade.
+    def __init__(self, capacity=64):
+        self.queue = deque(maxlen=capacity)
+        self.latest = None  # último publicado; trocar uma referência também é atômico
+        self.received = RateCounter()
+        self.dropped = RateCounter()
+        self.applied = RateCounter()
+    def publish(self, item):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped.add()  # consumidor atrasado: o mais antigo sai da fila
+        self.queue.append(item)
+        self.latest = item
+        self.received.add()
+    def take(self):
+        queue = self.queue
+        return [queue.popleft() for _ in range(len(queue))]
+    def rates(self, now):
+        return {name: counter.update(now)
+                for name, counter in (("received", self.received), ("dropped", self.dropped),
+                                      ("applied", self.applied))}
@@ -0,0 +1,241 @@
+# Emulador de rede em loopback: um proxy entre host e cliente do modo online
+# que atrasa, varia (jitter), perde, duplica e reordena pacotes e limita a
+# banda, com RNG de seed fixa para a mesma seed dar a mesma sequência de
+# decisões. UDP sofre tudo isso por datagrama; no TCP só atraso, jitter e
+# banda fazem sentido (o stream continua ordenado e sem perdas).
+#   python netem.py --listen 12346 --target 127.0.0.1:12345 --udp --preset wifi
+#   (host escuta na 12345, cliente conecta na 12346)
+# Para as medições automáticas com bots, veja netbot.py.
+import argparse
+import asyncio
+import random
+import threading
+from collections import namedtuple
+
+# latência e jitter em segundos (por sentido), perdas em fração, banda em bytes/s (0 = sem limite)
+Conditions = namedtuple("Conditions", ["latency", "jitter", "loss", "duplicate", "reorder", "bandwidth"],
+                        defaults=(0.0, 0.0, 0.0, 0.0, 0.0, 0))
+
+PRESETS = {
+    "ideal": Conditions(),
+    "lan": Conditions(0.001, 0.0005),
+    "cable": Conditions(0.015, 0.003, 0.005),
+    "wifi": Conditions(0.010, 0.008, 0.02, 0.005, 0.01),
+    "mobile": Conditions(0.040, 0.015, 0.03, 0.0, 0.02, 64 * 1024),
+    "bad": Conditions(0.075, 0.025, 0.10, 0.02, 0.05, 16 * 1024),
+}
+QUEUE_LIMIT = 64 * 1024  # bytes esperando banda; além disso o pacote cai (como a fila de um roteador)
+
+class Link:
+    # Um sentido da conexão. schedule() decide o destino de cada pacote e
+    # agenda a entrega no loop do asyncio.
+    def __init__(self, loop, conditions, rng, ordered=False):
+        self.loop = loop
+        self.conditions = conditions
+        self.rng = rng
+        self.ordered = ordered  # TCP: ninguém passa na frente de quem chegou antes
+        self.free_at = 0.0  # quando o "fio" termina de transmitir o que já está na fila
+        self.last_delivery = 0.0
+        self.packets = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.duplicated = 0
+        self.reordered = 0
+    def schedule(self, data, deliver):
+        c = self.conditions
+        rng = self.rng
+        if not self.ordered:
+            if rng.random() < c.loss:
+                self.dropped += 1
+                return
+            if rng.random() < c.duplicate:
+                self.duplicated += 1
+                self.send(data, deliver)
+        self.send(data, deliver)
+    def send(self, data, deliver):
+        c = self.conditions
+        now = self.loop.time()
+        departure = now
+        if c.bandwidth:
+            start = max(now, self.free_at)
+            if (start - now) * c.bandwidth > QUEUE_LIMIT:
+                self.dropped += 1
+                return
+            self.free_at = start + len(data) / c.bandwidth
+            departure = self.free_at
+        delay = c.latency + self.rng.uniform(-c.jitter, c.jitter)
+        if not self.ordered and self.rng.random() < c.reorder:
+            delay = 0.0  # sai na frente dos que ainda estão no atraso
+            self.reordered += 1
+        at = departure + max(0.0, delay)
+        if self.ordered:
+            at = max(at, self.last_delivery)
+        self.last_delivery = max(self.last_delivery, at)
+        self.packets += 1
+        self.bytes += len(data)
+        self.loop.call_at(at, deliver, data)
+    def stats(self):
+        return {"packets": self.packets, "bytes": self.bytes, "dropped": self.dropped,
+                "duplicated": self.duplicated, "reordered": self.reordered}
+
+class Proxy:
+    # Escuta em listen_port e repassa para target; roda numa thread própria
+    # com o seu loop do asyncio, então dá para usar ao lado do pygame.
+    def __init__(self, listen_port, target, conditions=Conditions(), seed=0, udp=True):
+        self.listen_port = listen_port
+        self.target = target
+        self.conditions = conditions
+        self.seed = seed
+        self.udp = udp
+        self.links = []
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+    def new_link(self, ordered=False):
+        # Cada sentido de cada conexão tem o seu RNG, derivado da seed na ordem de criação
+        link = Link(self.loop, self.conditions, random.Random(self.seed * 1000 + len(self.links)), ordered)
+        self.links.append(link)
+        return link
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.open())
+        self.ready.set()
+        self.loop.run_forever()
+        # Conexões TCP ainda abertas: cancela os pumps antes de fechar o loop
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+    async def open(self):
+        if self.udp:
+            self.server, _ = await self.loop.create_datagram_endpoint(
+                lambda: UdpFront(self), local_addr=("0.0.0.0", self.listen_port))
+        else:
+            self.server = await asyncio.start_server(self.tcp_client, port=self.listen_port, reuse_address=True)
+    async def tcp_client(self, reader, writer):
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(*self.target)
+        except OSError:
+            writer.close()
+            return
+        try:
+            await asyncio.gather(self.pump(reader, upstream_writer, self.new_link(ordered=True)),
+                                 self.pump(upstream_reader, writer, self.new_link(ordered=True)))
+        except asyncio.CancelledError:
+            writer.close()  # proxy parando com a conexão aberta
+            upstream_writer.close()
+    async def pump(self, reader, writer, link):
+        def deliver(data):
+            if not writer.is_closing():
+                writer.write(data)
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                link.schedule(data, deliver)
+        except ConnectionError:
+            pass
+        # Fecha depois que o que está no atraso for entregue
+        self.loop.call_at(max(link.last_delivery, self.loop.time()), writer.close)
+    def stats(self):
+        totals = {}
+        for link in self.links:
+            for key, value in link.stats().items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+    def stop(self):
+        if self.loop is None:
+            return
+        def close():
+            self.server.close()
+            self.loop.stop()
+        self.loop.call_soon_threadsafe(close)
+        self.thread.join(timeout=2)
+
+class UdpFront(asyncio.DatagramProtocol):
+    # Lado que os clientes enxergam; cada endereço de cliente ganha um socket
+    # próprio até o host, como faria um NAT
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.clients = {}  # endereço -> (link de ida, transporte até o host)
+    def connection_made(self, transport):
+        self.transport = transport
+    def datagram_received(self, data, addr):
+        client = self.clients.get(addr)
+        if client is None:
+            client = self.clients[addr] = [self.proxy.new_link(), None, []]
+            self.proxy.loop.create_task(self.connect(addr, client))
+        link, upstream, pending = client
+        if upstream is None:
+            pending.append(data)
+            return
+        link.schedule(data, lambda d: upstream.is_closing() or upstream.sendto(d))
+    async def connect(self, addr, client):
+        back = self.proxy.new_link()
+        front = self.transport
+        deliver = lambda d: front.is_closing() or front.sendto(d, addr)
+        upstream, _ = await self.proxy.loop.create_datagram_endpoint(
+            lambda: UdpBack(back, deliver), remote_addr=self.proxy.target)
+        client[1] = upstream
+        for data in client[2]:
+            client[0].schedule(data, lambda d: upstream.is_closing() or upstream.sendto(d))
+        client[2].clear()
+
+class UdpBack(asyncio.DatagramProtocol):
+    # Socket até o host de um cliente: o que volta passa pelo link de volta
+    def __init__(self, link, deliver):
+        self.link = link
+        self.deliver = deliver
+    def datagram_received(self, data, addr):
+        self.link.schedule(data, self.deliver)
+    def error_received(self, exc):
+        pass  # ex.: host ainda não abriu a porta; no UDP isso é só perda
+
+def conditions_from_args(args):
+    base = PRESETS[args.preset]
+    overrides = {"latency": args.latency, "jitter": args.jitter, "loss": args.loss,
+                 "duplicate": args.duplicate, "reorder": args.reorder, "bandwidth": args.bandwidth}
+    # ms e % na linha de comando; segundos e frações por dentro
+    scales = {"latency": 1e-3, "jitter": 1e-3, "loss": 1e-2, "duplicate": 1e-2, "reorder": 1e-2, "bandwidth": 1024}
+    return base._replace(**{key: value * scales[key] for key, value in overrides.items() if value is not None})
+
+def add_condition_args(parser):
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="ideal")
+    parser.add_argument("--latency", type=float, help="ms por sentido")
+    parser.add_argument("--jitter", type=float, help="ms, variação uniforme em volta da latência")
+    parser.add_argument("--loss", type=float, help="%% de pacotes perdidos (só UDP)")
+    parser.add_argument("--duplicate", type=float, help="%% de pacotes duplicados (só UDP)")
+    parser.add_argument("--reorder", type=float, help="%% de pacotes que passam na frente (só UDP)")
+    parser.add_argument("--bandwidth", type=float, help="limite em KB/s por sentido")
+    parser.add_argument("--seed", type=int, default=0)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pong 1972 - Ultimate: emulador de rede em loopback")
+    parser.add_argument("--listen", type=int, default=12346, help="porta onde o cliente conecta")
+    parser.add_argument("--target", default="127.0.0.1:12345", help="host:porta do host do jogo")
+    parser.add_argument("--udp", action="store_true", help="proxy UDP (padrão: TCP)")
+    add_condition_args(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    host, port = args.target.rsplit(":", 1)
+    conditions = conditions_from_args(args)
+    proxy = Proxy(args.listen, (host, int(port)), conditions, args.seed, args.udp).start()
+    print("Repassando %s :%d -> %s com %s" % ("UDP" if args.udp else "TCP", args.listen, args.target, conditions))
+    try:
+        proxy.thread.join()
+    except KeyboardInterrupt:
+        print(proxy.stats())
+        proxy.stop()
+
+if __name__ == "__main__":
+    main()
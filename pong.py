@@ -1,27 +1,35 @@
 import pygame
 import numpy as np
 import math
-import random
-import socket
+import sys
 import threading
 import os
 import time
+import argparse
+import struct
+from collections import OrderedDict, deque
 
-# Inicialização do Pygame e do mixer (estéreo)
-pygame.init()
-pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+import arena
+import engine
+import entities
+import net
+import netcode
+import protocol
+import statesync
+from arena import Arena, ArenaAI
+from statsdb import STATS_FILE, StatsStore
+from profiler import FORMATS, profiler
+from engine import WIDTH, HEIGHT, TICK_DT, InputCommand, InputLog, Match
+from replay import OBSTACLE, ReplayHeader, ReplayPlayer, ReplayReader, ReplayWriter
 
-# Dimensões da tela e criação da janela
-WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Pong 1972 - Ultimate")
-clock = pygame.time.Clock()
-
-# Fontes e temas
-font_large = pygame.font.SysFont("Arial", 60)
-font_medium = pygame.font.SysFont("Arial", 40)
-font_small = pygame.font.SysFont("Arial", 30)
+# Janela, relógio, fontes e sons são criados por init_display(); importar este
+# módulo não abre janela nem sintetiza sons.
+screen = None
+clock = None
+font_large = font_medium = font_small = None
+paddle_beep = wall_beep = score_beep = None
 
+# Temas
 themes = {
     "Classic": {
          "background": (0, 0, 0),
@@ -60,17 +68,6 @@ controls = {
 }
 mobile_mode = False
 
-# Função de fade para transições suaves
-def fade(screen, color=(0, 0, 0), duration=1.0):
-    fade_surface = pygame.Surface((WIDTH, HEIGHT))
-    fade_surface.fill(color)
-    steps = int(duration * 60)
-    for alpha in range(255, -1, -max(1, 255 // steps)):
-        fade_surface.set_alpha(alpha)
-        screen.blit(fade_surface, (0, 0))
-        pygame.display.update()
-        clock.tick(60)
-
 # Função para simular compartilhamento em redes sociais
 def share_on_social_media(score_left, score_right):
     print(f"Compartilhado no Twitter: Placar {score_left}:{score_right}")
@@ -83,419 +80,1234 @@ def generate_sound(frequency, duration=0.1, volume=0.5, sample_rate=44100):
     stereo_wave = np.int16(stereo_wave * 32767)
     return pygame.sndarray.make_sound(stereo_wave)
 
-# Sons para colisões e pontuações
-paddle_beep = generate_sound(440, 0.1, 0.5)
-wall_beep   = generate_sound(330, 0.1, 0.5)
-score_beep  = generate_sound(550, 0.1, 0.5)
-
-# --- Sistema de Partículas com Pooling ---
-class Particle:
-    def __init__(self, pos, color):
-        self.reset(pos, color)
-    def reset(self, pos, color):
-        self.pos = np.array(pos, dtype=float)
-        angle = random.uniform(0, 2 * math.pi)
-        speed = random.uniform(50, 200)
-        self.vel = np.array([math.cos(angle) * speed, math.sin(angle) * speed], dtype=float)
-        self.lifetime = random.uniform(0.5, 1.0)
-        self.age = 0
-        self.size = random.randint(2, 5)
+def init_display():
+    global screen, clock, font_large, font_medium, font_small, paddle_beep, wall_beep, score_beep
+    # Inicialização do Pygame e do mixer (estéreo)
+    pygame.init()
+    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+    # Criação da janela
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Pong 1972 - Ultimate")
+    clock = pygame.time.Clock()
+    # Fontes
+    font_large = pygame.font.SysFont("Arial", 60)
+    font_medium = pygame.font.SysFont("Arial", 40)
+    font_small = pygame.font.SysFont("Arial", 30)
+    # Sons para colisões e pontuações
+    paddle_beep = generate_sound(440, 0.1, 0.5)
+    wall_beep   = generate_sound(330, 0.1, 0.5)
+    score_beep  = generate_sound(550, 0.1, 0.5)
+    return screen
+
+# --- Cache de Sprites Pré-renderizados ---
+# Visuais que dependem só do tema, do tamanho e do alpha são gerados uma vez
+# por chave e reaproveitados; a cada frame sobra apenas um blit por objeto.
+SHADOW_COLOR = (50, 50, 50)
+SHADOW_OFFSET = 5
+POWERUP_COLORS = {
+    "enlarge": (0, 255, 0),
+    "shrink": (255, 0, 0),
+    "speed": (0, 0, 255),
+    "slow": (255, 255, 0)
+}
+
+class SpriteCache:
+    def __init__(self, max_entries=64):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.slots = {}  # dono (nome estável, ex.: "paddle_left") -> chave do sprite atual
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0   # misses causados por mudança de tamanho (enlarge/shrink)
+        self.evictions = 0
+    def get(self, key, builder, slot=None):
+        # 'slot' identifica o dono do sprite (ex.: uma raquete); se a chave do
+        # dono mudou (enlarge/shrink), o miss conta como rebuild
+        rebuild = False
+        if slot is not None:
+            previous = self.slots.get(slot)
+            self.slots[slot] = key
+            rebuild = previous is not None and previous != key
+        sprite = self.entries.get(key)
+        if sprite is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        if rebuild:
+            self.rebuilds += 1
+        sprite = builder()
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert_alpha()
+        self.entries[key] = sprite
+        # LRU: ao trocar de tema os sprites do tema antigo saem primeiro
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return sprite
+    def clear(self):
+        self.entries.clear()
+        self.slots.clear()
+    def stats(self):
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "rebuilds": self.rebuilds, "evictions": self.evictions}
+
+sprite_cache = SpriteCache()
+
+def build_paddle_sprite(color, width, height):
+    sprite = pygame.Surface((width + SHADOW_OFFSET, height + SHADOW_OFFSET), pygame.SRCALPHA)
+    pygame.draw.rect(sprite, SHADOW_COLOR, (SHADOW_OFFSET, SHADOW_OFFSET, width, height))
+    pygame.draw.rect(sprite, color, (0, 0, width, height))
+    return sprite
+
+def build_ball_sprite(color, radius):
+    # Sombra + três camadas de glow + bola, compostas num único sprite centrado em (2r, 2r)
+    size = radius * 4 + SHADOW_OFFSET
+    center = (radius * 2, radius * 2)
+    sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+    sprite.fill((*color, 0))
+    pygame.draw.circle(sprite, SHADOW_COLOR, (center[0] + SHADOW_OFFSET, center[1] + SHADOW_OFFSET), radius)
+    for i in range(3, 0, -1):
+        glow = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(glow, (*color, 50 * i), center, radius + i * 2)
+        sprite.blit(glow, (0, 0))
+    pygame.draw.circle(sprite, color, center, radius)
+    return sprite
+
+def build_powerup_sprite(pu_type, width, height):
+    sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+    pygame.draw.ellipse(sprite, POWERUP_COLORS[pu_type], (0, 0, width, height))
+    return sprite
+
+def build_rect_sprite(color, width, height):
+    sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+    sprite.fill(color)
+    return sprite
+
+# --- Cache de Texto ---
+# font.render é caro; as superfícies de texto ficam num LRU limitado com chave
+# (fonte, texto, cor, antialias). Textos numéricos que mudam a toda hora
+# (placar, cronômetro) são montados a partir de um atlas de glifos.
+class GlyphAtlas:
+    def __init__(self, font, color, antialias=True):
+        self.font = font
         self.color = color
+        self.antialias = antialias
+        self.glyphs = {}
+    def glyph(self, ch):
+        g = self.glyphs.get(ch)
+        if g is None:
+            g = self.font.render(ch, self.antialias, self.color)
+            self.glyphs[ch] = g
+        return g
+    def size(self, text):
+        return sum(self.glyph(ch).get_width() for ch in text), self.font.get_height()
+    def draw(self, surface, text, pos):
+        x, y = pos
+        blits = []
+        for ch in text:
+            g = self.glyph(ch)
+            blits.append((g, (x, y)))
+            x += g.get_width()
+        surface.blits(blits, doreturn=False)
+        return pygame.Rect(pos[0], y, x - pos[0], self.font.get_height())
+
+class TextCache:
+    def __init__(self, max_entries=256):
+        self.entries = OrderedDict()
+        self.atlases = {}
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        self.entries[key] = surf
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surf
+    def atlas(self, font, color, antialias=True):
+        key = (font, color, antialias)
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            atlas = self.atlases[key] = GlyphAtlas(font, color, antialias)
+        return atlas
+    def stats(self):
+        return {"entries": len(self.entries), "atlases": len(self.atlases),
+                "hits": self.hits, "misses": self.misses}
+
+text_cache = TextCache()
+
+# Superfície de tela inteira reaproveitada enquanto a chave de estado não muda
+class RetainedView:
+    def __init__(self):
+        self.key = None
+        self.surface = None
+    def invalidate(self):
+        self.key = None
+    def draw(self, surface, key, render, force=True):
+        # Devolve se desenhou; com force=False só copia para a tela quando o conteúdo mudou
+        if self.surface is None or self.surface.get_size() != surface.get_size():
+            self.surface = pygame.Surface(surface.get_size())
+            self.key = None
+        changed = key != self.key
+        if changed:
+            render(self.surface)
+            self.key = key
+        if changed or force:
+            surface.blit(self.surface, (0, 0))
+        return changed or force
+
+# --- Cenas ---
+# Cada tela (menu, configurações, estatísticas, partida, replay) é uma cena:
+# o SceneManager chama enter/exit na troca e handle_event/update/draw a cada
+# frame. A transição é um crossfade por tempo dentro do loop normal: o último
+# frame da cena que saiu fica congelado e é desenhado por cima da nova com
+# alpha caindo até zero, sem segurar eventos nem o relógio da partida.
+TRANSITION = 0.4  # s de crossfade
+
+class Scene:
+    # static: a cena só muda com eventos e desenha num RetainedView;
+    # draw(surface, force) devolve se a tela mudou, e frames sem mudança não são apresentados
+    static = False
+    def enter(self):
+        pass
+    def exit(self):
+        pass
+    def handle_event(self, event):
+        return None
     def update(self, dt):
-        self.age += dt
-        self.pos += self.vel * dt
-    def draw(self, surface):
-        if self.age < self.lifetime:
-            alpha = max(0, int(255 * (1 - self.age / self.lifetime)))
-            s = pygame.Surface((self.size, self.size), pygame.SRCALPHA)
-            s.fill((*self.color, alpha))
-            surface.blit(s, (int(self.pos[0]), int(self.pos[1])))
+        pass
+    def draw(self, surface, force=True):
+        return False  # nada desenhado, nada a apresentar
+
+class SceneManager:
+    def __init__(self, surface, duration=TRANSITION):
+        self.surface = surface
+        self.duration = duration
+        self.scene = None
+        self.previous = None  # último frame da cena anterior, durante o crossfade
+        self.elapsed = 0.0
+        self.stale = True  # a tela não mostra a cena atual inteira: desenha mesmo se estática
+    @property
+    def transitioning(self):
+        return self.previous is not None
+    def switch(self, scene, transition=True):
+        if self.scene is not None:
+            self.scene.exit()
+            if transition:
+                self.previous = self.surface.copy()
+                self.elapsed = 0.0
+        self.scene = scene
+        self.stale = True
+        scene.enter()
+    def invalidate(self):
+        self.stale = True
+    def update(self, dt):
+        if self.previous is not None:
+            self.elapsed += dt
+            if self.elapsed >= self.duration:
+                self.previous = None
+                self.stale = True
+        self.scene.update(dt)
+    def draw(self, force=False):
+        # Devolve se a tela mudou (se o frame precisa ser apresentado)
+        force = force or self.stale or self.previous is not None
+        scene = self.scene
+        if scene.static:
+            drawn = scene.draw(self.surface, force)
+        else:
+            scene.draw(self.surface)
+            drawn = True
+        if self.previous is not None:
+            self.previous.set_alpha(int(255 * (1 - self.elapsed / self.duration)))
+            self.surface.blit(self.previous, (0, 0))
+        self.stale = False
+        return drawn
+    def close(self):
+        if self.scene is not None:
+            self.scene.exit()
+            self.scene = None
+
+# --- Renderização por Retângulos Sujos (opcional, --dirty-rects) ---
+# Cada elemento do frame informa (retângulo, identidade do conteúdo, função de
+# desenho). Só as áreas que mudaram desde o frame anterior têm o fundo
+# restaurado, são redesenhadas (com clip) e enviadas com display.update(rects).
+# Se a área suja passar de 'threshold' da tela, cai para um flip completo.
+def merge_rects(rects, bounds):
+    merged = []
+    for r in rects:
+        r = r.clip(bounds)
+        if r.width == 0 or r.height == 0:
+            continue
+        i = r.collidelist(merged)
+        while i != -1:
+            r = r.union(merged.pop(i))
+            i = r.collidelist(merged)
+        merged.append(r)
+    return merged
 
+class DirtyRectRenderer:
+    def __init__(self, threshold=0.5):
+        self.threshold = threshold
+        self.prev = []
+        self.full_redraw = True
+        self.frames = 0
+        self.full_frames = 0
+        self.last_pixels = 0
+        self.total_pixels = 0
+    def invalidate(self):
+        self.full_redraw = True
+    def render(self, surface, background, items):
+        bounds = surface.get_rect()
+        curr = [(tuple(rect), tag) for rect, tag, _ in items]
+        dirty = None
+        if not self.full_redraw:
+            prev_set, curr_set = set(self.prev), set(curr)
+            changed = [pygame.Rect(r) for r, tag in self.prev if (r, tag) not in curr_set]
+            changed += [pygame.Rect(r) for r, tag in curr if (r, tag) not in prev_set]
+            dirty = merge_rects(changed, bounds)
+            if sum(r.width * r.height for r in dirty) > self.threshold * bounds.width * bounds.height:
+                dirty = None
+        self.prev = curr
+        self.full_redraw = False
+        self.frames += 1
+        if dirty is None:
+            surface.fill(background)
+            for _, _, draw in items:
+                draw(surface)
+            pygame.display.flip()
+            self.full_frames += 1
+            pixels = bounds.width * bounds.height
+        else:
+            for rect in dirty:
+                surface.set_clip(rect)
+                surface.fill(background)
+                for item_rect, _, draw in items:
+                    if rect.colliderect(item_rect):
+                        draw(surface)
+            surface.set_clip(None)
+            if dirty:
+                pygame.display.update(dirty)
+            pixels = sum(r.width * r.height for r in dirty)
+        self.last_pixels = pixels
+        self.total_pixels += pixels
+    def stats(self):
+        avg = self.total_pixels / self.frames if self.frames else 0
+        return {"frames": self.frames, "full_frames": self.full_frames,
+                "last_pixels": self.last_pixels, "avg_pixels": avg}
+
+# --- Sistema de Partículas Vetorizado (structure-of-arrays) ---
+# Todas as partículas vivem em arrays NumPy contíguos e ficam compactadas em
+# [0, count): spawn, envelhecimento e descarte são operações em lote.
 class ParticlePool:
-    def __init__(self, max_particles=500):
-        self.pool = [Particle((0, 0), current_theme_color["particle"]) for _ in range(max_particles)]
-        self.index = 0
+    MIN_SIZE, MAX_SIZE = 2, 5
+    def __init__(self, max_particles=20000, seed=None):
         self.max_particles = max_particles
+        self.pos = np.zeros((max_particles, 2), dtype=np.float32)
+        self.vel = np.zeros((max_particles, 2), dtype=np.float32)
+        self.age = np.zeros(max_particles, dtype=np.float32)
+        self.lifetime = np.ones(max_particles, dtype=np.float32)
+        self.size = np.zeros(max_particles, dtype=np.int16)
+        self.color = np.zeros(max_particles, dtype=np.int16)  # índice na paleta
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+        self.palette = []        # cores (r, g, b) em uso
+        self.palette_index = {}  # cor -> índice na paleta
+        # Deslocamentos (dx, dy) dos pixels do quadrado de cada tamanho
+        self.offsets = {size: np.divmod(np.arange(size * size, dtype=np.int32), size)
+                        for size in range(self.MIN_SIZE, self.MAX_SIZE + 1)}
+        self.ramps = {}  # índice na paleta -> paleta de 8 bits da camada (ver draw)
+    def _color_index(self, color):
+        color = tuple(color)
+        idx = self.palette_index.get(color)
+        if idx is None:
+            idx = len(self.palette)
+            self.palette.append(color)
+            self.palette_index[color] = idx
+        return idx
+    def _compact(self, keep, start=0):
+        # Move as partículas selecionadas por 'keep' (máscara sobre [start, count);
+        # None = todas) para o início
+        if keep is None:
+            n = self.count - start
+            for arr in (self.pos, self.vel, self.age, self.lifetime, self.size, self.color):
+                arr[:n] = arr[start:self.count]  # cópia contígua, sem indexar por máscara
+        else:
+            n = int(np.count_nonzero(keep))
+            for arr in (self.pos, self.vel, self.age, self.lifetime, self.size, self.color):
+                arr[:n] = arr[start:self.count][keep]
+        self.count = n
     def spawn(self, pos, num=20):
-        for _ in range(num):
-            self.pool[self.index].reset(pos, current_theme_color["particle"])
-            self.index = (self.index + 1) % self.max_particles
+        num = min(num, self.max_particles)
+        overflow = self.count + num - self.max_particles
+        if overflow > 0:
+            # Pool cheio: descarta as partículas mais antigas (ficam no início)
+            self._compact(None, start=overflow)
+        s = slice(self.count, self.count + num)
+        angle = self.rng.uniform(0, 2 * math.pi, num)
+        speed = self.rng.uniform(50, 200, num)
+        self.pos[s] = pos[0], pos[1]
+        self.vel[s, 0] = np.cos(angle) * speed
+        self.vel[s, 1] = np.sin(angle) * speed
+        self.age[s] = 0
+        self.lifetime[s] = self.rng.uniform(0.5, 1.0, num)
+        self.size[s] = self.rng.integers(self.MIN_SIZE, self.MAX_SIZE + 1, num)
+        self.color[s] = self._color_index(current_theme_color["particle"])
+        self.count += num
     def update(self, dt):
-        for p in self.pool:
-            p.update(dt)
+        n = self.count
+        if n == 0:
+            return
+        self.age[:n] += dt
+        self.pos[:n] += self.vel[:n] * dt
+        alive = self.age[:n] < self.lifetime[:n]
+        if not alive.all():
+            self._compact(alive)
+    def clear(self):
+        self.count = 0
+    def bounds(self):
+        n = self.count
+        if n == 0:
+            return pygame.Rect(0, 0, 0, 0)
+        lo = self.pos[:n].min(axis=0).astype(np.int32)
+        hi = self.pos[:n].max(axis=0).astype(np.int32) + self.MAX_SIZE + 1
+        return pygame.Rect(int(lo[0]), int(lo[1]), int(hi[0] - lo[0]), int(hi[1] - lo[1]))
     def draw(self, surface):
-        for p in self.pool:
-            if p.age < p.lifetime:
-                p.draw(surface)
+        # Sem um blit por partícula: cada uma é um quadrado size x size e um
+        # bincount por cor soma o alpha de todas nos pixels de uma camada de 8
+        # bits, cuja paleta vai do preto à cor. A camada entra na tela num único
+        # blit aditivo: no fundo escuro fica igual ao blit com alpha.
+        n = self.count
+        if n == 0:
+            return
+        area = self.bounds().clip(surface.get_rect())
+        if area.w == 0 or area.h == 0:
+            return
+        # Origem da camada MAX_SIZE antes da área: quem começa fora mas aparece em parte cabe nela
+        pad = self.MAX_SIZE
+        w, h = area.w + 2 * pad, area.h + 2 * pad
+        x = self.pos[:n, 0].astype(np.int32) - (area.x - pad)
+        y = self.pos[:n, 1].astype(np.int32) - (area.y - pad)
+        visible = (x >= 0) & (x < w - pad) & (y >= 0) & (y < h - pad)
+        alpha = np.clip(1 - self.age[:n] / self.lifetime[:n], 0, 1)
+        pixels, owners = [], []
+        for size, (dx, dy) in self.offsets.items():
+            sel = np.flatnonzero(visible & (self.size[:n] == size))
+            pixels.append(((x[sel] * h + y[sel])[:, None] + (dx * h + dy)).ravel())
+            owners.append(np.repeat(sel, size * size))
+        pixels = np.concatenate(pixels)
+        owners = np.concatenate(owners)
+        indices = np.unique(self.color[:n])
+        colors = self.color[:n][owners] if len(indices) > 1 else None
+        for index in indices:
+            sel = slice(None) if colors is None else colors == index
+            coverage = np.bincount(pixels[sel], weights=alpha[owners[sel]], minlength=w * h)
+            layer = pygame.surfarray.make_surface((np.minimum(coverage, 1) * 255).astype(np.uint8).reshape(w, h))
+            layer.set_palette(self.ramp(index))
+            if pygame.display.get_surface() is not None:
+                layer = layer.convert()  # o blit aditivo de 8 bits direto é bem mais lento
+            surface.blit(layer, (area.x - pad, area.y - pad), special_flags=pygame.BLEND_ADD)
+    def ramp(self, index):
+        # Paleta da camada: nível de alpha (0-255) -> cor da paleta com esse alpha
+        ramp = self.ramps.get(index)
+        if ramp is None:
+            r, g, b = self.palette[index]
+            ramp = self.ramps[index] = [(r * i // 255, g * i // 255, b * i // 255) for i in range(256)]
+        return ramp
 
 particle_pool = ParticlePool()
 
-# --- Classes de Jogo ---
-class Paddle:
-    def __init__(self, x, y, width, height, speed):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.speed = speed
-    def move(self, dy):
-        self.rect.y += dy
-        if self.rect.top < 0:
-            self.rect.top = 0
-        if self.rect.bottom > HEIGHT:
-            self.rect.bottom = HEIGHT
-    def draw(self, surface, theme):
-        shadow = self.rect.copy()
-        shadow.x += 5; shadow.y += 5
-        pygame.draw.rect(surface, (50, 50, 50), shadow)
-        pygame.draw.rect(surface, theme["paddle"], self.rect)
-
-class Ball:
-    def __init__(self, x, y, radius, speed):
-        self.radius = radius
-        self.init_speed = speed
-        self.speed = speed
-        self.pos = np.array([x, y], dtype=float)
-        self.spin = 0  # Efeito de rotação (spin)
-        self.reset_direction()
-    def reset_direction(self):
-        angle = random.uniform(-math.pi/4, math.pi/4)
-        direction = random.choice([-1, 1])
-        self.vel = np.array([direction * self.speed * math.cos(angle),
-                             self.speed * math.sin(angle)], dtype=float)
-    def update(self, dt):
-        self.vel[1] += self.spin * dt
-        self.pos += self.vel * dt
-        self.spin *= 0.98  # Decaimento do spin
-        self.speed *= 0.999  # Atrito leve
-        if self.pos[1] - self.radius <= 0 or self.pos[1] + self.radius >= HEIGHT:
-            self.vel[1] = -self.vel[1]
-            particle_pool.spawn(self.pos, 15)
-            wall_beep.play()
-    def draw(self, surface, theme):
-        shadow_pos = (int(self.pos[0] + 5), int(self.pos[1] + 5))
-        pygame.draw.circle(surface, (50, 50, 50), shadow_pos, self.radius)
-        for i in range(3, 0, -1):
-            alpha = max(0, 50 * i)
-            glow_surface = pygame.Surface((self.radius * 4, self.radius * 4), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surface, (*theme["ball"], alpha), (self.radius * 2, self.radius * 2), self.radius + i * 2)
-            surface.blit(glow_surface, (int(self.pos[0] - self.radius * 2), int(self.pos[1] - self.radius * 2)))
-        pygame.draw.circle(surface, theme["ball"], (int(self.pos[0]), int(self.pos[1])), self.radius)
-    def reset(self):
-        self.pos = np.array([WIDTH / 2, HEIGHT / 2], dtype=float)
-        self.speed *= 1.05
-        self.reset_direction()
-
-class PowerUp:
-    def __init__(self, type, rect):
-        self.type = type  # "enlarge", "shrink", "speed" ou "slow"
-        self.rect = rect
-        self.active = True
-    def draw(self, surface, theme):
-        if self.type == "enlarge":
-            color = (0, 255, 0)
-        elif self.type == "shrink":
-            color = (255, 0, 0)
-        elif self.type == "speed":
-            color = (0, 0, 255)
-        elif self.type == "slow":
-            color = (255, 255, 0)
-        pygame.draw.ellipse(surface, color, self.rect)
-
-class Obstacle:
-    def __init__(self, rect):
-        self.rect = rect
-    def draw(self, surface, theme):
-        pygame.draw.rect(surface, theme["obstacle"], self.rect)
-
-# Classe para gravação e replay
+# --- Desenho das Entidades ---
+# Raquetes, bola, power-ups e obstáculos são estado puro do engine; aqui ficam
+# seus retângulos de tela e sprites.
+def to_screen_rect(rect):
+    return pygame.Rect(int(rect.x), int(rect.y), int(rect.width), int(rect.height))
+
+def paddle_bounds(paddle, y=None):
+    rect = to_screen_rect(paddle.rect)
+    if y is not None:
+        rect.y = int(y)
+    return pygame.Rect(rect.x, rect.y, rect.width + SHADOW_OFFSET, rect.height + SHADOW_OFFSET)
+
+def draw_paddle(surface, paddle, theme, y=None):
+    rect = to_screen_rect(paddle.rect)
+    if y is not None:
+        rect.y = int(y)
+    size = rect.size
+    # Altura mudou por enlarge/shrink: o sprite é refeito sob demanda. O dono é o
+    # lado do campo, não o objeto (raquetes são recriadas e id() é reaproveitado)
+    slot = "paddle_left" if paddle.rect.centerx < WIDTH / 2 else "paddle_right"
+    sprite = sprite_cache.get(("paddle", theme["paddle"], size),
+                              lambda: build_paddle_sprite(theme["paddle"], *size), slot=slot)
+    surface.blit(sprite, rect.topleft)
+
+def ball_bounds(ball, pos=None):
+    pos = ball.pos if pos is None else pos
+    size = ball.radius * 4 + SHADOW_OFFSET
+    return pygame.Rect(int(pos[0] - ball.radius * 2), int(pos[1] - ball.radius * 2), size, size)
+
+def draw_ball(surface, ball, theme, pos=None):
+    pos = ball.pos if pos is None else pos
+    sprite = sprite_cache.get(("ball", theme["ball"], ball.radius),
+                              lambda: build_ball_sprite(theme["ball"], ball.radius))
+    surface.blit(sprite, (int(pos[0] - ball.radius * 2), int(pos[1] - ball.radius * 2)))
+
+def draw_balls(surface, positions, radius, theme):
+    # Várias bolas (arena) com o mesmo sprite em cache, num único blits
+    sprite = sprite_cache.get(("ball", theme["ball"], radius), lambda: build_ball_sprite(theme["ball"], radius))
+    coords = (positions - radius * 2).astype(np.int32).tolist()
+    surface.blits([(sprite, p) for p in coords], doreturn=False)
+
+def powerup_bounds(pu):
+    return to_screen_rect(pu.rect)
+
+def draw_powerup(surface, pu, theme):
+    rect = to_screen_rect(pu.rect)
+    sprite = sprite_cache.get(("powerup", pu.type, rect.size),
+                              lambda: build_powerup_sprite(pu.type, *rect.size))
+    surface.blit(sprite, rect.topleft)
+
+def obstacle_bounds(obs):
+    return to_screen_rect(obs.rect)
+
+def draw_obstacle(surface, obs, theme):
+    rect = to_screen_rect(obs.rect)
+    sprite = sprite_cache.get(("obstacle", theme["obstacle"], rect.size),
+                              lambda: build_rect_sprite(theme["obstacle"], *rect.size))
+    surface.blit(sprite, rect.topleft)
+
+# Classe para gravação e replay: a partida vai tick a tick para um arquivo
+# binário (replay.py), em vez de crescer numa lista em memória
+REPLAY_FILE = "replay.rpl"
+
 class ReplayRecorder:
-    def __init__(self):
-        self.records = []
+    def __init__(self, path=REPLAY_FILE, delta=False):
+        self.path = path
+        self.delta = delta  # grava em delta + varint (arquivo menor)
+        self.writer = None
         self.recording = True
-    def record(self, state):
-        if self.recording:
-            self.records.append(state)
-    def reset(self):
-        self.records = []
-    # Agora o método play recebe também o objeto game
-    def play(self, surface, game, theme):
-        for state in self.records:
-            ball_pos, ball_vel, lp_y, rp_y, score_left, score_right = state
-            ball.pos = np.array(ball_pos)
-            left_paddle.rect.y = int(lp_y)
-            right_paddle.rect.y = int(rp_y)
-            game.draw(surface)
-            pygame.display.flip()
-            pygame.time.delay(50)
+    def start(self, match, theme_name):
+        self.stop()
+        header = ReplayHeader.for_match(match, theme_name, delta=self.delta)
+        self.writer = ReplayWriter(self.path, header)
+    def record(self, match):
+        if self.recording and self.writer:
+            self.writer.record(match)
+    def stop(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+# Tela de replay: toca o arquivo gravado um passo por frame do loop principal,
+# desenhando a partir de objetos próprios (nunca os da partida ao vivo)
+class ReplayViewer(Scene):
+    def __init__(self, path, theme):
+        self.theme = theme
+        self.reader = None
+        self.player = None
+        if os.path.exists(path):
+            # Replay truncado ou de outro formato: mostra a tela de "nenhum replay"
+            try:
+                self.reader = ReplayReader(path)
+                self.player = ReplayPlayer(self.reader)
+            except (ValueError, struct.error, IndexError) as e:
+                print("Replay ilegível:", e)
+                self.close()
+                self.reader = None
+                self.player = None
+            else:
+                self.theme = themes.get(self.reader.header.theme, theme)
+        self.ball = engine.Ball(WIDTH / 2, HEIGHT / 2, 10, 0)
+        self.left_paddle = engine.Paddle(20, 0, 10, 100, 0, HEIGHT)
+        self.right_paddle = engine.Paddle(WIDTH - 30, 0, 10, 100, 0, HEIGHT)
+    def handle_event(self, event):
+        if event.type != pygame.KEYDOWN:
+            return None
+        if event.key in (pygame.K_ESCAPE, pygame.K_RETURN, pygame.K_r):
+            return "Back"
+        player = self.player
+        if player is None:
+            return None
+        if event.key == pygame.K_SPACE:
+            player.toggle_pause()
+        elif event.key == pygame.K_RIGHT:
+            player.seek_seconds(5)
+        elif event.key == pygame.K_LEFT:
+            player.seek_seconds(-5)
+        elif event.key == pygame.K_PERIOD:
+            player.step(1)
+        elif event.key == pygame.K_COMMA:
+            player.step(-1)
+        elif event.key == pygame.K_UP:
+            player.change_speed(1)
+        elif event.key == pygame.K_DOWN:
+            player.change_speed(-1)
+        elif event.key == pygame.K_HOME:
+            player.seek(player.first_tick)
+        return None
+    def update(self, dt):
+        if self.player:
+            self.player.update(dt)
+    def draw(self, surface):
+        theme = self.theme
+        surface.fill(theme["background"])
+        frame = self.player.frame() if self.player else None
+        if frame is None:
+            text = text_cache.render(font_medium, "Nenhum replay gravado", theme["text"])
+            surface.blit(text, ((WIDTH - text.get_width()) // 2, HEIGHT // 2))
+            return
+        for kind, rect in frame.entities:
+            if kind == OBSTACLE:
+                draw_obstacle(surface, engine.Obstacle(engine.Rect(*rect)), theme)
+            else:
+                draw_powerup(surface, engine.PowerUp(engine.POWERUP_TYPES[kind - 1], engine.Rect(*rect)), theme)
+        for paddle, y, h in ((self.left_paddle, frame.paddle_y[0], frame.paddle_h[0]),
+                             (self.right_paddle, frame.paddle_y[1], frame.paddle_h[1])):
+            paddle.rect.height = h
+            paddle.rect.y = y
+            draw_paddle(surface, paddle, theme)
+        draw_ball(surface, self.ball, theme, frame.ball)
+        score_atlas = text_cache.atlas(font_medium, theme["text"])
+        score_str = f"{frame.score[0]}   :   {frame.score[1]}"
+        score_atlas.draw(surface, score_str, ((WIDTH - score_atlas.size(score_str)[0]) // 2, 20))
+        player = self.player
+        status_atlas = text_cache.atlas(font_small, theme["text"])
+        status = "REPLAY  %gx  %ds / %ds" % (player.speed, (frame.tick - player.first_tick) // player.tick_rate,
+                                            (player.last_tick - player.first_tick) // player.tick_rate)
+        if player.paused:
+            status += "  PAUSA"
+        status_atlas.draw(surface, status, (20, HEIGHT - 70))
+        status_atlas.draw(surface, "Espaço pausa  Setas busca/velocidade  , . quadro  ESC sai", (20, HEIGHT - 40))
+    def close(self):
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+            self.player = None
+    def exit(self):
+        self.close()
 
 replay_recorder = ReplayRecorder()
 
-class Game:
-    def __init__(self, mode, difficulty, gamemode, theme_name):
-        self.mode = mode  # "single" ou "multiplayer"
+# Atributo do Game que apenas repassa para o estado da simulação
+def sim_attr(name):
+    return property(lambda self: getattr(self.sim, name),
+                    lambda self, value: setattr(self.sim, name, value))
+
+# Adaptador pygame do engine.Match: lê teclado/mouse, transforma eventos da
+# simulação em sons e partículas e desenha o estado.
+MAX_FRAME_DT = 0.25  # um engasgo maior que isso não vira uma rajada de ticks
+
+class Game(Scene):
+    recording = True  # grava o replay (replay_recorder); cenas que só mostram estado alheio não gravam
+    score_left = sim_attr("score_left")
+    score_right = sim_attr("score_right")
+    paused = sim_attr("paused")
+    game_timer = sim_attr("game_timer")
+    def __init__(self, mode, difficulty, gamemode, theme_name, seed=None):
+        self.mode = mode  # "single", "multiplayer" ou "online"
         self.difficulty = difficulty  # "Easy", "Medium", "Hard"
         self.gamemode = gamemode  # "Classic", "Time Attack", "Survival", "Tournament"
+        self.theme_name = theme_name
         self.theme = themes[theme_name]
-        self.powerups = []
-        self.obstacles = []
-        self.last_hitter = None  # "left" ou "right"
-        self.tournament_target = 5
-        self.reset()
-        self.powerup_timer = 0
-        self.obstacle_timer = 0
-        self.game_timer = 0
-        self.stats = {"games": 0, "left_points": 0, "right_points": 0}
-        self.paused = False
+        self.sim = Match(mode, difficulty, gamemode, seed)
+        self.stats = self.sim.stats
+        self.input_log = InputLog.for_match(self.sim)
+        self.points = []  # (tick, lado: 0 esquerda, 1 direita) de cada ponto, para o histórico
+        self.accumulator = 0.0
+        self.prev_state = None  # estado do tick anterior, para interpolar o desenho
         self.volume = 0.5
         pygame.mixer.music.set_volume(self.volume)
-        self.recording = True
+        if self.recording:
+            replay_recorder.start(self.sim, theme_name)
     def reset(self):
-        global left_paddle, right_paddle, ball
-        paddle_width, paddle_height = 10, 100
-        paddle_speed = 300
-        left_paddle = Paddle(20, (HEIGHT - paddle_height) // 2, paddle_width, paddle_height, paddle_speed)
-        right_paddle = Paddle(WIDTH - 20 - paddle_width, (HEIGHT - paddle_height) // 2, paddle_width, paddle_height, paddle_speed)
-        ball = Ball(WIDTH / 2, HEIGHT / 2, 10, 300)
-        self.score_left = 0
-        self.score_right = 0
-        self.game_timer = 0
-        self.powerups.clear()
-        self.obstacles.clear()
-        self.last_hitter = None
-        replay_recorder.reset()
-    def update(self, dt):
-        if not self.paused:
-            if self.gamemode in ["Time Attack", "Tournament"]:
-                self.game_timer += dt
-            self.powerup_timer += dt
-            if self.powerup_timer > 10:
-                self.spawn_powerup()
-                self.powerup_timer = 0
-            if self.gamemode == "Survival":
-                self.obstacle_timer += dt
-                if self.obstacle_timer > 15:
-                    self.spawn_obstacle()
-                    self.obstacle_timer = 0
-            # Controle da raquete esquerda
+        self.sim.reset()
+        self.input_log = InputLog.for_match(self.sim)
+        self.points = []
+        self.accumulator = 0.0
+        self.prev_state = None
+        if self.recording:
+            replay_recorder.start(self.sim, self.theme_name)
+    def read_input(self):
+        # Converte teclado/mouse nos comandos de um tick
+        keys = pygame.key.get_pressed()
+        right = engine.IDLE
+        if mobile_mode:
+            mx, my = pygame.mouse.get_pos()
+            left = InputCommand(target_y=my)
+        else:
+            left = InputCommand(keys[controls["left_down"]] - keys[controls["left_up"]])
+        if self.mode == "multiplayer":
             if mobile_mode:
-                mx, my = pygame.mouse.get_pos()
-                left_paddle.rect.centery = my
+                if mx > WIDTH / 2:
+                    right = InputCommand(target_y=my)
             else:
-                keys = pygame.key.get_pressed()
-                if keys[controls["left_up"]]:
-                    left_paddle.move(-left_paddle.speed * dt)
-                if keys[controls["left_down"]]:
-                    left_paddle.move(left_paddle.speed * dt)
-            # Controle da raquete direita
-            if self.mode == "multiplayer":
-                if mobile_mode:
-                    mx, my = pygame.mouse.get_pos()
-                    if mx > WIDTH / 2:
-                        right_paddle.rect.centery = my
-                else:
-                    if keys[controls["right_up"]]:
-                        right_paddle.move(-right_paddle.speed * dt)
-                    if keys[controls["right_down"]]:
-                        right_paddle.move(right_paddle.speed * dt)
-            else:
-                # IA adaptativa
-                base_error = 10
-                score_diff = self.score_left - self.score_right
-                error_margin = max(0, base_error - score_diff)
-                ai_speed = 300 + 50 * abs(score_diff)
-                if ball.pos[1] < right_paddle.rect.centery - error_margin:
-                    right_paddle.move(-ai_speed * dt)
-                elif ball.pos[1] > right_paddle.rect.centery + error_margin:
-                    right_paddle.move(ai_speed * dt)
-            ball.update(dt)
-            ball_rect = pygame.Rect(int(ball.pos[0] - ball.radius), int(ball.pos[1] - ball.radius),
-                                    ball.radius * 2, ball.radius * 2)
-            if ball_rect.colliderect(left_paddle.rect) and ball.vel[0] < 0:
-                self.handle_paddle_collision(left_paddle)
-            if ball_rect.colliderect(right_paddle.rect) and ball.vel[0] > 0:
-                self.handle_paddle_collision(right_paddle)
-            for obs in self.obstacles:
-                if ball_rect.colliderect(obs.rect):
-                    ball.vel[0] = -ball.vel[0]
-                    particle_pool.spawn(ball.pos, 10)
-                    wall_beep.play()
-            for pu in self.powerups:
-                if pu.active and ball_rect.colliderect(pu.rect):
-                    self.apply_powerup(pu)
-                    pu.active = False
-                    particle_pool.spawn(ball.pos, 15)
-                    paddle_beep.play()
-            if ball.pos[0] - ball.radius < 0:
-                self.score_right += 1
-                self.stats["right_points"] += 1
-                score_beep.play()
-                ball.reset()
-            if ball.pos[0] + ball.radius > WIDTH:
-                self.score_left += 1
-                self.stats["left_points"] += 1
-                score_beep.play()
-                ball.reset()
-            if self.gamemode == "Tournament":
-                if self.score_left >= self.tournament_target or self.score_right >= self.tournament_target:
-                    self.paused = True
-            # Grava estado para replay
-            if self.recording:
-                state = (tuple(ball.pos), tuple(ball.vel), left_paddle.rect.y, right_paddle.rect.y,
-                         self.score_left, self.score_right)
-                replay_recorder.record(state)
+                right = InputCommand(keys[controls["right_down"]] - keys[controls["right_up"]])
+        return left, right
+    def update(self, dt):
+        # Acumulador de passo fixo: a física avança sempre em ticks de TICK_DT,
+        # não importa o dt do frame
+        if not self.paused:
+            self.accumulator += min(dt, MAX_FRAME_DT)
+            while self.accumulator >= TICK_DT and not self.paused:
+                self.accumulator -= TICK_DT
+                self.tick()
         particle_pool.update(dt)
-    def handle_paddle_collision(self, paddle):
-        relative_intersect = ball.pos[1] - paddle.rect.centery
-        normalized = relative_intersect / (paddle.rect.height / 2)
-        max_angle = math.radians(75)
-        angle = normalized * max_angle
-        speed = math.hypot(ball.vel[0], ball.vel[1])
-        if paddle == left_paddle:
-            ball.vel[0] = speed * math.cos(angle)
-            ball.vel[1] = speed * math.sin(angle)
-            if ball.vel[0] < 0:
-                ball.vel[0] = -ball.vel[0]
-            self.last_hitter = "left"
-            ball.spin = normalized * 50
-        else:
-            ball.vel[0] = -speed * math.cos(angle)
-            ball.vel[1] = speed * math.sin(angle)
-            if ball.vel[0] > 0:
-                ball.vel[0] = -ball.vel[0]
-            self.last_hitter = "right"
-            ball.spin = -normalized * 50
-        particle_pool.spawn(ball.pos, 20)
-        paddle_beep.play()
-    def spawn_powerup(self):
-        types = ["enlarge", "shrink", "speed", "slow"]
-        pu_type = random.choice(types)
-        size = 20
-        x = random.randint(WIDTH // 4, 3 * WIDTH // 4)
-        y = random.randint(HEIGHT // 4, 3 * HEIGHT // 4)
-        rect = pygame.Rect(x, y, size, size)
-        self.powerups.append(PowerUp(pu_type, rect))
-    def spawn_obstacle(self):
-        w_obs = 20; h_obs = 100
-        x = WIDTH // 2 - w_obs // 2
-        y = random.randint(HEIGHT // 4, 3 * HEIGHT // 4 - h_obs)
-        rect = pygame.Rect(x, y, w_obs, h_obs)
-        self.obstacles.append(Obstacle(rect))
-    def apply_powerup(self, pu):
-        if pu.type == "enlarge":
-            if self.last_hitter == "left":
-                left_paddle.rect.height = min(HEIGHT, left_paddle.rect.height + 20)
-            elif self.last_hitter == "right":
-                right_paddle.rect.height = min(HEIGHT, right_paddle.rect.height + 20)
-        elif pu.type == "shrink":
-            if self.last_hitter == "left":
-                right_paddle.rect.height = max(20, right_paddle.rect.height - 20)
-            elif self.last_hitter == "right":
-                left_paddle.rect.height = max(20, left_paddle.rect.height - 20)
-        elif pu.type == "speed":
-            ball.speed *= 1.2
-            ball.reset_direction()
-        elif pu.type == "slow":
-            ball.speed *= 0.8
-            ball.reset_direction()
-    def draw(self, surface):
-        surface.fill(self.theme["background"])
-        for obs in self.obstacles:
-            obs.draw(surface, self.theme)
-        for pu in self.powerups:
+    def tick(self):
+        sim = self.sim
+        self.prev_state = (sim.ball.pos.copy(), sim.left_paddle.rect.y, sim.right_paddle.rect.y)
+        left, right = self.read_input()
+        self.input_log.record(sim.tick, left, right)
+        events = sim.step(TICK_DT, left, right)
+        if any(event.kind == engine.SCORE for event in events):
+            self.prev_state = None  # bola voltou ao centro: não interpola o salto
+        self.handle_events(events)
+        # Grava estado para replay
+        if self.recording:
+            replay_recorder.record(sim)
+    def render_state(self):
+        # Posições de desenho interpoladas entre o tick anterior e o atual
+        sim = self.sim
+        current = (sim.ball.pos, sim.left_paddle.rect.y, sim.right_paddle.rect.y)
+        if self.prev_state is None or self.paused:
+            return current
+        alpha = self.accumulator / TICK_DT
+        (prev_pos, prev_left, prev_right), (pos, left, right) = self.prev_state, current
+        return (prev_pos + (pos - prev_pos) * alpha,
+                prev_left + (left - prev_left) * alpha,
+                prev_right + (right - prev_right) * alpha)
+    def handle_events(self, events):
+        for event in events:
+            pos = (event.x, event.y)
+            if event.kind == engine.WALL_HIT:
+                particle_pool.spawn(pos, 15)
+                wall_beep.play()
+            elif event.kind == engine.PADDLE_HIT:
+                particle_pool.spawn(pos, 20)
+                paddle_beep.play()
+            elif event.kind == engine.OBSTACLE_HIT:
+                particle_pool.spawn(pos, 10)
+                wall_beep.play()
+            elif event.kind == engine.POWERUP_HIT:
+                particle_pool.spawn(pos, 15)
+                paddle_beep.play()
+            elif event.kind == engine.SCORE:
+                self.points.append((self.sim.tick, 0 if event.side == "left" else 1))
+                score_beep.play()
+    def handle_event(self, event):
+        # Teclas da partida (os eventos da simulação passam por handle_events)
+        if event.type != pygame.KEYDOWN:
+            return None
+        if event.key == pygame.K_p:
+            self.paused = not self.paused
+        elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.volume = max(0, self.volume - 0.1)
+            pygame.mixer.music.set_volume(self.volume)
+        elif event.key in (pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.volume = min(1, self.volume + 0.1)
+            pygame.mixer.music.set_volume(self.volume)
+        elif event.key == pygame.K_t:
+            share_on_social_media(self.score_left, self.score_right)
+        elif event.key == pygame.K_r:
+            return "Replay"
+        elif event.key == pygame.K_ESCAPE:
+            return "Back"
+        return None
+    def record_stats(self, store):
+        # Fim da partida: só enfileira, quem grava é a thread do StatsStore
+        sim = self.sim
+        if sim.tick:
+            store.record_match(self.mode, self.gamemode, self.difficulty, sim.score_left, sim.score_right,
+                               sim.tick / engine.TICK_RATE, sim.seed, self.points)
+    def drawables(self):
+        # (retângulo, identidade do conteúdo, função de desenho) de cada elemento, na ordem de pintura
+        theme = self.theme
+        sim = self.sim
+        items = []
+        for obs in sim.obstacles:
+            items.append((obstacle_bounds(obs), "obstacle", lambda s, o=obs: draw_obstacle(s, o, theme)))
+        for pu in sim.powerups:
             if pu.active:
-                pu.draw(surface, self.theme)
-        left_paddle.draw(surface, self.theme)
-        right_paddle.draw(surface, self.theme)
-        ball.draw(surface, self.theme)
-        particle_pool.draw(surface)
-        score_text = font_medium.render(f"{self.score_left}   :   {self.score_right}", True, self.theme["text"])
-        surface.blit(score_text, ((WIDTH - score_text.get_width()) // 2, 20))
+                items.append((powerup_bounds(pu), pu.type, lambda s, p=pu: draw_powerup(s, p, theme)))
+        ball_pos, left_y, right_y = self.render_state()
+        for paddle, y in ((sim.left_paddle, left_y), (sim.right_paddle, right_y)):
+            items.append((paddle_bounds(paddle, y), "paddle", lambda s, p=paddle, y=y: draw_paddle(s, p, theme, y)))
+        items.append((ball_bounds(sim.ball, ball_pos), "ball", lambda s: draw_ball(s, sim.ball, theme, ball_pos)))
+        if particle_pool.count:
+            # Partículas mudam todo frame: identidade nova força a área a ficar suja
+            items.append((particle_pool.bounds(), object(), particle_pool.draw))
+        score_atlas = text_cache.atlas(font_medium, theme["text"])
+        score_str = f"{self.score_left}   :   {self.score_right}"
+        score_w, score_h = score_atlas.size(score_str)
+        score_pos = ((WIDTH - score_w) // 2, 20)
+        items.append((pygame.Rect(score_pos, (score_w, score_h)), score_str,
+                      lambda s: score_atlas.draw(s, score_str, score_pos)))
         if self.gamemode in ["Time Attack", "Tournament"]:
-            timer_text = font_small.render(f"Tempo: {int(self.game_timer)}s", True, self.theme["text"])
-            surface.blit(timer_text, (WIDTH - timer_text.get_width() - 20, 20))
+            timer_atlas = text_cache.atlas(font_small, theme["text"])
+            timer_str = f"Tempo: {int(self.game_timer)}s"
+            timer_w, timer_h = timer_atlas.size(timer_str)
+            timer_pos = (WIDTH - timer_w - 20, 20)
+            items.append((pygame.Rect(timer_pos, (timer_w, timer_h)), timer_str,
+                          lambda s: timer_atlas.draw(s, timer_str, timer_pos)))
+        if self.paused:
+            pause_text = text_cache.render(font_large, "PAUSA", theme["text"])
+            pause_pos = ((WIDTH - pause_text.get_width()) // 2, HEIGHT // 2)
+            items.append((pause_text.get_rect(topleft=pause_pos), "PAUSA",
+                          lambda s: s.blit(pause_text, pause_pos)))
+        return items
+    def draw(self, surface):
+        surface.fill(self.theme["background"])
+        for _, _, draw in self.drawables():
+            draw(surface)
+
+# --- Arena com Várias Bolas ---
+# Adaptador pygame do arena.Arena: o jogador fica com a raquete esquerda e a IA
+# com a direita, seguindo a bola mais ameaçadora. Sem replay nem estatísticas.
+class ArenaGame(Scene):
+    def __init__(self, balls, difficulty, theme_name, seed=None, obstacles=0, ai_sides=(False, True)):
+        self.theme = themes[theme_name]
+        self.sim = Arena(balls, difficulty, seed, ai_sides, obstacles)
+        self.accumulator = 0.0
+    def handle_event(self, event):
+        if event.type != pygame.KEYDOWN:
+            return None
+        if event.key == pygame.K_p:
+            self.sim.paused = not self.sim.paused
+        elif event.key == pygame.K_ESCAPE:
+            return "Back"
+        return None
+    def read_input(self):
+        if mobile_mode:
+            return InputCommand(target_y=pygame.mouse.get_pos()[1])
+        keys = pygame.key.get_pressed()
+        return InputCommand(keys[controls["left_down"]] - keys[controls["left_up"]])
+    def update(self, dt):
+        if not self.sim.paused:
+            self.accumulator += min(dt, MAX_FRAME_DT)
+            while self.accumulator >= TICK_DT:
+                self.accumulator -= TICK_DT
+                self.tick()
+        particle_pool.update(dt)
+    def tick(self):
+        events = self.sim.step(TICK_DT, self.read_input())
+        # Um som por tipo de evento e por tick: com centenas de bolas eles chegam em rajadas
+        kinds = set()
+        for event in events:
+            if event.kind == engine.PADDLE_HIT:
+                particle_pool.spawn((event.x, event.y), 20)
+            elif event.kind == engine.OBSTACLE_HIT:
+                particle_pool.spawn((event.x, event.y), 10)
+            kinds.add(event.kind)
+        if engine.PADDLE_HIT in kinds:
+            paddle_beep.play()
+        if engine.OBSTACLE_HIT in kinds:
+            wall_beep.play()
+        if engine.SCORE in kinds:
+            score_beep.play()
+    def draw(self, surface):
+        theme = self.theme
+        sim = self.sim
+        surface.fill(theme["background"])
+        for obs in sim.obstacles:
+            draw_obstacle(surface, obs, theme)
+        for paddle in sim.paddles:
+            draw_paddle(surface, paddle, theme)
+        draw_balls(surface, sim.pos, sim.radius, theme)
+        if particle_pool.count:
+            particle_pool.draw(surface)
+        score_atlas = text_cache.atlas(font_medium, theme["text"])
+        score_str = f"{sim.score_left}   :   {sim.score_right}"
+        score_atlas.draw(surface, score_str, ((WIDTH - score_atlas.size(score_str)[0]) // 2, 20))
+        text_cache.atlas(font_small, theme["text"]).draw(surface, f"{sim.n} bolas", (20, HEIGHT - 40))
+        if sim.paused:
+            pause_text = text_cache.render(font_large, "PAUSA", theme["text"])
+            surface.blit(pause_text, ((WIDTH - pause_text.get_width()) // 2, HEIGHT // 2))
 
 # --- Modo Online com Interpolação e Tratamento de Erros ---
 class OnlineGame(Game):
-    def __init__(self, is_host, ip_address, port, difficulty, gamemode, theme_name):
+    SEND_INTERVAL = 1 / 60  # snapshots (host) e entradas (cliente) por segundo
+    PING_INTERVAL = 1.0
+    MAX_INPUT_BATCH = 32  # no UDP cada pacote repete as entradas ainda não confirmadas
+    MAX_RESIMULATION = 60  # ticks que a bola pode ser re-simulada a partir de um snapshot
+    INPUT_SLACK = 1  # host: entradas do cliente que podem esperar na fila; as mais velhas entram juntas
+    def __init__(self, is_host, ip_address, port, difficulty, gamemode, theme_name, transport="tcp",
+                 interp_delay=0.1, max_extrapolation=0.05):
+        # Só o host grava: o estado do cliente é previsão e o replay do jogador fica intacto
+        self.recording = self.recording and is_host
         super().__init__("online", difficulty, gamemode, theme_name)
         self.is_host = is_host
         self.ip_address = ip_address
         self.port = port
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.settimeout(0.1)
+        self.transport_kind = transport  # "tcp" ou "udp"
+        self.transport = None  # criado na thread de rede, depois do handshake
         self.running_network = True
-        if self.is_host:
-            self.sock.bind(('', self.port))
-            self.sock.listen(1)
-            print("Aguardando conexão de um cliente...")
-            try:
-                self.conn, addr = self.sock.accept()
-                print("Conectado com", addr)
-            except Exception as e:
-                print("Erro ao aceitar conexão:", e)
-        else:
-            try:
-                self.sock.connect((self.ip_address, self.port))
-                self.conn = self.sock
-            except Exception as e:
-                print("Erro ao conectar:", e)
-        self.current_state = None
-        self.interp_factor = 0.1
+        # deque: uma thread só faz append e a outra só popleft, sem lock
+        self.remote_inputs = deque(maxlen=32)  # host: (seq, comando) do cliente ainda não aplicados
+        self.last_input_seq = 0  # host: sequência da última entrada recebida
+        self.acked_input = 0  # host: sequência da última entrada aplicada (vai no snapshot)
+        self.outgoing_events = deque()  # host: eventos do tick a repassar ao cliente
+        self.incoming_events = deque()  # cliente: eventos recebidos, tocados no loop principal
+        # As threads nunca mexem no mesmo objeto da simulação: o host publica o
+        # estado capturado (statesync.State, imutável) a cada tick e a thread de
+        # rede só codifica e envia o mais recente; no cliente a thread de rede
+        # decodifica e publica o que chega e o loop principal consome uma vez por frame.
+        self.published = None
+        self.encoder = statesync.Encoder()  # host: deltas contra o último estado confirmado
+        self.snapshot_ack = 0  # host: tick do último estado que o cliente decodificou
+        self.decoder = statesync.Decoder()  # cliente
+        self.snapshots = netcode.SnapshotExchange()  # cliente: (hora de chegada, tick, estado)
+        self.remote_tick = 0  # cliente: último tick decodificado, vai no cabeçalho como confirmação
+        self.stale_seen = 0
+        self.show_stats = False
+        # Cliente: raquete direita prevista, esquerda interpolada, bola re-simulada
+        self.inputs = netcode.InputHistory()
+        self.last_sent_input = 0
+        self.host_clock = netcode.HostClock()
+        self.remote_paddle = netcode.SnapshotBuffer(interp_delay, max_extrapolation)
+        self.rtt = None
+        self.last_ping = 0.0
         self.network_thread = threading.Thread(target=self.network_loop, daemon=True)
         self.network_thread.start()
+    def read_input(self):
+        left, right = super().read_input()
+        if not self.is_host:
+            # Cliente controla a raquete direita com as teclas dela
+            keys = pygame.key.get_pressed()
+            return left, InputCommand(keys[controls["right_down"]] - keys[controls["right_up"]])
+        # Host: uma entrada do cliente por tick, na ordem. Cada uma é aplicada uma vez só
+        # (sem entrada nova a raquete espera), assim a posição depois da entrada N é a
+        # que o cliente previu. Se a fila cresceu além de INPUT_SLACK (rajada da rede),
+        # as atrasadas entram neste tick, juntas num comando só (engine.merge_commands),
+        # para o atraso não se acumular e o InputLog continuar refazendo a partida
+        inputs = self.remote_inputs
+        count = min(len(inputs), max(1, len(inputs) - self.INPUT_SLACK + 1))
+        if count == 0:
+            return left, engine.IDLE
+        taken = [inputs.popleft() for _ in range(count)]
+        self.acked_input = taken[-1][0]  # confirma até a mais nova aplicada
+        return left, engine.merge_commands(self.sim.right_paddle, [command for _, command in taken], TICK_DT)
+    def handle_events(self, events):
+        super().handle_events(events)
+        if self.is_host:
+            self.outgoing_events.extend(events)
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_F3:
+                self.show_stats = not self.show_stats
+            elif event.key == pygame.K_ESCAPE:
+                return "Back"
+        return None
+    def exit(self):
+        self.stop_network()
+    def update(self, dt):
+        if self.is_host:
+            super().update(dt)
+            return
+        # Cliente: aplica o que chegou da rede e avança a predição em ticks fixos
+        newest = None
+        for arrival, tick, state in self.snapshots.take():
+            self.host_clock.observe(tick, arrival)
+            if self.remote_paddle.push(tick / engine.TICK_RATE, (statesync.value(state, "left_y"),)):
+                self.snapshots.applied.add()
+                newest = (tick, state)
+            else:
+                self.snapshots.dropped.add()  # fora de ordem: já temos um mais novo
+        if newest:
+            self.reconcile(*newest)
+        self.snapshots.rates(time.perf_counter())
+        events = self.incoming_events
+        events = [events.popleft() for _ in range(len(events))]
+        if any(event.kind == engine.GAME_OVER for event in events):
+            self.paused = True
+        Game.handle_events(self, events)
+        super().update(dt)
+    def tick(self):
+        if self.is_host:
+            super().tick()
+            self.publish()
+            return
+        # Tick previsto do cliente: só a própria raquete e a bola; pontos,
+        # power-ups e sons continuam vindo do host. Antes de conectar não há
+        # para quem mandar: nada é previsto nem enfileirado
+        if self.transport is None:
+            return
+        sim = self.sim
+        self.prev_state = (sim.ball.pos.copy(), sim.left_paddle.rect.y, sim.right_paddle.rect.y)
+        _, command = self.read_input()
+        self.inputs.add(command)
+        sim.right_paddle.apply(command, TICK_DT)
+        self.advance_ball()
+        host_now = self.host_clock.now(time.perf_counter(), self.rtt)
+        if host_now is not None:
+            (sim.left_paddle.rect.y,) = self.remote_paddle.sample(host_now)
+    def publish(self):
+        sim = self.sim
+        self.published = statesync.capture(sim, self.acked_input)
+    def advance_ball(self):
+        # Passou da linha do gol: espera o host decidir o ponto e recolocar a bola
+        sim = self.sim
+        ball = sim.ball
+        if ball.radius <= ball.pos[0] <= sim.width - ball.radius:
+            sim.advance_ball(TICK_DT, [])
+    def reconcile(self, tick, state):
+        sim = self.sim
+        # Placar, tempo, alturas das raquetes, power-ups e obstáculos ficam como
+        # o host mandou; a raquete do adversário continua vindo do buffer
+        left_y = sim.left_paddle.rect.y
+        statesync.restore(sim, state)
+        sim.left_paddle.rect.y = left_y
+        # Raquete local: posição confirmada + entradas que o host ainda não aplicou
+        for _, command in self.inputs.acknowledge(state.fields[statesync.INDEX["ack"]]):
+            sim.right_paddle.apply(command, TICK_DT)
+        # Bola: estado do snapshot, re-simulado até o "agora" estimado do host
+        host_now = self.host_clock.now(time.perf_counter(), self.rtt)
+        behind = int(round(host_now * engine.TICK_RATE)) - tick
+        for _ in range(max(0, min(self.MAX_RESIMULATION, behind))):
+            self.advance_ball()
+    def open_transport(self):
+        cls = net.TRANSPORTS[self.transport_kind]
+        running = lambda: self.running_network
+        if self.is_host:
+            print("Aguardando conexão de um cliente (%s)..." % self.transport_kind.upper())
+            return cls.listen(self.port, running)
+        return cls.connect(self.ip_address, self.port, running)
     def network_loop(self):
+        try:
+            self.transport = self.open_transport()
+        except OSError as e:
+            print("Erro ao conectar:", e)
+            return
+        if self.transport is None:
+            print("Conexão não estabelecida")
+            return
+        # Envia num ritmo fixo e, entre um envio e outro, fica lendo o que chegar
+        next_send = time.perf_counter()
+        transport = self.transport
+        if self.is_host and self.published is None:
+            self.publish()  # estado inicial, antes do primeiro tick
+        if not self.is_host:
+            self.greet()
         while self.running_network:
             try:
-                if self.is_host:
-                    state = f"{ball.pos[0]},{ball.pos[1]},{ball.vel[0]},{ball.vel[1]},{left_paddle.rect.y},{right_paddle.rect.y},{self.score_left},{self.score_right}"
-                    self.conn.sendall(state.encode())
-                    data = self.conn.recv(1024).decode()
-                    if data == "UP":
-                        right_paddle.move(-right_paddle.speed * 0.016)
-                    elif data == "DOWN":
-                        right_paddle.move(right_paddle.speed * 0.016)
-                else:
-                    data = self.conn.recv(1024).decode()
-                    vals = data.split(',')
-                    if len(vals) == 8:
-                        new_state = tuple(map(float, vals))
-                        if self.current_state is None:
-                            self.current_state = new_state
-                        else:
-                            self.current_state = tuple(
-                                self.current_state[i] + self.interp_factor * (new_state[i] - self.current_state[i])
-                                for i in range(8)
-                            )
-                        ball.pos[0], ball.pos[1], ball.vel[0], ball.vel[1], lp_y, rp_y, s_left, s_right = self.current_state
-                        left_paddle.rect.y = int(lp_y)
-                        right_paddle.rect.y = int(rp_y)
-                        self.score_left = int(s_left)
-                        self.score_right = int(s_right)
-                        keys = pygame.key.get_pressed()
-                        if keys[controls["right_up"]]:
-                            self.conn.sendall("UP".encode())
-                        elif keys[controls["right_down"]]:
-                            self.conn.sendall("DOWN".encode())
-                        else:
-                            self.conn.sendall("NONE".encode())
+                now = time.perf_counter()
+                if now >= next_send:
+                    self.send_messages()
+                    transport.flush()
+                    next_send = max(next_send + self.SEND_INTERVAL, now)
+                for message in transport.poll(max(0.001, next_send - time.perf_counter())):
+                    self.handle_message(message)
+                if transport.queue:
+                    transport.flush()  # pong e ACKs saem na hora, sem esperar o próximo envio
+                stale = getattr(transport, "stale", 0)
+                if stale != self.stale_seen:
+                    self.snapshots.dropped.add(stale - self.stale_seen)
+                    self.stale_seen = stale
+                if not transport.alive():
+                    print("Conexão perdida")
+                    break
+            except protocol.ProtocolError as e:
+                # Quadro inválido ou de outra versão: o fluxo não se recupera, a sessão acaba
+                print("Erro de protocolo, conexão encerrada:", e)
+                self.paused = True
+                transport.close()
+                break
             except Exception as e:
+                if not self.running_network:
+                    break  # transporte fechado pelo stop_network
                 print("Erro na rede:", e)
-            time.sleep(0.016)
+                time.sleep(0.016)
+    def greet(self):
+        # Servidor dedicado (server.py) põe na fila deste modo; outro pong.py ignora
+        self.transport.send(protocol.JOIN, 0, protocol.pack_join(self.gamemode))
+    def send_messages(self):
+        # Roda na thread de rede: só lê o que o loop principal publicou
+        transport = self.transport
+        if self.is_host:
+            state = self.published
+            tick = state.tick
+            body, _ = self.encoder.encode(state, self.snapshot_ack)
+            transport.send(protocol.SNAPSHOT, tick, body)
+            events = self.outgoing_events
+            for _ in range(len(events)):
+                event = events.popleft()
+                transport.send(protocol.EVENT, tick, protocol.pack_event(event),
+                               reliable=event.kind in protocol.RELIABLE_EVENTS)
+        else:
+            # TCP entrega tudo: manda cada entrada uma vez. UDP repete as não confirmadas.
+            after = self.last_sent_input if self.transport_kind == "tcp" else 0
+            pending = self.inputs.pending(after, self.MAX_INPUT_BATCH)
+            if pending:
+                self.last_sent_input = pending[-1][0]
+                transport.send(protocol.INPUT, self.remote_tick,
+                               protocol.pack_inputs(pending[0][0], [command for _, command in pending]))
+            tick = self.remote_tick
+        now = time.perf_counter()
+        if now - self.last_ping >= self.PING_INTERVAL:
+            self.last_ping = now
+            transport.send(protocol.PING, tick, protocol.pack_ping(now))
+    def handle_message(self, message):
+        if self.is_host and message.type in (protocol.INPUT, protocol.PING):
+            # O cliente põe no cabeçalho o último estado que decodificou: base do próximo delta
+            self.snapshot_ack = max(self.snapshot_ack, message.tick)
+        if message.type == protocol.INPUT and self.is_host:
+            # Lote redundante: só as entradas ainda não vistas entram na fila
+            first_seq, commands = message.body
+            for seq, command in enumerate(commands, first_seq):
+                if seq > self.last_input_seq:
+                    self.last_input_seq = seq
+                    self.remote_inputs.append((seq, command))
+        elif message.type == protocol.SNAPSHOT and not self.is_host:
+            state = self.decoder.decode(message.tick, message.body)
+            if state is None:
+                self.snapshots.dropped.add()  # delta sem a base: espera o próximo
+                return
+            self.remote_tick = max(self.remote_tick, message.tick)
+            self.snapshots.publish((time.perf_counter(), message.tick, state))
+        elif message.type == protocol.EVENT and not self.is_host:
+            self.incoming_events.append(message.body)
+        elif message.type == protocol.PING:
+            self.transport.send(protocol.PONG, message.tick, protocol.pack_ping(message.body))
+        elif message.type == protocol.PONG:
+            self.rtt = time.perf_counter() - message.body
+    def net_stats(self):
+        # Snapshots por segundo (recebidos, descartados, aplicados), RTT e bytes
+        stats = {name: round(rate, 1) for name, rate in self.snapshots.rates(time.perf_counter()).items()}
+        stats["rtt_ms"] = None if self.rtt is None else round(self.rtt * 1000, 1)
+        if self.transport:
+            stats["bytes_sent"] = self.transport.bytes_sent
+            stats["bytes_received"] = self.transport.bytes_received
+        return stats
+    def drawables(self):
+        items = super().drawables()
+        if self.show_stats and not self.is_host:
+            # F3: contadores da rede no canto inferior
+            stats = self.net_stats()
+            text = "RTT %s ms  snapshots %s/s  aplicados %s/s  descartados %s/s" % (
+                stats["rtt_ms"], stats["received"], stats["applied"], stats["dropped"])
+            atlas = text_cache.atlas(font_small, self.theme["text"])
+            pos = (10, HEIGHT - 40)
+            items.append((pygame.Rect(pos, atlas.size(text)), text, lambda s: atlas.draw(s, text, pos)))
+        return items
     def stop_network(self):
         self.running_network = False
-        try:
-            self.conn.close()
-            self.sock.close()
-        except:
-            pass
+        if not self.is_host:
+            print("Rede:", self.net_stats())
+        if self.transport:
+            try:
+                self.transport.close()
+            except OSError:
+                pass
+
+class SpectatorGame(OnlineGame):
+    # Assiste a uma sala do servidor dedicado: só desenha o estado que chega
+    # (keyframes + deltas, decodificados como no cliente), sem simular nem mandar entradas
+    def __init__(self, ip_address, port, theme_name, room=0):
+        self.room = room  # 0 = a sala mais nova, trocando quando ela acabar
+        super().__init__(False, ip_address, port, "Medium", "Classic", theme_name)
+    def greet(self):
+        self.transport.send(protocol.WATCH, 0, protocol.pack_watch(self.room))
+    def update(self, dt):
+        received = self.snapshots.take()
+        self.snapshots.applied.add(len(received))
+        if received:
+            statesync.restore(self.sim, received[-1][2])
+        self.snapshots.rates(time.perf_counter())
+        events = self.incoming_events
+        Game.handle_events(self, [events.popleft() for _ in range(len(events))])
+        particle_pool.update(dt)
+
+# --- Profiler (F2) ---
+# Fases cronometradas quando o profiler está ligado (ver profiler.py); o loop
+# principal cronometra eventos, update, desenho e present diretamente.
+def register_profiler_hooks():
+    module = sys.modules[__name__]
+    for owner, attribute, phase in (
+            (Game, "read_input", "input"), (engine.Paddle, "apply", "input"),
+            (engine.AIController, "command", "ai"), (engine.Match, "run_ai", "ai"),
+            (engine.Match, "advance_ball", "physics"), (engine.Match, "next_contact", "collisions"),
+            (Arena, "move_balls", "physics"), (Arena, "collide_balls", "collisions"), (ArenaAI, "command", "ai"),
+            (engine.Match, "spawn_powerup", "powerups"), (engine.Match, "spawn_obstacle", "powerups"),
+            (engine.Match, "apply_powerup", "powerups"), (entities.EntityStore, "expire", "powerups"),
+            (ParticlePool, "update", "particles.update"), (ParticlePool, "draw", "particles.draw"),
+            (module, "draw_ball", "ball.draw"), (module, "draw_balls", "ball.draw"), (GlyphAtlas, "draw", "hud"), (TextCache, "render", "hud"),
+            (ReplayRecorder, "record", "replay"),
+            (OnlineGame, "send_messages", "net.send"), (OnlineGame, "handle_message", "net.recv")):
+        profiler.hook(owner, attribute, phase)
+
+class ProfileOverlay:
+    # Gráfico dos últimos frames (linha de 16,7 ms = 60 FPS) e percentis das
+    # fases mais caras. Refeito algumas vezes por segundo, não a cada frame.
+    GRAPH_FRAMES = 240
+    REFRESH = 0.25
+    BUDGET_MS = 1000 / 60
+    def __init__(self):
+        self.visible = False
+        self.surface = None
+        self.refreshed = 0.0
+        self.font = None
+        self.rect = pygame.Rect(10, 60, 360, 250)
+    def render(self):
+        if self.font is None:
+            self.font = pygame.font.SysFont("Arial", 14)
+        surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 190))
+        graph = pygame.Rect(8, 8, self.rect.width - 16, 80)
+        scale = graph.height / (self.BUDGET_MS * 2)  # o topo do gráfico é 33 ms
+        frames = profiler.frame_times.ordered()[-self.GRAPH_FRAMES:]
+        bar = graph.width / self.GRAPH_FRAMES
+        for i, ms in enumerate(frames.tolist()):
+            height = min(graph.height, ms * scale)
+            color = (80, 220, 80) if ms <= self.BUDGET_MS * 1.05 else (240, 80, 60)
+            x = graph.x + int(i * bar)
+            pygame.draw.line(surface, color, (x, graph.bottom), (x, graph.bottom - height))
+        budget_y = graph.bottom - self.BUDGET_MS * scale
+        pygame.draw.line(surface, (200, 200, 200), (graph.x, budget_y), (graph.right, budget_y))
+        summary = profiler.summary()
+        lines = []
+        for name in ("frame", "busy"):
+            stats = summary[name]
+            if stats:
+                lines.append("%-16s %5.1f %5.1f %5.1f ms" % (name, stats["p50"], stats["p95"], stats["p99"]))
+        phases = [(name, stats) for name, stats in summary.items() if name not in ("frame", "busy") and stats]
+        phases.sort(key=lambda item: -item[1]["p95"])
+        for name, stats in phases[:9]:
+            lines.append("%-16s %5.2f %5.2f %5.2f ms %6.0f blk" % (
+                name, stats["p50"], stats["p95"], stats["p99"], stats["blocks"]))
+        y = graph.bottom + 6
+        for line in lines:
+            surface.blit(self.font.render(line, True, (230, 230, 230)), (8, y))
+            y += 14
+        self.surface = surface
+    def draw(self, surface):
+        now = time.perf_counter()
+        if self.surface is None or now - self.refreshed >= self.REFRESH:
+            self.refreshed = now
+            self.render()
+        surface.blit(self.surface, self.rect.topleft)
+
+profile_overlay = ProfileOverlay()
 
 # --- Menus e Telas ---
-class SettingsMenu:
+
+class SettingsMenu(Scene):
+    static = True
     def __init__(self):
         self.options = ["Left Up", "Left Down", "Right Up", "Right Down", "Toggle Mobile Mode", "Custom Music", "Back"]
         self.selected = 0
         self.changing = False
-    def draw(self, surface):
+        self.view = RetainedView()
+    def draw(self, surface, force=True):
+        key = (current_theme, self.selected, self.changing, mobile_mode, tuple(controls.values()))
+        return self.view.draw(surface, key, self.render, force)
+    def render(self, surface):
         surface.fill(current_theme_color["background"])
-        title = font_large.render("Configurações", True, current_theme_color["text"])
+        title = text_cache.render(font_large, "Configurações", current_theme_color["text"])
         surface.blit(title, ((WIDTH - title.get_width()) // 2, 50))
         for i, option in enumerate(self.options):
             text_str = option
@@ -507,9 +1319,9 @@ class SettingsMenu:
             elif option == "Custom Music":
                 text_str += ": (Selecione arquivo)"
             if i == self.selected:
-                text = font_medium.render("> " + text_str, True, current_theme_color["text"])
+                text = text_cache.render(font_medium, "> " + text_str, current_theme_color["text"])
             else:
-                text = font_medium.render("  " + text_str, True, current_theme_color["text"])
+                text = text_cache.render(font_medium, "  " + text_str, current_theme_color["text"])
             surface.blit(text, (100, 150 + i * 50))
     def handle_event(self, event):
         global mobile_mode, controls
@@ -543,9 +1355,10 @@ class SettingsMenu:
                         return "Back"
         return None
 
-class Menu:
+class Menu(Scene):
+    static = True
     def __init__(self):
-        self.options = ["Singleplayer", "Local Multiplayer", "Online Multiplayer", "Tournament", "Replay", "Settings", "Stats", "Exit"]
+        self.options = ["Singleplayer", "Local Multiplayer", "Online Multiplayer", "Tournament", "Multi-Ball Arena", "Replay", "Settings", "Stats", "Exit"]
         self.selected = 0
         self.difficulty_options = ["Easy", "Medium", "Hard"]
         self.selected_difficulty = 1
@@ -553,23 +1366,27 @@ class Menu:
         self.selected_gamemode = 0
         self.theme_options = list(themes.keys())
         self.selected_theme = 0
-    def draw(self, surface):
+        self.view = RetainedView()
+    def draw(self, surface, force=True):
+        key = (self.selected, self.selected_difficulty, self.selected_gamemode, self.selected_theme)
+        return self.view.draw(surface, key, self.render, force)
+    def render(self, surface):
         theme = themes[self.theme_options[self.selected_theme]]
         surface.fill(theme["background"])
-        title = font_large.render("Pong 1972 - Menu", True, theme["text"])
+        title = text_cache.render(font_large, "Pong 1972 - Menu", theme["text"])
         surface.blit(title, ((WIDTH - title.get_width()) // 2, 50))
         for i, option in enumerate(self.options):
             color = theme["text"]
             if i == self.selected:
-                text = font_medium.render("> " + option, True, color)
+                text = text_cache.render(font_medium, "> " + option, color)
             else:
-                text = font_medium.render("  " + option, True, color)
+                text = text_cache.render(font_medium, "  " + option, color)
             surface.blit(text, (100, 150 + i * 50))
-        diff_text = font_small.render("Dificuldade: " + self.difficulty_options[self.selected_difficulty], True, theme["text"])
+        diff_text = text_cache.render(font_small, "Dificuldade: " + self.difficulty_options[self.selected_difficulty], theme["text"])
         surface.blit(diff_text, (500, 150))
-        mode_text = font_small.render("Modo: " + self.gamemode_options[self.selected_gamemode], True, theme["text"])
+        mode_text = text_cache.render(font_small, "Modo: " + self.gamemode_options[self.selected_gamemode], theme["text"])
         surface.blit(mode_text, (500, 200))
-        theme_text = font_small.render("Tema: " + self.theme_options[self.selected_theme], True, theme["text"])
+        theme_text = text_cache.render(font_small, "Tema: " + self.theme_options[self.selected_theme], theme["text"])
         surface.blit(theme_text, (500, 250))
     def handle_event(self, event):
         if event.type == pygame.KEYDOWN:
@@ -593,58 +1410,77 @@ class Menu:
                 return self.options[self.selected]
         return None
 
-class StatsScreen:
-    def __init__(self, stats):
-        self.stats = stats
-        self.rankings = self.load_rankings()
-    def load_rankings(self):
-        if os.path.exists("rankings.txt"):
-            with open("rankings.txt", "r") as f:
-                data = f.read().splitlines()
-            rankings = [line.split(":") for line in data]
-            return {r[0]: int(r[1]) for r in rankings if len(r) == 2}
-        return {}
-    def save_rankings(self):
-        with open("rankings.txt", "w") as f:
-            for k, v in self.rankings.items():
-                f.write(f"{k}:{v}\n")
-    def update_rankings(self, mode, score):
-        if mode in self.rankings:
-            if score > self.rankings[mode]:
-                self.rankings[mode] = score
-        else:
-            self.rankings[mode] = score
-        self.save_rankings()
-    def draw(self, surface, theme):
+class StatsScreen(Scene):
+    # Totais, recordes por modo e o top N do modo/dificuldade escolhidos no menu,
+    # lidos do StatsStore (as consultas ficam em cache até a próxima gravação)
+    static = True
+    def __init__(self, store, gamemode, difficulty, theme):
+        self.store = store
+        self.gamemode = gamemode
+        self.difficulty = difficulty
+        self.theme = theme
+        self.view = RetainedView()
+    def enter(self):
+        self.store.flush()  # a última partida entra no ranking
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_RETURN, pygame.K_r):
+            return "Back"
+        return None
+    def draw(self, surface, force=True):
+        theme = self.theme
+        store = self.store
+        totals = store.totals
+        bests = store.bests()
+        top = store.leaderboard(self.gamemode, self.difficulty)
+        key = (theme["background"], theme["text"], tuple(totals.values()), tuple(bests), tuple(top))
+        return self.view.draw(surface, key, lambda s: self.render(s, theme, totals, bests, top), force)
+    def render(self, surface, theme, totals, bests, top):
         surface.fill(theme["background"])
-        title = font_large.render("Estatísticas", True, theme["text"])
+        title = text_cache.render(font_large, "Estatísticas", theme["text"])
         surface.blit(title, ((WIDTH - title.get_width()) // 2, 50))
-        games_text = font_medium.render("Jogos: " + str(self.stats["games"]), True, theme["text"])
+        games_text = text_cache.render(font_medium, "Jogos: " + str(totals["games"]), theme["text"])
         surface.blit(games_text, (100, 150))
-        left_text = font_medium.render("Pontos Esquerda: " + str(self.stats["left_points"]), True, theme["text"])
+        left_text = text_cache.render(font_medium, "Pontos Esquerda: " + str(totals["left_points"]), theme["text"])
         surface.blit(left_text, (100, 200))
-        right_text = font_medium.render("Pontos Direita: " + str(self.stats["right_points"]), True, theme["text"])
+        right_text = text_cache.render(font_medium, "Pontos Direita: " + str(totals["right_points"]), theme["text"])
         surface.blit(right_text, (100, 250))
-        ranking_text = font_medium.render("Ranking:", True, theme["text"])
+        ranking_text = text_cache.render(font_medium, "Ranking:", theme["text"])
         surface.blit(ranking_text, (100, 300))
         y_offset = 350
-        for mode, score in self.rankings.items():
-            r_text = font_small.render(f"{mode}: {score}", True, theme["text"])
+        for mode, score in bests:
+            r_text = text_cache.render(font_small, f"{mode}: {score}", theme["text"])
             surface.blit(r_text, (120, y_offset))
             y_offset += 30
-        instruct = font_small.render("Pressione ESC, ENTER ou R para voltar ao menu", True, theme["text"])
+        top_text = text_cache.render(font_medium, f"Top {self.gamemode} ({self.difficulty}):", theme["text"])
+        surface.blit(top_text, (450, 300))
+        y_offset = 350
+        for score, opponent_score, played_at in top:
+            when = time.strftime("%d/%m/%Y", time.localtime(played_at))
+            t_text = text_cache.render(font_small, f"{score} x {opponent_score}  {when}", theme["text"])
+            surface.blit(t_text, (470, y_offset))
+            y_offset += 30
+        instruct = text_cache.render(font_small, "Pressione ESC, ENTER ou R para voltar ao menu", theme["text"])
         surface.blit(instruct, ((WIDTH - instruct.get_width()) // 2, HEIGHT - 100))
 
 # --- Função Principal ---
-def main():
+def main(argv=None):
     global current_theme, current_theme_color
+    args = parse_args(argv)
+    init_display()
+    renderer = DirtyRectRenderer(args.dirty_threshold) if args.dirty_rects else None
+    replay_recorder.path = args.replay_file
+    replay_recorder.delta = args.replay_delta
+    stats_store = StatsStore(args.stats_db)
+    stats_store.import_rankings()  # recordes do rankings.txt das versões antigas
     running = True
-    state = "menu"  # estados: "menu", "playing", "playing_online", "stats", "settings", "replay"
     menu = Menu()
     settings_menu = SettingsMenu()
-    game = None
-    stats_screen = None
-    online_game = None
+    scenes = SceneManager(screen)
+    scenes.switch(menu, transition=False)
+    game = None  # partida local, a única que usa o renderer de retângulos sujos
+    register_profiler_hooks()
+    if args.profile or args.profile_out:
+        profiler.enable(tracing=bool(args.profile_out))
 
     # Carrega música de fundo (arquivo "background.mp3")
     if os.path.exists("background.mp3"):
@@ -655,122 +1491,141 @@ def main():
 
     while running:
         dt = clock.tick(60) / 1000.0
-        for event in pygame.event.get():
+        profiler.begin_frame()
+        with profiler.scope("events"):
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
-            if state == "menu":
-                result = menu.handle_event(event)
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                scenes.invalidate()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+                # Overlay do profiler; liga o profiler junto se ele não veio ligado pela linha de comando
+                profile_overlay.visible = not profile_overlay.visible
+                if profile_overlay.visible:
+                    profiler.enable()
+                elif not (args.profile or args.profile_out):
+                    profiler.disable()
+                scenes.invalidate()
+                if renderer:
+                    renderer.invalidate()
+            scene = scenes.scene
+            result = scene.handle_event(event)
+            if result is None:
+                continue
+            if scene is menu:
+                theme_name = menu.theme_options[menu.selected_theme]
+                difficulty = menu.difficulty_options[menu.selected_difficulty]
+                gamemode = menu.gamemode_options[menu.selected_gamemode]
                 if result == "Exit":
                     running = False
-                elif result == "Singleplayer":
-                    current_theme = menu.theme_options[menu.selected_theme]
+                elif result in ("Singleplayer", "Local Multiplayer", "Tournament"):
+                    current_theme = theme_name
                     current_theme_color = themes[current_theme]
-                    game = Game("single", menu.difficulty_options[menu.selected_difficulty],
-                                menu.gamemode_options[menu.selected_gamemode], current_theme)
-                    state = "playing"
-                    fade(screen)
-                elif result == "Local Multiplayer":
-                    current_theme = menu.theme_options[menu.selected_theme]
+                    game = Game("multiplayer" if result == "Local Multiplayer" else "single", difficulty,
+                                "Tournament" if result == "Tournament" else gamemode, current_theme, args.seed)
+                    scenes.switch(game)
+                elif result == "Multi-Ball Arena":
+                    current_theme = theme_name
                     current_theme_color = themes[current_theme]
-                    game = Game("multiplayer", menu.difficulty_options[menu.selected_difficulty],
-                                menu.gamemode_options[menu.selected_gamemode], current_theme)
-                    state = "playing"
-                    fade(screen)
+                    # Survival no menu põe obstáculos na arena
+                    obstacles = engine.MAX_OBSTACLES if gamemode == "Survival" else 0
+                    scenes.switch(ArenaGame(args.balls, difficulty, current_theme, args.seed, obstacles))
                 elif result == "Online Multiplayer":
-                    current_theme = menu.theme_options[menu.selected_theme]
+                    current_theme = theme_name
                     current_theme_color = themes[current_theme]
-                    print("Hospedar (H) ou conectar (C)?")
-                    choice = input("Digite H ou C: ").strip().upper()
+                    print("Hospedar (H), conectar (C) ou assistir a uma sala do servidor dedicado (A)?")
+                    choice = input("Digite H, C ou A: ").strip().upper()
+                    if choice == "A":
+                        scenes.switch(SpectatorGame(input("Digite o IP do servidor: ").strip(), 12345, current_theme))
+                        continue
                     is_host = (choice == "H")
                     ip_address = "localhost"
                     if not is_host:
                         ip_address = input("Digite o IP do host: ").strip()
-                    online_game = OnlineGame(is_host, ip_address, 12345,
-                                             menu.difficulty_options[menu.selected_difficulty],
-                                             menu.gamemode_options[menu.selected_gamemode],
-                                             current_theme)
-                    state = "playing_online"
-                    fade(screen)
-                elif result == "Tournament":
-                    current_theme = menu.theme_options[menu.selected_theme]
-                    current_theme_color = themes[current_theme]
-                    game = Game("single", menu.difficulty_options[menu.selected_difficulty],
-                                "Tournament", current_theme)
-                    state = "playing"
-                    fade(screen)
+                    # UDP tolera perda sem travar; TCP continua como opção padrão
+                    transport = "udp" if input("Transporte TCP (T) ou UDP (U)? ").strip().upper() == "U" else "tcp"
+                    scenes.switch(OnlineGame(is_host, ip_address, 12345, difficulty, gamemode, current_theme,
+                                             transport, args.interp_delay / 1000, args.max_extrapolation / 1000))
                 elif result == "Replay":
-                    state = "replay"
-                    fade(screen)
+                    replay_recorder.stop()
+                    scenes.switch(ReplayViewer(replay_recorder.path, themes[theme_name]))
                 elif result == "Settings":
-                    state = "settings"
-                    fade(screen)
+                    scenes.switch(settings_menu)
                 elif result == "Stats":
-                    stats_screen = StatsScreen(game.stats if game else {"games": 0, "left_points": 0, "right_points": 0})
-                    state = "stats"
-                    fade(screen)
-            elif state == "settings":
-                res = settings_menu.handle_event(event)
-                if res == "Back":
-                    state = "menu"
-                    fade(screen)
-            elif state == "playing":
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_p:
-                        game.paused = not game.paused
-                    if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
-                        game.volume = max(0, game.volume - 0.1)
-                        pygame.mixer.music.set_volume(game.volume)
-                    if event.key in (pygame.K_EQUALS, pygame.K_KP_PLUS):
-                        game.volume = min(1, game.volume + 0.1)
-                        pygame.mixer.music.set_volume(game.volume)
-                    if event.key == pygame.K_t:
-                        share_on_social_media(game.score_left, game.score_right)
-                    if event.key == pygame.K_r:
-                        game.recording = False
-                        state = "replay"
-                        fade(screen)
-                    if event.key == pygame.K_ESCAPE:
-                        state = "menu"
-                        game.stats["games"] += 1
-                        fade(screen)
-            elif state == "playing_online":
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        state = "menu"
-                        if online_game:
-                            online_game.stop_network()
-                        fade(screen)
-            elif state == "stats":
-                if event.type == pygame.KEYDOWN:
-                    if event.key in (pygame.K_ESCAPE, pygame.K_RETURN, pygame.K_r):
-                        state = "menu"
-                        fade(screen)
-            elif state == "replay":
-                if event.type == pygame.KEYDOWN:
-                    # Agora, pressionar ESC, ENTER ou R sai do modo replay
-                    if event.key in (pygame.K_ESCAPE, pygame.K_RETURN, pygame.K_r):
-                        state = "menu"
-                        fade(screen)
-        if state == "menu":
-            menu.draw(screen)
-        elif state == "settings":
-            settings_menu.draw(screen)
-        elif state == "stats":
-            theme = themes[menu.theme_options[menu.selected_theme]]
-            stats_screen.draw(screen, theme)
-        elif state == "playing":
-            game.update(dt)
-            game.draw(screen)
-            if game.paused:
-                pause_text = font_large.render("PAUSA", True, game.theme["text"])
-                screen.blit(pause_text, ((WIDTH - pause_text.get_width()) // 2, HEIGHT // 2))
-        elif state == "playing_online":
-            online_game.update(dt)
-            online_game.draw(screen)
-        elif state == "replay":
-            replay_recorder.play(screen, game, themes[menu.theme_options[menu.selected_theme]])
-        pygame.display.flip()
+                    scenes.switch(StatsScreen(stats_store, gamemode, difficulty, themes[theme_name]))
+            elif result == "Replay":
+                # R durante a partida: para a gravação e assiste
+                scene.recording = False
+                replay_recorder.stop()
+                scenes.switch(ReplayViewer(replay_recorder.path, scene.theme))
+            elif result == "Back":
+                if scene is game:
+                    game.stats["games"] += 1
+                    game.record_stats(stats_store)
+                elif isinstance(scene, OnlineGame) and scene.is_host:  # o placar do cliente é previsão
+                    scene.record_stats(stats_store)
+                scenes.switch(menu)
+        with profiler.scope("update"):
+            scenes.update(dt)
+        with profiler.scope("draw"):
+            dirty = scenes.scene is game and renderer and not scenes.transitioning
+            if dirty:
+                # O renderer já apresenta o frame; o overlay entra como um item que muda sempre
+                items = game.drawables()
+                if profile_overlay.visible:
+                    items.append((profile_overlay.rect, object(), profile_overlay.draw))
+                renderer.render(screen, game.theme["background"], items)
+            else:
+                # Cena estática sem mudança (menu parado): nada a desenhar nem apresentar
+                changed = scenes.draw(force=profile_overlay.visible)
+        if dirty or not changed:
+            profiler.end_frame()
+            continue
+        if profile_overlay.visible:
+            profile_overlay.draw(screen)
+        if renderer:
+            renderer.invalidate()
+        with profiler.scope("present"):
+            pygame.display.flip()
+        profiler.end_frame()
+    if renderer:
+        print("Dirty rects:", renderer.stats())
+    if args.profile_out:
+        profiler.export(args.profile_out, args.profile_format)
+        print("Profiler: %d frames exportados para %s" % (profiler.frames, args.profile_out))
+    scenes.close()
+    replay_recorder.stop()
+    stats_store.close()
     pygame.quit()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pong 1972 - Ultimate")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="atualiza só as áreas alteradas da tela durante a partida")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed fixa das partidas (reproduz a mesma partida com as mesmas entradas)")
+    parser.add_argument("--dirty-threshold", type=float, default=0.5,
+                        help="fração da tela acima da qual o frame volta a ser um flip completo")
+    parser.add_argument("--interp-delay", type=float, default=100,
+                        help="online: atraso (ms) com que o cliente desenha a raquete do adversário")
+    parser.add_argument("--max-extrapolation", type=float, default=50,
+                        help="online: quanto (ms) o cliente pode extrapolar quando faltam snapshots")
+    parser.add_argument("--replay-file", default=REPLAY_FILE,
+                        help="arquivo onde a última partida é gravada para o replay")
+    parser.add_argument("--replay-delta", action="store_true",
+                        help="grava o replay com codificação delta/varint (arquivo menor)")
+    parser.add_argument("--profile", action="store_true",
+                        help="liga o profiler de frame desde o início (F2 mostra o overlay)")
+    parser.add_argument("--profile-out",
+                        help="ao sair, exporta os tempos por frame para este arquivo")
+    parser.add_argument("--profile-format", choices=FORMATS,
+                        help="csv, json ou chrome (trace do chrome://tracing); padrão pela extensão")
+    parser.add_argument("--balls", type=int, default=arena.BALLS,
+                        help="bolas na arena (Multi-Ball Arena no menu)")
+    parser.add_argument("--stats-db", default=STATS_FILE,
+                        help="banco SQLite das estatísticas e do histórico de partidas")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
     main()
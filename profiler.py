@@ -0,0 +1,205 @@
+# Profiler de frame: timers nomeados por fase, acumulados a cada frame em
+# buffers circulares (p50/p95/p99 sob demanda) junto com a variação de blocos
+# alocados (sys.getallocatedblocks) dentro de cada fase. Sem pygame.
+#
+# Desligado não custa nada nos caminhos quentes: as funções das fases
+# (engine, desenho, rede) só ganham o timer quando enable() troca o atributo
+# da classe/módulo por uma versão cronometrada, e disable() devolve o original.
+# O loop principal usa scope() diretamente, poucas vezes por frame.
+#
+# Exportação para análise offline:
+#   csv     uma linha por frame: duração do frame, ms e blocos de cada fase
+#   json    os mesmos frames + resumo com percentis
+#   chrome  eventos "X" do formato de trace do Chrome (chrome://tracing, Perfetto)
+import csv
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+HISTORY = 600  # frames nos buffers circulares (10 s a 60 FPS)
+TRACE_LIMIT = 200000  # eventos guardados para o trace do Chrome (os mais recentes)
+FORMATS = ["csv", "json", "chrome"]
+
+class Ring:
+    # Últimos 'size' valores em um array fixo
+    def __init__(self, size=HISTORY):
+        self.values = np.zeros(size)
+        self.index = 0
+        self.count = 0
+    def push(self, value):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        self.count = min(self.count + 1, len(self.values))
+    def ordered(self):
+        # Do mais antigo para o mais novo
+        if self.count < len(self.values):
+            return self.values[:self.count]
+        return np.roll(self.values, -self.index)
+    def percentiles(self):
+        if not self.count:
+            return None
+        p50, p95, p99 = np.percentile(self.values[:self.count], (50, 95, 99))
+        return {"p50": p50, "p95": p95, "p99": p99}
+
+class Scope:
+    # Um por nome, reaproveitado (o profiler não pode alocar no caminho que mede).
+    # Reentrada da mesma fase conta só o nível de fora.
+    __slots__ = ("profiler", "name", "depth", "start", "blocks")
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.depth = 0
+        self.start = 0.0
+        self.blocks = 0
+    def __enter__(self):
+        self.depth += 1
+        if self.depth == 1:
+            self.blocks = sys.getallocatedblocks()
+            self.start = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        self.depth -= 1
+        if self.depth == 0:
+            end = time.perf_counter()
+            self.profiler.add(self.name, self.start, end, sys.getallocatedblocks() - self.blocks)
+        return False
+
+class NullScope:
+    __slots__ = ()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+NULL_SCOPE = NullScope()
+
+class Profiler:
+    def __init__(self, history=HISTORY):
+        self.history = history
+        self.enabled = False
+        self.tracing = False  # guarda frames e eventos para exportar
+        self.scopes = {}
+        self.phases = []  # ordem em que as fases apareceram
+        self.times = {}  # fase -> Ring com ms por frame
+        self.allocs = {}  # fase -> Ring com blocos por frame
+        self.frame_times = Ring(history)  # intervalo entre frames, ms
+        self.busy_times = Ring(history)  # do início do frame até o fim do present, ms
+        self.current = {}  # fase -> [segundos, blocos] do frame em andamento
+        self.lock = threading.Lock()  # add() da thread de rede x troca do frame em end_frame()
+        self.frame_start = None
+        self.frames = 0
+        self.rows = []  # frames exportáveis (tracing)
+        self.events = deque(maxlen=TRACE_LIMIT)  # (fase, início, duração, thread)
+        self.origin = time.perf_counter()
+        self.hooks = []  # (dono, atributo, fase, original)
+        self.installed = False
+    def hook(self, owner, attribute, phase):
+        # Registra uma função (de classe ou módulo) para ser cronometrada quando ligado
+        self.hooks.append((owner, attribute, phase, getattr(owner, attribute)))
+        if self.installed:
+            setattr(owner, attribute, self.timed(phase, getattr(owner, attribute)))
+    def timed(self, phase, func):
+        scope = self.scope_for(phase)
+        def wrapper(*args, **kwargs):
+            with scope:
+                return func(*args, **kwargs)
+        wrapper.__wrapped__ = func
+        return wrapper
+    def enable(self, tracing=None):
+        self.enabled = True
+        if tracing is not None:
+            self.tracing = tracing
+        if not self.installed:
+            for owner, attribute, phase, original in self.hooks:
+                setattr(owner, attribute, self.timed(phase, original))
+            self.installed = True
+    def disable(self):
+        self.enabled = False
+        if self.installed:
+            for owner, attribute, _, original in self.hooks:
+                setattr(owner, attribute, original)
+            self.installed = False
+        self.frame_start = None
+    def scope_for(self, name):
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+    def scope(self, name):
+        return self.scope_for(name) if self.enabled else NULL_SCOPE
+    def add(self, name, start, end, blocks):
+        # Chamado pelas fases, inclusive da thread de rede: a soma vai para o frame em andamento
+        with self.lock:
+            entry = self.current.get(name)
+            if entry is None:
+                entry = self.current[name] = [0.0, 0]
+                if name not in self.times:
+                    self.phases.append(name)
+                    self.times[name] = Ring(self.history)
+                    self.allocs[name] = Ring(self.history)
+            entry[0] += end - start
+            entry[1] += blocks
+        if self.tracing:
+            self.events.append((name, start, end - start, threading.get_ident()))
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.frame_times.push((now - self.frame_start) * 1000)
+        self.frame_start = now
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        busy = (time.perf_counter() - self.frame_start) * 1000
+        self.busy_times.push(busy)
+        with self.lock:
+            current, self.current = self.current, {}
+            for name in self.phases:
+                seconds, blocks = current.get(name, (0.0, 0))
+                self.times[name].push(seconds * 1000)
+                self.allocs[name].push(blocks)
+        if self.tracing:
+            row = {"frame": self.frames, "start_ms": (self.frame_start - self.origin) * 1000, "busy_ms": busy}
+            for name, (seconds, blocks) in current.items():
+                row[name + "_ms"] = seconds * 1000
+                row[name + "_blocks"] = blocks
+            self.rows.append(row)
+        self.frames += 1
+    def summary(self):
+        # Percentis em ms por fase (e do frame), com a média de blocos por frame
+        result = {"frame": self.frame_times.percentiles(), "busy": self.busy_times.percentiles()}
+        for name in self.phases:
+            stats = self.times[name].percentiles()
+            if stats is not None:
+                allocs = self.allocs[name]
+                stats["blocks"] = float(allocs.values[:allocs.count].mean())
+            result[name] = stats
+        return result
+    def export(self, path, fmt=None):
+        fmt = fmt or ("csv" if path.endswith(".csv") else "json")
+        if fmt == "csv":
+            columns = ["frame", "start_ms", "busy_ms"]
+            for name in self.phases:
+                columns += [name + "_ms", name + "_blocks"]
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, columns, restval=0)
+                writer.writeheader()
+                writer.writerows(self.rows)
+        elif fmt == "json":
+            with open(path, "w") as f:
+                json.dump({"summary": self.summary(), "frames": self.rows}, f)
+        elif fmt == "chrome":
+            # Tempos em microssegundos desde o início do profiler
+            events = [{"name": name, "ph": "X", "ts": (start - self.origin) * 1e6, "dur": duration * 1e6,
+                       "pid": 1, "tid": tid} for name, start, duration, tid in self.events]
+            with open(path, "w") as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        else:
+            raise ValueError("formato de exportação desconhecido: %s" % fmt)
+
+profiler = Profiler()
@@ -0,0 +1,168 @@
+# Protocolo binário do modo online. Toda mensagem é um quadro com cabeçalho
+# fixo (versão, tipo, sequência, tick, tamanho do corpo) seguido do corpo
+# empacotado com struct. O tamanho no cabeçalho permite remontar quadros
+# que o TCP juntou ou partiu entre leituras.
+import math
+import struct
+from collections import namedtuple
+
+from engine import (InputCommand, Event, POWERUP_TYPES, WALL_HIT, PADDLE_HIT, OBSTACLE_HIT, POWERUP_HIT, SCORE,
+                    GAME_OVER)
+
+VERSION = 5
+
+# versão, tipo, sequência, tick, bytes do corpo
+HEADER = struct.Struct("<BBIIH")
+
+SNAPSHOT, INPUT, EVENT, PING, PONG = range(1, 6)
+# Controle de conexão e canal confiável (usados pelo transporte UDP em net.py)
+CONNECT, ACCEPT, DISCONNECT, ACK, RELIABLE = range(6, 11)
+# Pedido de partida ao servidor dedicado (server.py); o host do pong.py ignora
+JOIN = 11
+# Espectador do servidor dedicado: escolhe a sala e passa a receber os SNAPSHOTs dela
+WATCH = 12
+
+# O corpo do SNAPSHOT (keyframe ou delta em bits) é montado e lido em
+# statesync.py, porque o delta depende do estado que cada lado já tem.
+# Entradas vão em lote: sequência da primeira e quantidade, seguidas de cada
+# comando. Reenviar as últimas entradas em todo pacote cobre perdas no UDP.
+INPUT_BATCH = struct.Struct("<IB")
+# direção (-1, 0, 1) e alvo em y (NaN quando não há alvo, ex.: fora do modo mobile)
+INPUT_BODY = struct.Struct("<bf")
+# tipo do evento, posição, lado e detalhe (tipo do power-up)
+EVENT_BODY = struct.Struct("<B2f2B")
+# instante de envio do ping, devolvido no pong para medir o RTT
+PING_BODY = struct.Struct("<d")
+# id no canal confiável (ACK confirma todos até ele; RELIABLE traz um quadro inteiro depois)
+RELIABLE_ID = struct.Struct("<I")
+# modo de jogo da fila de matchmaking
+JOIN_BODY = struct.Struct("<B")
+# id da sala a assistir (0 = a próxima que estiver jogando)
+WATCH_BODY = struct.Struct("<I")
+
+EVENT_KINDS = [WALL_HIT, PADDLE_HIT, OBSTACLE_HIT, POWERUP_HIT, SCORE, GAME_OVER]
+RELIABLE_EVENTS = (SCORE, GAME_OVER)  # não podem se perder no UDP
+SIDES = [None, "left", "right"]
+DETAILS = [None] + POWERUP_TYPES
+GAMEMODES = ["Classic", "Time Attack", "Survival", "Tournament"]
+
+Message = namedtuple("Message", ["type", "seq", "tick", "body"])
+# Estado decodificado por statesync, em floats, para o cliente reconciliar
+Snapshot = namedtuple("Snapshot", ["ball", "vel", "spin", "speed", "paddle_y", "score", "ack"])
+InputBatch = namedtuple("InputBatch", ["first_seq", "commands"])
+Reliable = namedtuple("Reliable", ["id", "message"])
+
+class ProtocolError(ValueError):
+    pass
+
+def pack(msg_type, seq, tick, body=b""):
+    return HEADER.pack(VERSION, msg_type, seq & 0xFFFFFFFF, tick & 0xFFFFFFFF, len(body)) + body
+
+def pack_inputs(first_seq, commands):
+    body = [INPUT_BATCH.pack(first_seq, len(commands))]
+    for command in commands:
+        target = math.nan if command.target_y is None else command.target_y
+        body.append(INPUT_BODY.pack(command.move, target))
+    return b"".join(body)
+
+def pack_event(event):
+    return EVENT_BODY.pack(EVENT_KINDS.index(event.kind), event.x or 0.0, event.y or 0.0,
+                           SIDES.index(event.side), DETAILS.index(event.detail))
+
+def pack_ping(timestamp):
+    return PING_BODY.pack(timestamp)
+
+def pack_join(gamemode):
+    return JOIN_BODY.pack(GAMEMODES.index(gamemode))
+
+def pack_watch(room_id=0):
+    return WATCH_BODY.pack(room_id)
+
+def unpack_body(msg_type, body):
+    if msg_type == SNAPSHOT:
+        return body
+    if msg_type == INPUT:
+        first_seq, count = INPUT_BATCH.unpack_from(body)
+        if len(body) != INPUT_BATCH.size + count * INPUT_BODY.size:
+            raise struct.error("lote de entradas com tamanho errado")
+        commands = tuple(InputCommand(move, None if math.isnan(target) else target)
+                         for move, target in INPUT_BODY.iter_unpack(body[INPUT_BATCH.size:]))
+        return InputBatch(first_seq, commands)
+    if msg_type == EVENT:
+        kind, x, y, side, detail = EVENT_BODY.unpack(body)
+        return Event(EVENT_KINDS[kind], x, y, SIDES[side], DETAILS[detail])
+    if msg_type in (PING, PONG):
+        return PING_BODY.unpack(body)[0]
+    if msg_type in (CONNECT, ACCEPT, DISCONNECT):
+        return None
+    if msg_type == ACK:
+        return RELIABLE_ID.unpack(body)[0]
+    if msg_type == JOIN:
+        return GAMEMODES[JOIN_BODY.unpack(body)[0]]
+    if msg_type == WATCH:
+        return WATCH_BODY.unpack(body)[0]
+    if msg_type == RELIABLE:
+        (reliable_id,) = RELIABLE_ID.unpack_from(body)
+        inner = unpack_frames(body[RELIABLE_ID.size:])
+        if len(inner) != 1:
+            raise struct.error("mensagem confiável deve conter um quadro")
+        return Reliable(reliable_id, inner[0])
+    raise ProtocolError("tipo de mensagem desconhecido: %d" % msg_type)
+
+def unpack_frames(data):
+    # Quadros completos de um datagrama (ou corpo RELIABLE): nada pode sobrar
+    reader = FrameReader()
+    messages = reader.feed(data)
+    if reader.buffer:
+        raise ProtocolError("quadro incompleto")
+    return messages
+
+class MessageWriter:
+    # Numera as mensagens enviadas; a sequência é a ordem de envio deste lado
+    def __init__(self):
+        self.seq = 0
+        self.bytes_sent = 0
+    def frame(self, msg_type, tick, body=b""):
+        self.seq += 1
+        data = pack(msg_type, self.seq, tick, body)
+        self.bytes_sent += len(data)
+        return data
+
+class FrameReader:
+    # Acumula os bytes recebidos e devolve só mensagens completas; o resto
+    # fica no buffer até a próxima leitura
+    def __init__(self):
+        self.buffer = bytearray()
+        self.bytes_received = 0
+        self.failed = None  # motivo do quadro inválido; depois dele o fluxo não é mais lido
+    def feed(self, data):
+        if self.failed is not None:
+            raise ProtocolError(self.failed)
+        self.buffer += data
+        self.bytes_received += len(data)
+        messages = []
+        offset = 0
+        buffer = self.buffer
+        while len(buffer) - offset >= HEADER.size:
+            version, msg_type, seq, tick, size = HEADER.unpack_from(buffer, offset)
+            if version != VERSION:
+                self.fail("versão de protocolo incompatível: %d" % version)
+            end = offset + HEADER.size + size
+            if end > len(buffer):
+                break
+            body = bytes(buffer[offset + HEADER.size:end])
+            try:
+                messages.append(Message(msg_type, seq, tick, unpack_body(msg_type, body)))
+            except ProtocolError as e:
+                self.fail(str(e))
+            except (struct.error, IndexError) as e:
+                self.fail("corpo inválido para o tipo %d: %s" % (msg_type, e))
+            offset = end
+        del buffer[:offset]
+        return messages
+    def fail(self, reason):
+        # Num fluxo não há como achar o começo do próximo quadro: descarta o
+        # buffer e recusa o resto da conexão
+        self.buffer.clear()
+        self.failed = reason
+        raise ProtocolError(reason)
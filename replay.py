@@ -0,0 +1,404 @@
+# Replays em arquivo binário: registros de largura fixa gravados num buffer
+# pré-alocado e despejados em blocos (chunks) no disco. Cada chunk começa num
+# keyframe; o índice no fim do arquivo aponta onde cada chunk começa, então a
+# leitura via mmap acha qualquer tick sem carregar o arquivo inteiro.
+#
+# Layout (versão 1, little-endian):
+#   cabeçalho  HEADER + 4 strings (modo, dificuldade, modo de jogo, tema)
+#   chunk      CHUNK + eventos de entidades (EVENT) + registros
+#   índice     n_chunks + INDEX (primeiro registro, primeiro tick, offset) por chunk
+# Sem o índice (jogo fechado no meio) o leitor percorre os cabeçalhos dos chunks.
+import mmap
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from engine import TICK_RATE, POWERUP_TYPES
+
+MAGIC = b"PONGRPL\0"
+FORMAT_VERSION = 1
+FLAG_DELTA = 1  # registros do chunk codificados como delta + varint
+
+# magic, versão, flags, tick rate, registros por chunk, seed, total de registros, offset do índice
+HEADER = struct.Struct("<8sHHHHqQQ")
+COUNTS_OFFSET = HEADER.size - 16  # total de registros e offset do índice, reescritos no close()
+# primeiro registro, primeiro tick, registros, eventos, bytes de registros
+CHUNK = struct.Struct("<IIIII")
+
+RECORD = np.dtype([
+    ("tick", "<u4"),
+    ("ball", "<f4", 2),
+    ("vel", "<f4", 2),
+    ("spin", "<f4"),
+    ("speed", "<f4"),
+    ("paddle_y", "<f4", 2),
+    ("paddle_h", "<f4", 2),
+    ("score", "<u2", 2),
+    ("timer", "<f4"),
+    ("paused", "u1"),
+    ("last_hitter", "i1"),  # -1 ninguém, 0 esquerda, 1 direita
+    ("pad", "u1", 2)
+])
+WORDS = RECORD.itemsize // 4  # o delta trabalha em palavras de 32 bits
+
+# Power-ups e obstáculos têm quantidade variável, então viram eventos de
+# surgimento/sumiço em vez de ocupar espaço em todo registro
+SPAWN, DESPAWN = 1, 0
+OBSTACLE = 0  # kind; power-ups usam 1 + índice em POWERUP_TYPES
+POWERUP_KINDS = {pu_type: 1 + i for i, pu_type in enumerate(POWERUP_TYPES)}
+EVENT = np.dtype([
+    ("tick", "<u4"),
+    ("id", "<u4"),
+    ("action", "u1"),
+    ("kind", "u1"),
+    ("pad", "u1", 2),
+    ("rect", "<f4", 4)
+])
+INDEX = np.dtype([("first", "<u4"), ("tick", "<u4"), ("offset", "<u8")])
+
+HITTERS = {None: -1, "left": 0, "right": 1}
+
+def zigzag(values):
+    s = values.view(np.int32)
+    return ((s << 1) ^ (s >> 31)).view(np.uint32)
+
+def unzigzag(values):
+    return ((values >> 1) ^ (np.uint32(0) - (values & 1))).astype(np.uint32)
+
+def encode_varints(values):
+    # LEB128 vetorizado: 7 bits por byte, bit alto marca continuação
+    values = np.asarray(values, dtype=np.uint32)
+    lengths = 1 + sum((values >= (1 << (7 * k))).astype(np.int64) for k in range(1, 5))
+    shifts = np.arange(5, dtype=np.uint32) * 7
+    groups = ((values[:, None] >> shifts) & 0x7F).astype(np.uint8)
+    used = np.arange(5) < lengths[:, None]
+    groups[np.arange(5) < (lengths - 1)[:, None]] |= 0x80
+    return groups[used].tobytes()
+
+def decode_varints(data, count):
+    if count == 0:
+        return np.zeros(0, dtype=np.uint32)
+    data = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(data < 0x80)[:count]
+    if len(ends) < count:
+        raise ValueError("varints truncados")
+    data = data[:ends[-1] + 1]
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7F).astype(np.uint32) << (7 * position).astype(np.uint32)
+    return np.add.reduceat(parts, starts)
+
+def encode_delta(records):
+    # Primeiro registro inteiro (keyframe); os demais viram, por palavra, a
+    # diferença para o anterior em zigzag. Uma máscara de bits por registro
+    # marca quais palavras mudaram, e só essas entram como varint.
+    words = records.view("<u4").reshape(len(records), WORDS)
+    deltas = zigzag(words[1:] - words[:-1])
+    changed = deltas != 0
+    mask = np.packbits(changed, axis=1, bitorder="little")
+    return records[:1].tobytes() + mask.tobytes() + encode_varints(deltas[changed])
+
+def decode_delta(data, count):
+    key = np.frombuffer(data, dtype="<u4", count=WORDS)
+    mask_size = (WORDS + 7) // 8 * (count - 1)
+    mask = np.frombuffer(data, dtype=np.uint8, count=mask_size, offset=RECORD.itemsize)
+    changed = np.unpackbits(mask.reshape(count - 1, -1), axis=1, count=WORDS, bitorder="little").astype(bool)
+    values = decode_varints(data[RECORD.itemsize + mask_size:], int(changed.sum()))
+    deltas = np.zeros((count - 1, WORDS), dtype=np.uint32)
+    deltas[changed] = unzigzag(values)
+    words = np.empty((count, WORDS), dtype=np.uint32)
+    words[0] = key
+    words[1:] = key + np.cumsum(deltas, axis=0, dtype=np.uint32)
+    return words.view(RECORD).reshape(count)
+
+class ReplayHeader:
+    def __init__(self, seed, mode="single", difficulty="Medium", gamemode="Classic", theme="Classic",
+                 tick_rate=TICK_RATE, delta=False, chunk_records=1024):
+        self.seed = seed
+        self.mode = mode
+        self.difficulty = difficulty
+        self.gamemode = gamemode
+        self.theme = theme
+        self.tick_rate = tick_rate
+        self.delta = delta
+        self.chunk_records = chunk_records
+    @classmethod
+    def for_match(cls, match, theme="Classic", **kwargs):
+        return cls(match.seed, match.mode, match.difficulty, match.gamemode, theme, **kwargs)
+    def pack(self, record_count=0, index_offset=0):
+        flags = FLAG_DELTA if self.delta else 0
+        data = HEADER.pack(MAGIC, FORMAT_VERSION, flags, self.tick_rate, self.chunk_records, self.seed,
+                           record_count, index_offset)
+        for text in (self.mode, self.difficulty, self.gamemode, self.theme):
+            raw = text.encode("utf-8")
+            data += struct.pack("<H", len(raw)) + raw
+        return data
+    @classmethod
+    def unpack(cls, data):
+        magic, version, flags, tick_rate, chunk_records, seed, record_count, index_offset = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("arquivo não é um replay")
+        if version != FORMAT_VERSION:
+            raise ValueError("versão de replay não suportada: %d" % version)
+        offset = HEADER.size
+        texts = []
+        for _ in range(4):
+            (size,) = struct.unpack_from("<H", data, offset)
+            texts.append(bytes(data[offset + 2:offset + 2 + size]).decode("utf-8"))
+            offset += 2 + size
+        header = cls(seed, *texts, tick_rate=tick_rate, delta=bool(flags & FLAG_DELTA),
+                     chunk_records=chunk_records)
+        return header, record_count, index_offset, offset
+
+class ReplayWriter:
+    # Um registro por tick num buffer pré-alocado; a cada chunk_records
+    # registros o buffer vira um chunk no arquivo e é reaproveitado.
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self.file = open(path, "wb")
+        self.file.write(header.pack())
+        self.buffer = np.zeros(header.chunk_records, dtype=RECORD)
+        self.fill = 0
+        self.count = 0
+        self.index = []  # (primeiro registro, primeiro tick, offset) por chunk
+        self.events = []
+        self.live = {}  # id(objeto) -> (objeto, id no arquivo) das entidades vivas
+        self.next_id = 0
+    def record(self, match):
+        if self.file is None:
+            return
+        self.track_entities(match)
+        row = self.buffer[self.fill]
+        ball = match.ball
+        row["tick"] = match.tick
+        row["ball"] = ball.pos
+        row["vel"] = ball.vel
+        row["spin"] = ball.spin
+        row["speed"] = ball.speed
+        row["paddle_y"] = match.left_paddle.rect.y, match.right_paddle.rect.y
+        row["paddle_h"] = match.left_paddle.rect.height, match.right_paddle.rect.height
+        row["score"] = match.score_left, match.score_right
+        row["timer"] = match.game_timer
+        row["paused"] = match.paused
+        row["last_hitter"] = HITTERS.get(match.last_hitter, -1)
+        self.fill += 1
+        self.count += 1
+        if self.fill == len(self.buffer):
+            self.flush()
+    def track_entities(self, match):
+        # Só gera eventos quando uma entidade aparece ou some (coletada, reset)
+        current = {id(obs): (obs, OBSTACLE) for obs in match.obstacles}
+        for pu in match.powerups:
+            if pu.active:
+                current[id(pu)] = (pu, POWERUP_KINDS[pu.type])
+        if len(current) == len(self.live) and current.keys() == self.live.keys():
+            return
+        for key in [key for key in self.live if key not in current]:
+            _, entity_id = self.live.pop(key)
+            self.events.append((match.tick, entity_id, DESPAWN, 0, (0, 0), (0, 0, 0, 0)))
+        for key, (entity, kind) in current.items():
+            if key not in self.live:
+                self.live[key] = (entity, self.next_id)  # guarda a referência: id() não é reciclado
+                self.events.append((match.tick, self.next_id, SPAWN, kind, (0, 0), tuple(entity.rect)))
+                self.next_id += 1
+    def flush(self):
+        if self.file is None or (self.fill == 0 and not self.events):
+            return
+        records = self.buffer[:self.fill]
+        if self.header.delta and self.fill:
+            payload = encode_delta(records)
+        else:
+            payload = records.tobytes()
+        events = np.array(self.events, dtype=EVENT)
+        first, tick = self.count - self.fill, int(records["tick"][0]) if self.fill else 0
+        self.index.append((first, tick, self.file.tell()))
+        self.file.write(CHUNK.pack(first, tick, self.fill, len(events), len(payload)))
+        self.file.write(events.tobytes())
+        self.file.write(payload)
+        self.file.flush()
+        self.fill = 0
+        self.events = []
+    def close(self):
+        if self.file is None:
+            return
+        self.flush()
+        index_offset = self.file.tell()
+        index = np.array(self.index, dtype=INDEX)
+        self.file.write(struct.pack("<I", len(index)) + index.tobytes())
+        self.file.seek(COUNTS_OFFSET)
+        self.file.write(struct.pack("<QQ", self.count, index_offset))
+        self.file.close()
+        self.file = None
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+
+class ReplayReader:
+    # Leitura via mmap: em modo bruto o registro i é um offset calculado;
+    # em modo delta decodifica só o chunk que contém i (e guarda o último).
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = None
+        try:
+            self.load()
+        except (ValueError, struct.error, IndexError):
+            # Arquivo vazio, truncado ou de outro formato: fecha antes de repassar o erro
+            self.index = None
+            if self.map is not None:
+                try:
+                    self.map.close()
+                except BufferError:
+                    pass  # arrays do traceback ainda apontam para o mmap; o GC fecha
+            self.file.close()
+            raise
+    def load(self):
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header, count, index_offset, self.data_offset = ReplayHeader.unpack(self.map)
+        if index_offset and index_offset + 4 <= len(self.map):
+            (chunks,) = struct.unpack_from("<I", self.map, index_offset)
+            self.index = np.frombuffer(self.map, dtype=INDEX, count=chunks, offset=index_offset + 4)
+            self.count = count
+        else:
+            self.index, self.count = self.scan()
+        self.chunks = [CHUNK.unpack_from(self.map, int(offset)) for offset in self.index["offset"]]
+        events = [np.frombuffer(self.map, dtype=EVENT, count=n_events, offset=int(offset) + CHUNK.size)
+                  for offset, (_, _, _, n_events, _) in zip(self.index["offset"], self.chunks)]
+        self.build_entities(np.concatenate(events) if events else np.zeros(0, dtype=EVENT))
+        self.cached = (None, None)
+    def scan(self):
+        # Arquivo sem índice: percorre os chunks até onde o arquivo estiver íntegro
+        index = []
+        offset = self.data_offset
+        count = 0
+        while offset + CHUNK.size <= len(self.map):
+            first, tick, records, n_events, size = CHUNK.unpack_from(self.map, offset)
+            end = offset + CHUNK.size + n_events * EVENT.itemsize + size
+            if end > len(self.map):
+                break
+            index.append((first, tick, offset))
+            count = first + records
+            offset = end
+        return np.array(index, dtype=INDEX), count
+    def build_entities(self, events):
+        # Tabela por entidade: tipo, retângulo e intervalo [surgiu, sumiu) em ticks
+        spawns = events[events["action"] == SPAWN]
+        self.entity_kind = spawns["kind"]
+        self.entity_rect = spawns["rect"]
+        self.entity_start = spawns["tick"].astype(np.int64)
+        self.entity_end = np.full(len(spawns), np.iinfo(np.int64).max)
+        despawns = events[events["action"] == DESPAWN]
+        self.entity_end[despawns["id"]] = despawns["tick"]
+    def __len__(self):
+        return self.count
+    @property
+    def keyframes(self):
+        # Primeiro registro de cada chunk (o delta recomeça em cada um)
+        return self.index["first"]
+    def chunk_of(self, i):
+        return int(np.searchsorted(self.index["first"], i, side="right")) - 1
+    def chunk_records(self, chunk):
+        if self.cached[0] == chunk:
+            return self.cached[1]
+        first, _, count, n_events, size = self.chunks[chunk]
+        start = int(self.index["offset"][chunk]) + CHUNK.size + n_events * EVENT.itemsize
+        if self.header.delta:
+            records = decode_delta(self.map[start:start + size], count)
+        else:
+            records = np.frombuffer(self.map, dtype=RECORD, count=count, offset=start)
+        self.cached = (chunk, records)
+        return records
+    def record(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        if not self.header.delta:
+            # Chunks têm chunk_records registros (menos o último): offset direto
+            chunk = i // self.header.chunk_records
+            first, _, _, n_events, _ = self.chunks[chunk]
+            offset = (int(self.index["offset"][chunk]) + CHUNK.size + n_events * EVENT.itemsize
+                      + (i - first) * RECORD.itemsize)
+            return np.frombuffer(self.map, dtype=RECORD, count=1, offset=offset)[0].copy()
+        chunk = self.chunk_of(i)
+        return self.chunk_records(chunk)[i - self.chunks[chunk][0]].copy()
+    __getitem__ = record
+    def seek_tick(self, tick):
+        # Índice do último registro com tick <= tick: keyframe pelo índice, depois busca no chunk
+        if self.count == 0:
+            return 0
+        chunk = max(0, int(np.searchsorted(self.index["tick"], tick, side="right")) - 1)
+        ticks = self.chunk_records(chunk)["tick"]
+        return self.chunks[chunk][0] + max(0, int(np.searchsorted(ticks, tick, side="right")) - 1)
+    def entities(self, tick):
+        # Power-ups e obstáculos vivos no tick: [(kind, (x, y, w, h)), ...]
+        alive = (self.entity_start <= tick) & (tick < self.entity_end)
+        return list(zip(self.entity_kind[alive].tolist(), map(tuple, self.entity_rect[alive].tolist())))
+    def close(self):
+        self.cached = (None, None)
+        self.index = None
+        self.map.close()
+        self.file.close()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+
+# Quadro pronto para desenhar: cópia do estado, nunca os objetos da partida ao vivo
+ReplayFrame = namedtuple("ReplayFrame", ["tick", "ball", "paddle_y", "paddle_h", "score", "timer", "entities"])
+
+class ReplayPlayer:
+    # Tocador incremental: update(dt) avança o cursor de tempo uma vez por
+    # frame do loop principal e frame() interpola entre os dois registros
+    # vizinhos. Seek usa o índice de keyframes do leitor.
+    SPEEDS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+    def __init__(self, reader):
+        self.reader = reader
+        self.tick_rate = reader.header.tick_rate
+        self.first_tick = int(reader.record(0)["tick"]) if len(reader) else 0
+        self.last_tick = int(reader.record(len(reader) - 1)["tick"]) if len(reader) else 0
+        self.position = float(self.first_tick)  # em ticks, fracionário entre registros
+        self.speed = 1.0
+        self.paused = False
+    @property
+    def finished(self):
+        return self.position >= self.last_tick
+    def update(self, dt):
+        if not self.paused and not self.finished:
+            self.position = min(self.last_tick, self.position + dt * self.tick_rate * self.speed)
+    def change_speed(self, steps):
+        i = self.SPEEDS.index(self.speed) if self.speed in self.SPEEDS else self.SPEEDS.index(1.0)
+        self.speed = self.SPEEDS[max(0, min(len(self.SPEEDS) - 1, i + steps))]
+    def toggle_pause(self):
+        self.paused = not self.paused
+    def seek(self, tick):
+        self.position = float(max(self.first_tick, min(self.last_tick, tick)))
+    def seek_seconds(self, seconds):
+        self.seek(self.position + seconds * self.tick_rate)
+    def step(self, records=1):
+        # Quadro a quadro: pausa e pula para o registro vizinho
+        self.paused = True
+        if not len(self.reader):
+            return
+        i = self.reader.seek_tick(int(self.position))
+        i = max(0, min(len(self.reader) - 1, i + records))
+        self.position = float(self.reader.record(i)["tick"])
+    def frame(self):
+        reader = self.reader
+        if not len(reader):
+            return None
+        i = reader.seek_tick(int(self.position))
+        current = reader.record(i)
+        ball = current["ball"].astype(float)
+        paddle_y = current["paddle_y"].astype(float)
+        if i + 1 < len(reader):
+            following = reader.record(i + 1)
+            span = int(following["tick"]) - int(current["tick"])
+            alpha = (self.position - int(current["tick"])) / span if span else 0.0
+            # Após um ponto a bola volta ao centro: não interpola o salto
+            if 0 < alpha and (following["score"] == current["score"]).all():
+                ball += (following["ball"] - current["ball"]) * alpha
+                paddle_y += (following["paddle_y"] - current["paddle_y"]) * alpha
+        tick = int(current["tick"])
+        return ReplayFrame(tick, ball, paddle_y, current["paddle_h"].astype(float),
+                           tuple(current["score"].tolist()), float(current["timer"]), reader.entities(tick))
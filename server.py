@@ -0,0 +1,603 @@
+# Servidor dedicado do modo online: um processo asyncio, sem pygame, com
+# várias salas ao mesmo tempo. Quem conecta (TCP, quadros de protocol.py) fica
+# no lobby até mandar JOIN com o modo de jogo; dois jogadores na mesma fila
+# formam uma sala. Cada sala roda um engine.Match no seu próprio ritmo fixo
+# e manda a cada jogador um snapshot espelhado em que ele é sempre a raquete
+# direita, então o cliente do pong.py entra numa sala sem saber o lado.
+# Espectadores (WATCH) recebem a sala como keyframe + deltas (statesync.py),
+# codificados uma vez por tick e repassados com os mesmos bytes para todos.
+#   python server.py --port 12345
+#   python server.py --bots 100 --duration 30   (servidor + bots em loopback)
+#   python server.py --spectator-bench 0,100,200,400   (CPU por tick x espectadores)
+import argparse
+import asyncio
+import heapq
+import random
+import time
+from collections import deque
+
+import engine
+import protocol
+import statesync
+from engine import InputCommand, TICK_DT, TICK_RATE
+
+SEND_EVERY = 2  # um snapshot a cada 2 ticks (60 por segundo a 120 Hz)
+MAX_CATCHUP = 5  # ticks atrasados recuperados de uma vez; além disso são pulados
+INPUT_SLACK = 1  # entradas que podem esperar na fila do jogador; as mais velhas entram juntas
+SCHEDULE_SLACK = 0.001  # salas que vencem dentro disso rodam na mesma acordada
+IDLE_TIMEOUT = 30.0  # conexão sem mandar nada por esse tempo é fechada
+FINISH_GRACE = 5.0  # sala com partida encerrada fecha depois disso
+HIGH_WATER = 64 * 1024  # saída acumulada acima disso: snapshots do jogador são pulados
+MAX_BUFFER = 1024 * 1024  # acima disso o cliente lento é desconectado
+METRICS_INTERVAL = 5.0
+KEYFRAME_EVERY = 30  # quadros de espectador entre keyframes (meio segundo a 60 por segundo)
+OTHER_SIDE = {"left": "right", "right": "left", None: None}
+
+def mirror_event(match, event):
+    x = None if event.x is None else match.width - event.x
+    return engine.Event(event.kind, x, event.y, OTHER_SIDE[event.side], event.detail)
+
+class Player:
+    def __init__(self, server, writer):
+        self.server = server
+        self.writer = writer
+        self.address = writer.get_extra_info("peername")
+        self.messages = protocol.MessageWriter()
+        self.frames = protocol.FrameReader()
+        self.room = None
+        self.side = None  # "left" ou "right" dentro da sala
+        self.gamemode = None  # fila em que está esperando
+        self.inputs = deque(maxlen=32)  # (seq, comando) ainda não aplicados
+        self.last_input_seq = 0
+        self.acked = 0  # sequência da última entrada aplicada (vai no snapshot)
+        self.encoder = statesync.Encoder()
+        self.snapshot_ack = 0  # último estado que o cliente decodificou (tick no cabeçalho dele)
+        self.watching = None  # espectador: sala assistida
+        self.follow = False  # espectador de "qualquer sala": passa para a próxima quando a atual fecha
+        self.synced = False  # espectador: recebeu todos os quadros desde o último keyframe
+        self.closed = False
+    def send(self, msg_type, tick, body=b"", droppable=False):
+        # Sem await: a sala nunca espera um cliente. Quem não esvazia o buffer
+        # de saída perde snapshots e, se continuar acumulando, a conexão.
+        if self.closed:
+            return False
+        buffered = self.writer.transport.get_write_buffer_size()
+        if buffered > MAX_BUFFER:
+            print("Cliente lento desconectado:", self.address)
+            self.close()
+            return False
+        if droppable and buffered > HIGH_WATER:
+            self.server.snapshots_skipped += 1
+            return False
+        data = self.messages.frame(msg_type, tick, body)
+        self.writer.write(data)
+        self.server.bytes_out += len(data)
+        return True
+    def spectate(self, data, keyframe):
+        # Mesmo critério do send(), mas quem pula um quadro fica sem base para
+        # os deltas seguintes: só volta a receber no próximo keyframe que couber
+        # no buffer. Espectador lento vira, na prática, keyframes a 2 por segundo.
+        if self.closed:
+            return
+        buffered = self.writer.transport.get_write_buffer_size()
+        if buffered > MAX_BUFFER:
+            print("Espectador lento desconectado:", self.address)
+            self.close()
+            return
+        if buffered > HIGH_WATER or not (self.synced or keyframe):
+            self.synced = False
+            self.server.spectator_frames_skipped += 1
+            return
+        self.synced = True
+        self.writer.write(data)
+        self.server.bytes_out += len(data)
+    def next_command(self):
+        # Uma entrada por tick, cada uma aplicada uma vez (sem entrada nova a raquete
+        # espera), como o cliente previu. Atrasadas além de INPUT_SLACK entram neste
+        # tick, juntas num comando só, para o atraso não se acumular
+        inputs = self.inputs
+        count = min(len(inputs), max(1, len(inputs) - INPUT_SLACK + 1))
+        if count == 0:
+            return engine.IDLE
+        taken = [inputs.popleft() for _ in range(count)]
+        self.acked = taken[-1][0]
+        paddle = getattr(self.room.match, self.side + "_paddle")
+        return engine.merge_commands(paddle, [command for _, command in taken], TICK_DT)
+    def receive(self, message):
+        if message.type in (protocol.INPUT, protocol.PING):
+            self.snapshot_ack = max(self.snapshot_ack, message.tick)
+        if message.type == protocol.INPUT:
+            first_seq, commands = message.body
+            for seq, command in enumerate(commands, first_seq):
+                if seq > self.last_input_seq:
+                    self.last_input_seq = seq
+                    self.inputs.append((seq, command))
+        elif message.type == protocol.PING:
+            self.send(protocol.PONG, message.tick, protocol.pack_ping(message.body))
+        elif message.type == protocol.JOIN:
+            self.server.join(self, message.body)
+        elif message.type == protocol.WATCH:
+            self.server.watch(self, message.body)
+        elif message.type == protocol.DISCONNECT:
+            self.close()
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+class Room:
+    def __init__(self, server, room_id, gamemode, left, right):
+        self.server = server
+        self.id = room_id
+        self.match = engine.Match("online", gamemode=gamemode)
+        self.players = {"left": left, "right": right}
+        for side, player in self.players.items():
+            player.room = self
+            player.side = side
+        self.finished_at = None
+        self.closed = False
+        # Transmissão para espectadores: um só MessageWriter, então os bytes
+        # de cada quadro são os mesmos para todos
+        self.spectators = []
+        self.stream = protocol.MessageWriter()
+        self.history = []  # keyframe mais recente e os deltas depois dele, para quem entra
+        self.stream_encoder = statesync.Encoder(KEYFRAME_EVERY * SEND_EVERY)
+        self.last_broadcast = None  # tick do quadro anterior, base do próximo delta
+    def advance(self, now, next_tick):
+        # Roda os ticks vencidos e devolve o prazo do próximo (None: sala fechada).
+        # Atrasos de até MAX_CATCHUP ticks são recuperados; além disso é estouro
+        # e os ticks são pulados, para a sala não ficar correndo atrás para sempre.
+        server = self.server
+        if self.closed or self.expired(now):
+            self.close()
+            return None
+        due = max(1, int((now - next_tick) / TICK_DT) + 1)
+        if due > MAX_CATCHUP:
+            server.ticks_skipped += due - MAX_CATCHUP
+            next_tick += (due - MAX_CATCHUP) * TICK_DT
+            due = MAX_CATCHUP
+        if due > 1:
+            server.overruns += 1
+        for _ in range(due):
+            self.tick()
+            next_tick += TICK_DT
+        return next_tick
+    def tick(self):
+        match = self.match
+        left, right = self.players["left"], self.players["right"]
+        events = match.step(TICK_DT, left.next_command(), right.next_command())
+        self.server.ticks += 1
+        for event in events:
+            if event.kind == engine.GAME_OVER:
+                self.finished_at = time.perf_counter()
+            right.send(protocol.EVENT, match.tick, protocol.pack_event(event))
+            left.send(protocol.EVENT, match.tick, protocol.pack_event(mirror_event(match, event)))
+        if match.tick % SEND_EVERY == 0 or events:
+            # Cada jogador recebe o delta contra o último estado que ele confirmou
+            state = statesync.capture(match)
+            for player, view in ((right, state), (left, statesync.mirror(state, match.width))):
+                body, _ = player.encoder.encode(statesync.with_ack(view, player.acked), player.snapshot_ack)
+                player.send(protocol.SNAPSHOT, match.tick, body, droppable=True)
+            if self.spectators:
+                self.broadcast(state, events)
+            else:
+                self.last_broadcast = None  # sem ninguém assistindo, o próximo quadro é keyframe
+    def broadcast(self, state, events):
+        # Espectadores não confirmam nada: o delta é sempre contra o quadro anterior
+        match = self.match
+        stream = self.stream
+        body, keyframe = self.stream_encoder.encode(state, self.last_broadcast)
+        frame = stream.frame(protocol.SNAPSHOT, match.tick, body)
+        if keyframe:
+            self.history = [frame]
+        else:
+            self.history.append(frame)
+        self.last_broadcast = match.tick
+        data = b"".join([stream.frame(protocol.EVENT, match.tick, protocol.pack_event(event))
+                         for event in events] + [frame])
+        for spectator in self.spectators:
+            spectator.spectate(data, keyframe)
+    def add_spectator(self, spectator):
+        spectator.watching = self
+        self.spectators.append(spectator)
+        spectator.synced = False
+        if self.history:
+            spectator.spectate(b"".join(self.history), True)
+    def remove_spectator(self, spectator):
+        if spectator in self.spectators:
+            self.spectators.remove(spectator)
+        spectator.watching = None
+    def expired(self, now):
+        # Fecha quando alguém saiu ou a partida acabou há FINISH_GRACE segundos
+        if any(player.closed for player in self.players.values()):
+            return True
+        return self.finished_at is not None and now - self.finished_at > FINISH_GRACE
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for player in self.players.values():
+            player.close()
+        self.server.rooms.pop(self.id, None)
+        for spectator in self.spectators:
+            spectator.watching = None
+            if spectator.follow and not spectator.closed:
+                self.server.watch(spectator, 0)
+            else:
+                spectator.close()
+        self.spectators = []
+
+class Server:
+    def __init__(self, port=12345, metrics_interval=METRICS_INTERVAL):
+        self.port = port
+        self.metrics_interval = metrics_interval
+        self.lobby = set()  # conectados sem sala
+        self.queues = {gamemode: deque() for gamemode in protocol.GAMEMODES}
+        self.rooms = {}
+        self.next_room = 1
+        self.schedule = []  # heap (prazo do próximo tick, id da sala)
+        self.spectators_waiting = []  # pediram "qualquer sala" quando não havia nenhuma
+        self.started = time.perf_counter()
+        # Contadores acumulados; metrics() devolve as taxas desde a última leitura
+        self.ticks = 0
+        self.overruns = 0  # passadas em que a sala acordou com mais de um tick vencido
+        self.ticks_skipped = 0
+        self.busy = 0.0  # segundos gastos rodando ticks
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.snapshots_skipped = 0
+        self.spectator_frames_skipped = 0
+        self.last_metrics = (self.started, 0, 0.0, 0, 0)
+        self.server = None
+        self.scheduler = None
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, port=self.port, reuse_address=True, backlog=512)
+        self.scheduler = asyncio.get_running_loop().create_task(self.run_rooms())
+        print("Servidor ouvindo na porta", self.port)
+        return self
+    async def run_rooms(self):
+        # Um laço só para todas as salas, cada uma com o seu prazo no heap: o
+        # laço dorme até o prazo mais próximo e roda o que venceu. Uma task por
+        # sala acordando 120 vezes por segundo custava mais que os próprios ticks.
+        schedule = self.schedule
+        while True:
+            now = time.perf_counter()
+            while schedule and schedule[0][0] <= now + SCHEDULE_SLACK:
+                next_tick, room_id = heapq.heappop(schedule)
+                room = self.rooms.get(room_id)
+                if room is None:
+                    continue
+                next_tick = room.advance(now, next_tick)
+                if next_tick is not None:
+                    heapq.heappush(schedule, (next_tick, room_id))
+            after = time.perf_counter()
+            self.busy += after - now
+            wait = schedule[0][0] - after if schedule else 0.01
+            await asyncio.sleep(max(0.0, wait))
+    async def serve(self):
+        await self.start()
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            self.print_metrics()
+    async def handle(self, reader, writer):
+        player = Player(self, writer)
+        self.lobby.add(player)
+        try:
+            while not player.closed:
+                data = await asyncio.wait_for(reader.read(4096), IDLE_TIMEOUT)
+                if not data:
+                    break
+                self.bytes_in += len(data)
+                for message in player.frames.feed(data):
+                    player.receive(message)
+        except asyncio.TimeoutError:
+            print("Conexão ociosa fechada:", player.address)
+        except ConnectionError:
+            pass  # cliente caiu: igual a um EOF
+        except protocol.ProtocolError as e:
+            print("Erro na conexão %s: %s" % (player.address, e))
+        finally:
+            self.leave(player)
+    def join(self, player, gamemode):
+        # Matchmaking: fila por modo de jogo, os dois primeiros formam uma sala
+        if player.room is not None or player.gamemode is not None:
+            return
+        player.gamemode = gamemode
+        queue = self.queues[gamemode]
+        queue.append(player)
+        if len(queue) >= 2:
+            left, right = queue.popleft(), queue.popleft()
+            for waiting in (left, right):
+                self.lobby.discard(waiting)
+                waiting.gamemode = None
+            room = Room(self, self.next_room, gamemode, left, right)
+            self.rooms[room.id] = room
+            self.next_room += 1
+            heapq.heappush(self.schedule, (time.perf_counter(), room.id))
+            waiting, self.spectators_waiting = self.spectators_waiting, []
+            for spectator in waiting:
+                if not spectator.closed:
+                    room.add_spectator(spectator)
+    def watch(self, spectator, room_id):
+        # 0: a sala mais nova (ou a próxima a abrir), trocando quando ela fechar
+        if spectator.room is not None or spectator.gamemode is not None or spectator.watching is not None:
+            return
+        self.lobby.discard(spectator)
+        spectator.follow = room_id == 0
+        if room_id == 0:
+            room = self.rooms[max(self.rooms)] if self.rooms else None
+        else:
+            room = self.rooms.get(room_id)
+            if room is None:
+                print("Sala %d não existe: %s" % (room_id, spectator.address))
+                spectator.close()
+                return
+        if room is None:
+            self.spectators_waiting.append(spectator)
+        else:
+            room.add_spectator(spectator)
+    def leave(self, player):
+        player.close()
+        self.lobby.discard(player)
+        if player.watching is not None:
+            player.watching.remove_spectator(player)
+        if player in self.spectators_waiting:
+            self.spectators_waiting.remove(player)
+        if player.gamemode is not None:
+            self.queues[player.gamemode].remove(player)
+            player.gamemode = None
+        # A sala percebe no próximo tick (Room.expired) e desconecta o outro
+    def metrics(self, now=None):
+        now = time.perf_counter() if now is None else now
+        since, ticks, busy, bytes_in, bytes_out = self.last_metrics
+        elapsed = max(now - since, 1e-9)
+        self.last_metrics = (now, self.ticks, self.busy, self.bytes_in, self.bytes_out)
+        return {
+            "rooms": len(self.rooms),
+            "players": 2 * len(self.rooms) + len(self.lobby),
+            "lobby": len(self.lobby),
+            "queued": sum(len(queue) for queue in self.queues.values()),
+            "spectators": sum(len(room.spectators) for room in self.rooms.values()) + len(self.spectators_waiting),
+            "ticks_per_s": (self.ticks - ticks) / elapsed,
+            "load": (self.busy - busy) / elapsed,  # fração de um núcleo gasta em ticks
+            "us_per_tick": (self.busy - busy) / max(self.ticks - ticks, 1) * 1e6,
+            "overruns": self.overruns,
+            "ticks_skipped": self.ticks_skipped,
+            "snapshots_skipped": self.snapshots_skipped,
+            "spectator_frames_skipped": self.spectator_frames_skipped,
+            "in_bytes_per_s": (self.bytes_in - bytes_in) / elapsed,
+            "out_bytes_per_s": (self.bytes_out - bytes_out) / elapsed,
+        }
+    def print_metrics(self):
+        m = self.metrics()
+        print("salas %d  jogadores %d  lobby %d  fila %d  espectadores %d  ticks/s %.0f  carga %.0f%%  "
+              "estouros %d  ticks pulados %d  snapshots pulados %d  quadros pulados %d  "
+              "entrada %.1f kB/s  saída %.1f kB/s" % (
+                  m["rooms"], m["players"], m["lobby"], m["queued"], m["spectators"], m["ticks_per_s"],
+                  m["load"] * 100, m["overruns"], m["ticks_skipped"], m["snapshots_skipped"],
+                  m["spectator_frames_skipped"], m["in_bytes_per_s"] / 1024, m["out_bytes_per_s"] / 1024))
+    def close(self):
+        if self.server:
+            self.server.close()
+        if self.scheduler:
+            self.scheduler.cancel()
+        for room in list(self.rooms.values()):
+            room.close()
+        for player in list(self.lobby) + self.spectators_waiting:
+            player.close()
+
+# --- Bots para testar o servidor em loopback ---
+class Bot:
+    # Cliente roteirizado: entra na fila, segue a bola com a raquete direita
+    # (o servidor sempre espelha para esse lado) e mede RTT e snapshots
+    SEND_INTERVAL = 1 / 60
+    PING_INTERVAL = 1.0
+    def __init__(self, host, port, gamemode="Classic", seed=None):
+        self.host = host
+        self.port = port
+        self.gamemode = gamemode
+        self.rng = random.Random(seed)
+        self.snapshots = 0
+        self.events = 0
+        self.rtts = []
+        self.last = None  # snapshot mais recente
+        self.decoder = statesync.Decoder()
+        self.ack_tick = 0  # último estado decodificado, confirmado no cabeçalho das mensagens
+        self.connected = False
+    async def run(self, duration):
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError as e:
+            print("Bot não conectou:", e)
+            return
+        self.connected = True
+        receiving = asyncio.get_running_loop().create_task(self.receive(reader))
+        try:
+            await self.play(writer, duration)
+        except ConnectionError:
+            pass
+        finally:
+            receiving.cancel()
+            writer.close()
+    async def play(self, writer, duration):
+        messages = protocol.MessageWriter()
+        writer.write(messages.frame(protocol.JOIN, 0, protocol.pack_join(self.gamemode)))
+        seq = 0
+        start = time.perf_counter()
+        next_send = start
+        next_ping = start
+        sent_ticks = 0
+        while not writer.is_closing():
+            now = time.perf_counter()
+            if now - start >= duration:
+                writer.write(messages.frame(protocol.DISCONNECT, 0))
+                break
+            if self.last is not None:
+                # Comandos dos ticks que passaram desde o último envio
+                ticks = int((now - start) * TICK_RATE) - sent_ticks
+                sent_ticks += ticks
+                command = self.command()
+                if ticks > 0:
+                    writer.write(messages.frame(protocol.INPUT, self.ack_tick,
+                                                protocol.pack_inputs(seq + 1, [command] * ticks)))
+                    seq += ticks
+            else:
+                sent_ticks = int((now - start) * TICK_RATE)  # ainda no lobby
+            if now >= next_ping:
+                next_ping += self.PING_INTERVAL
+                writer.write(messages.frame(protocol.PING, self.ack_tick, protocol.pack_ping(now)))
+            next_send += self.SEND_INTERVAL
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+    def command(self):
+        snapshot = self.last
+        target = snapshot.ball[1] + self.rng.uniform(-30, 30)
+        center = snapshot.paddle_y[1] + 50
+        if abs(target - center) < 10:
+            return engine.IDLE
+        return InputCommand(1 if target > center else -1)
+    async def receive(self, reader):
+        frames = protocol.FrameReader()
+        while True:
+            data = await reader.read(4096)
+            if not data:
+                return
+            for message in frames.feed(data):
+                self.handle(message)
+    def handle(self, message):
+        if message.type == protocol.SNAPSHOT:
+            state = self.decoder.decode(message.tick, message.body)
+            if state is not None:
+                self.snapshots += 1
+                self.last = statesync.to_snapshot(state)
+                self.ack_tick = max(self.ack_tick, message.tick)
+        elif message.type == protocol.EVENT:
+            self.events += 1
+        elif message.type == protocol.PONG:
+            self.rtts.append(time.perf_counter() - message.body)
+
+class SpectatorBot(Bot):
+    # Assiste a uma sala: reconstrói o estado a partir de keyframes e deltas
+    def __init__(self, host, port, room_id=0):
+        super().__init__(host, port)
+        self.room_id = room_id
+        self.keyframes = 0
+        self.orphan_deltas = 0  # delta sem keyframe antes: não pode acontecer
+    async def play(self, writer, duration):
+        messages = protocol.MessageWriter()
+        writer.write(messages.frame(protocol.WATCH, 0, protocol.pack_watch(self.room_id)))
+        end = time.perf_counter() + duration
+        while not writer.is_closing() and time.perf_counter() < end:
+            writer.write(messages.frame(protocol.PING, 0, protocol.pack_ping(time.perf_counter())))
+            await asyncio.sleep(min(self.PING_INTERVAL, max(0.0, end - time.perf_counter())))
+        writer.write(messages.frame(protocol.DISCONNECT, 0))
+    def handle(self, message):
+        if message.type == protocol.SNAPSHOT:
+            self.keyframes += message.body[0] & 1
+            if self.decoder.decode(message.tick, message.body) is None:
+                self.orphan_deltas += 1
+            else:
+                self.snapshots += 1
+        else:
+            super().handle(message)
+
+async def run_bots(args):
+    server = None
+    host = args.target
+    if host is None:
+        server = await Server(args.port, args.metrics_interval).start()
+        host = "127.0.0.1"
+    gamemodes = args.gamemode or ["Classic"]
+    bots = [Bot(host, args.port, gamemodes[i % len(gamemodes)], seed=i) for i in range(args.bots)]
+    spectators = [SpectatorBot(host, args.port) for _ in range(args.spectators)]
+    tasks = [asyncio.get_running_loop().create_task(bot.run(args.duration)) for bot in spectators]
+    for bot in bots:
+        tasks.append(asyncio.get_running_loop().create_task(bot.run(args.duration)))
+        await asyncio.sleep(0.002)  # conexões escalonadas, como num evento de verdade
+    reporter = None
+    if server:
+        async def report():
+            while True:
+                await asyncio.sleep(args.metrics_interval)
+                server.print_metrics()
+        reporter = asyncio.get_running_loop().create_task(report())
+    await asyncio.gather(*tasks)
+    if reporter:
+        reporter.cancel()
+        server.print_metrics()
+        server.close()
+    rtts = sorted(rtt for bot in bots for rtt in bot.rtts)
+    connected = sum(bot.connected for bot in bots)
+    matched = sum(bot.snapshots > 0 for bot in bots)
+    snapshots = sum(bot.snapshots for bot in bots) / max(matched, 1) / args.duration
+    rtt = "%.1f ms" % (rtts[len(rtts) // 2] * 1000) if rtts else "-"
+    rtt99 = "%.1f ms" % (rtts[int(len(rtts) * 0.99)] * 1000) if rtts else "-"
+    print("bots %d  conectados %d  em sala %d  snapshots/s por bot %.1f  RTT mediano %s  p99 %s" % (
+        len(bots), connected, matched, snapshots, rtt, rtt99))
+    if spectators:
+        print("espectadores %d  quadros/s por espectador %.1f  keyframes %d  deltas sem base %d" % (
+            len(spectators), sum(bot.snapshots for bot in spectators) / len(spectators) / args.duration,
+            sum(bot.keyframes for bot in spectators), sum(bot.orphan_deltas for bot in spectators)))
+
+async def run_spectator_bench(args):
+    # Uma sala com dois bots; a cada etapa entram mais espectadores e medimos
+    # a CPU por tick do servidor (simulação + codificação + repasse)
+    server = await Server(args.port, args.metrics_interval).start()
+    loop = asyncio.get_running_loop()
+    counts = sorted(int(n) for n in args.spectator_bench.split(","))
+    total = len(counts) * (args.duration + 1) + 5
+    tasks = [loop.create_task(Bot("127.0.0.1", args.port, seed=i).run(total)) for i in range(2)]
+    spectators = []
+    await asyncio.sleep(1)
+    print("espectadores  us/tick  saída kB/s  quadros pulados  quadros/s por espectador")
+    for count in counts:
+        while len(spectators) < count:
+            bot = SpectatorBot("127.0.0.1", args.port)
+            spectators.append(bot)
+            tasks.append(loop.create_task(bot.run(total)))
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(1)  # os novos recebem o keyframe inicial
+        for bot in spectators:
+            bot.snapshots = 0
+        skipped = server.spectator_frames_skipped
+        server.metrics()
+        await asyncio.sleep(args.duration)
+        m = server.metrics()
+        rates = sorted(bot.snapshots / args.duration for bot in spectators)
+        print("%12d  %7.1f  %10.1f  %15d  %24.1f" % (
+            count, m["us_per_tick"], m["out_bytes_per_s"] / 1024, server.spectator_frames_skipped - skipped,
+            rates[len(rates) // 2] if rates else 0.0))
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    server.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pong 1972 - Ultimate: servidor dedicado")
+    parser.add_argument("--port", type=int, default=12345)
+    parser.add_argument("--metrics-interval", type=float, default=METRICS_INTERVAL,
+                        help="segundos entre as linhas de métricas")
+    parser.add_argument("--bots", type=int, default=0,
+                        help="roda N bots em loopback (com um servidor local, salvo com --target)")
+    parser.add_argument("--duration", type=float, default=20.0, help="bots: segundos de jogo de cada bot")
+    parser.add_argument("--target", default=None, help="bots: endereço de um servidor já rodando")
+    parser.add_argument("--gamemode", action="append", choices=protocol.GAMEMODES,
+                        help="bots: modo(s) de jogo da fila (repita para misturar)")
+    parser.add_argument("--spectators", type=int, default=0, help="bots: espectadores assistindo às salas")
+    parser.add_argument("--spectator-bench", default=None, metavar="N,N,...",
+                        help="mede a CPU por tick de uma sala com N espectadores (--duration s por etapa)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        if args.spectator_bench:
+            asyncio.run(run_spectator_bench(args))
+        elif args.bots:
+            asyncio.run(run_bots(args))
+        else:
+            asyncio.run(Server(args.port, args.metrics_interval).serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
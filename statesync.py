@@ -0,0 +1,224 @@
+# Estado completo da partida para o modo online: bola, raquetes (posição e
+# altura), placar, tempo, power-ups e obstáculos, quantizado em inteiros.
+# O host manda keyframes periódicos e, entre eles, deltas contra o último
+# estado que o cliente confirmou (o tick no cabeçalho das mensagens dele).
+#
+# Corpo do SNAPSHOT, em bits (little-endian, sem alinhamento):
+#   1 bit   keyframe
+#   delta:  var(tick - tick da base)
+#   campos  keyframe: var(zigzag(valor)); delta: 1 bit "mudou" + var(zigzag(diferença))
+#   listas  power-ups e obstáculos mudam a cada 10-15 s: no delta, 1 bit
+#           "mudou" e, se mudou, a lista inteira (quantidade + itens)
+# var(n) = 2 bits de classe + n em 4, 8, 16 ou 32 bits.
+from collections import namedtuple
+
+from engine import POWERUP_TYPES, TICK_RATE, PowerUp, Obstacle, Rect
+from protocol import ProtocolError, Snapshot
+
+# Campos escalares e a escala de quantização de cada um (valor * escala, arredondado)
+FIELDS = [
+    ("ball_x", 16), ("ball_y", 16),  # 1/16 px
+    ("ball_vx", 16), ("ball_vy", 16),  # 1/16 px/s
+    ("spin", 16), ("speed", 16),
+    ("left_y", 16), ("left_h", 1),
+    ("right_y", 16), ("right_h", 1),
+    ("score_left", 1), ("score_right", 1),
+    ("timer", 100),  # centésimos de segundo
+    ("paused", 1),
+    ("last_hitter", 1),  # 0 ninguém, 1 esquerda, 2 direita
+    ("ack", 1),  # sequência da última entrada do cliente aplicada pelo host
+]
+INDEX = {name: i for i, (name, _) in enumerate(FIELDS)}
+SCALES = [scale for _, scale in FIELDS]
+HITTERS = [None, "left", "right"]
+WIDTHS = (4, 8, 16, 32)
+KEYFRAME_INTERVAL = 2 * TICK_RATE  # ticks entre keyframes, mesmo com deltas chegando
+HISTORY = 128  # estados guardados de cada lado para servir de base
+
+# fields: tupla de inteiros na ordem de FIELDS; powerups: ((tipo, x, y, tamanho), ...)
+# dos ativos; obstacles: ((x, y, largura, altura), ...)
+State = namedtuple("State", ["tick", "fields", "powerups", "obstacles"])
+
+def capture(match, ack=0):
+    ball = match.ball
+    left, right = match.left_paddle.rect, match.right_paddle.rect
+    values = (ball.pos[0], ball.pos[1], ball.vel[0], ball.vel[1], ball.spin, ball.speed,
+              left.y, left.height, right.y, right.height, match.score_left, match.score_right,
+              match.game_timer, match.paused, HITTERS.index(match.last_hitter), ack)
+    fields = tuple(int(round(value * scale)) for value, scale in zip(values, SCALES))
+    powerups = tuple((POWERUP_TYPES.index(pu.type), round(pu.rect.x), round(pu.rect.y), round(pu.rect.width))
+                     for pu in match.powerups if pu.active)
+    obstacles = tuple(tuple(round(v) for v in obs.rect) for obs in match.obstacles)
+    return State(match.tick, fields, powerups, obstacles)
+
+def with_ack(state, ack):
+    fields = list(state.fields)
+    fields[INDEX["ack"]] = ack
+    return state._replace(fields=tuple(fields))
+
+def mirror(state, width):
+    # Estado visto do lado esquerdo (server.py): x espelhado e os lados trocados.
+    # O spin só mexe em vy, então não muda.
+    f = list(state.fields)
+    i = INDEX
+    f[i["ball_x"]] = width * SCALES[i["ball_x"]] - f[i["ball_x"]]
+    f[i["ball_vx"]] = -f[i["ball_vx"]]
+    f[i["left_y"]], f[i["right_y"]] = f[i["right_y"]], f[i["left_y"]]
+    f[i["left_h"]], f[i["right_h"]] = f[i["right_h"]], f[i["left_h"]]
+    f[i["score_left"]], f[i["score_right"]] = f[i["score_right"]], f[i["score_left"]]
+    f[i["last_hitter"]] = (0, 2, 1)[f[i["last_hitter"]]]
+    powerups = tuple((kind, width - x - size, y, size) for kind, x, y, size in state.powerups)
+    obstacles = tuple((width - x - w, y, w, h) for x, y, w, h in state.obstacles)
+    return State(state.tick, tuple(f), powerups, obstacles)
+
+def value(state, name):
+    return state.fields[INDEX[name]] / SCALES[INDEX[name]]
+
+def to_snapshot(state):
+    # Visão em floats que o cliente usa para reconciliar
+    v = lambda name: value(state, name)
+    return Snapshot((v("ball_x"), v("ball_y")), (v("ball_vx"), v("ball_vy")), v("spin"), v("speed"),
+                    (v("left_y"), v("right_y")), (state.fields[INDEX["score_left"]],
+                                                  state.fields[INDEX["score_right"]]),
+                    state.fields[INDEX["ack"]])
+
+def restore(match, state):
+    # Tudo do estado na partida local: bola, raquetes, placar, tempo e entidades
+    snapshot = to_snapshot(state)
+    ball = match.ball
+    ball.pos[:] = snapshot.ball
+    ball.vel[:] = snapshot.vel
+    ball.spin = snapshot.spin
+    ball.speed = snapshot.speed
+    match.left_paddle.rect.y, match.right_paddle.rect.y = snapshot.paddle_y
+    match.left_paddle.rect.height = state.fields[INDEX["left_h"]]
+    match.right_paddle.rect.height = state.fields[INDEX["right_h"]]
+    match.score_left, match.score_right = snapshot.score
+    match.game_timer = value(state, "timer")
+    match.paused = bool(state.fields[INDEX["paused"]])
+    match.last_hitter = HITTERS[state.fields[INDEX["last_hitter"]]]
+    # As listas só são refeitas quando mudam (raro), não a cada snapshot
+    current = capture(match)
+    if current.powerups != state.powerups:
+        match.powerups.replace([PowerUp(POWERUP_TYPES[kind], Rect(x, y, size, size))
+                                for kind, x, y, size in state.powerups], match.tick)
+    if current.obstacles != state.obstacles:
+        match.obstacles.replace([Obstacle(Rect(*rect)) for rect in state.obstacles], match.tick)
+
+def zigzag(n):
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+def unzigzag(n):
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+class BitWriter:
+    def __init__(self):
+        self.value = 0
+        self.bits = 0
+    def write(self, value, bits):
+        self.value |= value << self.bits
+        self.bits += bits
+    def write_var(self, n):
+        for size, width in enumerate(WIDTHS):
+            if n < 1 << width:
+                self.write(size, 2)
+                self.write(n, width)
+                return
+        raise ValueError("valor grande demais para o snapshot: %d" % n)
+    def write_items(self, items):
+        self.write_var(len(items))
+        for item in items:
+            for n in item:
+                self.write_var(zigzag(n))
+    def getvalue(self):
+        return self.value.to_bytes((self.bits + 7) // 8, "little")
+
+class BitReader:
+    def __init__(self, data):
+        self.value = int.from_bytes(data, "little")
+        self.size = len(data) * 8
+        self.pos = 0
+    def read(self, bits):
+        if self.pos + bits > self.size:
+            raise ProtocolError("snapshot truncado")
+        n = (self.value >> self.pos) & ((1 << bits) - 1)
+        self.pos += bits
+        return n
+    def read_var(self):
+        return self.read(WIDTHS[self.read(2)])
+    def read_items(self, length):
+        return tuple(tuple(unzigzag(self.read_var()) for _ in range(length)) for _ in range(self.read_var()))
+
+def encode(state, base=None):
+    # Corpo do SNAPSHOT: keyframe sem base, delta contra 'base'
+    out = BitWriter()
+    out.write(base is None, 1)
+    if base is None:
+        for n in state.fields:
+            out.write_var(zigzag(n))
+        out.write_items(state.powerups)
+        out.write_items(state.obstacles)
+        return out.getvalue()
+    out.write_var(state.tick - base.tick)
+    for n, old in zip(state.fields, base.fields):
+        out.write(n != old, 1)
+        if n != old:
+            out.write_var(zigzag(n - old))
+    for items, old in ((state.powerups, base.powerups), (state.obstacles, base.obstacles)):
+        out.write(items != old, 1)
+        if items != old:
+            out.write_items(items)
+    return out.getvalue()
+
+class Encoder:
+    # Um por destinatário: guarda os estados enviados para achar a base do
+    # próximo delta pelo tick que o outro lado confirmou
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.history = {}
+        self.last_keyframe = None
+        self.keyframes = 0
+        self.deltas = 0
+    def encode(self, state, ack_tick=None):
+        # Devolve (corpo, é keyframe). Sem base confirmada (ou na hora do
+        # keyframe periódico) vai o estado inteiro.
+        base = self.history.get(ack_tick) if ack_tick else None  # tick 0: nada confirmado ainda
+        if self.last_keyframe is None or state.tick - self.last_keyframe >= self.keyframe_interval:
+            base = None
+        if base is None:
+            self.last_keyframe = state.tick
+            self.keyframes += 1
+        else:
+            self.deltas += 1
+        self.history[state.tick] = state
+        if len(self.history) > HISTORY:
+            del self.history[min(self.history)]
+        return encode(state, base), base is None
+
+class Decoder:
+    # Lado que recebe: remonta o estado a partir do keyframe ou da base já
+    # recebida. Sem a base (perdida ou velha demais) o snapshot é descartado.
+    def __init__(self):
+        self.history = {}
+        self.latest = None
+        self.missing_base = 0
+    def decode(self, tick, body):
+        data = BitReader(body)
+        if data.read(1):
+            fields = tuple(unzigzag(data.read_var()) for _ in FIELDS)
+            state = State(tick, fields, data.read_items(4), data.read_items(4))
+        else:
+            base = self.history.get(tick - data.read_var())
+            if base is None:
+                self.missing_base += 1
+                return None
+            fields = tuple(old + unzigzag(data.read_var()) if data.read(1) else old for old in base.fields)
+            powerups = data.read_items(4) if data.read(1) else base.powerups
+            obstacles = data.read_items(4) if data.read(1) else base.obstacles
+            state = State(tick, fields, powerups, obstacles)
+        self.history[tick] = state
+        if len(self.history) > HISTORY:
+            del self.history[min(self.history)]
+        if self.latest is None or tick >= self.latest.tick:
+            self.latest = state
+        return state
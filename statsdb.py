@@ -0,0 +1,260 @@
+# Estatísticas persistentes em SQLite (modo WAL): partidas, pontos de cada
+# partida e o melhor placar por modo de jogo e dificuldade. O loop do jogo só
+# enfileira; uma thread escreve em lote, numa transação a cada FLUSH_INTERVAL
+# ou BATCH itens. As leituras usam outra conexão (o WAL deixa ler enquanto a
+# thread escreve) e o top N da tela de estatísticas fica em cache até a
+# próxima escrita.
+#   python statsdb.py --import rankings.txt
+#   python statsdb.py --top Classic Medium
+#   python statsdb.py --db /tmp/teste.db --populate 1000000   (mede as consultas)
+import argparse
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+
+STATS_FILE = "stats.db"
+RANKINGS_FILE = "rankings.txt"
+BATCH = 500
+FLUSH_INTERVAL = 0.5  # s que a thread espera juntando itens antes de gravar
+TOP_N = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,            -- time.time() do fim da partida
+    mode TEXT NOT NULL,                 -- single, multiplayer ou online
+    gamemode TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    score INTEGER NOT NULL,             -- placar da esquerda (o jogador no singleplayer)
+    opponent_score INTEGER NOT NULL,
+    duration REAL NOT NULL,             -- segundos de simulação
+    seed INTEGER
+);
+CREATE TABLE IF NOT EXISTS points (
+    match_id INTEGER NOT NULL REFERENCES matches(id),
+    tick INTEGER NOT NULL,
+    side INTEGER NOT NULL               -- 0 esquerda, 1 direita
+);
+CREATE TABLE IF NOT EXISTS bests (
+    gamemode TEXT NOT NULL,
+    difficulty TEXT NOT NULL,           -- '' para recordes importados do rankings.txt
+    score INTEGER NOT NULL,
+    match_id INTEGER,
+    achieved_at REAL NOT NULL,
+    PRIMARY KEY (gamemode, difficulty)
+);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    games INTEGER NOT NULL,
+    left_points INTEGER NOT NULL,
+    right_points INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+INSERT OR IGNORE INTO totals VALUES (1, 0, 0, 0);
+-- Ranking de um modo/dificuldade: melhores placares (ORDER BY score DESC LIMIT N sem ordenar)
+CREATE INDEX IF NOT EXISTS matches_board ON matches (gamemode, difficulty, score DESC, played_at);
+-- Ranking de um período (ex.: da semana) e histórico por data
+CREATE INDEX IF NOT EXISTS matches_recent ON matches (gamemode, difficulty, played_at);
+CREATE INDEX IF NOT EXISTS matches_date ON matches (played_at);
+CREATE INDEX IF NOT EXISTS points_match ON points (match_id);
+"""
+
+INSERT_MATCH = ("INSERT INTO matches (played_at, mode, gamemode, difficulty, score, opponent_score, duration, seed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+UPSERT_BEST = ("INSERT INTO bests VALUES (?, ?, ?, ?, ?) ON CONFLICT (gamemode, difficulty) DO UPDATE SET "
+               "score = excluded.score, match_id = excluded.match_id, achieved_at = excluded.achieved_at "
+               "WHERE excluded.score > bests.score")
+
+def connect(path):
+    db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")  # no WAL, só o checkpoint espera o disco
+    return db
+
+class StatsStore:
+    def __init__(self, path=STATS_FILE):
+        self.path = path
+        writer = connect(path)
+        writer.executescript(SCHEMA)
+        writer.commit()
+        self.reader = connect(path)  # só o loop principal usa
+        self.queue = queue.Queue()
+        self.version = 0  # muda a cada lote gravado; invalida o cache
+        self.cache = {}  # consulta -> (versão, linhas)
+        self.batches = 0
+        self.errors = 0
+        self.totals = dict(zip(("games", "left_points", "right_points"),
+                               writer.execute("SELECT games, left_points, right_points FROM totals").fetchone()))
+        self.thread = threading.Thread(target=self.write_loop, args=(writer,), daemon=True)
+        self.thread.start()
+    # --- Escrita (thread própria) ---
+    def record_match(self, mode, gamemode, difficulty, score, opponent_score, duration, seed=None, points=(),
+                     played_at=None):
+        # Chamado pelo jogo no fim da partida: só enfileira. Os totais em memória
+        # mudam na hora, para a tela de estatísticas não esperar o lote.
+        played_at = time.time() if played_at is None else played_at
+        self.totals["games"] += 1
+        self.totals["left_points"] += score
+        self.totals["right_points"] += opponent_score
+        self.queue.put(("match", (played_at, mode, gamemode, difficulty, score, opponent_score, duration, seed),
+                        tuple(points)))
+    def write_loop(self, db):
+        while True:
+            items = [self.queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(items) < BATCH and items[-1] is not None:
+                try:
+                    items.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            closing = items[-1] is None
+            try:
+                with db:  # uma transação por lote
+                    for item in items:
+                        if item is not None:
+                            self.write(db, item)
+                self.version += 1
+                self.batches += 1
+            except sqlite3.Error as e:
+                self.errors += 1
+                print("Erro ao gravar estatísticas:", e)
+            for _ in items:
+                self.queue.task_done()
+            if closing:
+                db.close()
+                return
+    def write(self, db, item):
+        kind, row, extra = item
+        if kind == "match":
+            played_at, _, gamemode, difficulty, score, opponent_score, _, _ = row
+            match_id = db.execute(INSERT_MATCH, row).lastrowid
+            if extra:
+                db.executemany("INSERT INTO points VALUES (?, ?, ?)",
+                               [(match_id, tick, side) for tick, side in extra])
+            db.execute(UPSERT_BEST, (gamemode, difficulty, score, match_id, played_at))
+            db.execute("UPDATE totals SET games = games + 1, left_points = left_points + ?, "
+                       "right_points = right_points + ?", (score, opponent_score))
+        elif kind == "matches":
+            # Carga em massa (populate): linhas já prontas, sem pontos
+            db.executemany(INSERT_MATCH, row)
+            # Recordes só a partir das linhas do lote, sem varrer a tabela. Um único
+            # escritor: os ids do executemany são seguidos e terminam no maior id
+            first_id = db.execute("SELECT MAX(id) FROM matches").fetchone()[0] - len(row) + 1
+            batch_bests = {}
+            for match_id, (played_at, _, gamemode, difficulty, score, _, _, _) in enumerate(row, first_id):
+                best = batch_bests.get((gamemode, difficulty))
+                if best is None or score > best[2]:
+                    batch_bests[gamemode, difficulty] = (gamemode, difficulty, score, match_id, played_at)
+            db.executemany(UPSERT_BEST, batch_bests.values())
+            db.execute("UPDATE totals SET games = games + ?, left_points = left_points + ?, "
+                       "right_points = right_points + ?", extra)
+        elif kind == "best":
+            db.execute(UPSERT_BEST, row)
+        elif kind == "import":
+            db.execute("INSERT OR REPLACE INTO imports VALUES (?, ?)", row)
+    def flush(self):
+        # Espera a fila esvaziar (ex.: antes de abrir a tela de estatísticas)
+        self.queue.join()
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.reader.close()
+    # --- rankings.txt ---
+    def import_rankings(self, path=RANKINGS_FILE):
+        # Recordes antigos ("modo:pontos" por linha) viram bests sem dificuldade.
+        # Cada versão do arquivo (pelo mtime) só é importada uma vez.
+        if not os.path.exists(path):
+            return 0
+        key, mtime = os.path.abspath(path), os.path.getmtime(path)
+        seen = self.reader.execute("SELECT mtime FROM imports WHERE path = ?", (key,)).fetchone()
+        if seen and seen[0] >= mtime:
+            return 0
+        count = 0
+        with open(path, "r") as f:
+            for line in f.read().splitlines():
+                parts = line.split(":")
+                if len(parts) == 2 and parts[1].strip().lstrip("-").isdigit():
+                    self.queue.put(("best", (parts[0], "", int(parts[1]), None, mtime), None))
+                    count += 1
+        self.queue.put(("import", (key, mtime), None))
+        return count
+    # --- Leitura (loop principal) ---
+    def cached(self, key, sql, args):
+        version = self.version
+        hit = self.cache.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        rows = self.reader.execute(sql, args).fetchall()
+        self.cache[key] = (version, rows)
+        return rows
+    def leaderboard(self, gamemode, difficulty, n=TOP_N, since=None):
+        # (placar, placar do adversário, data) dos n melhores; 'since' limita ao período
+        if since is None:
+            return self.cached(("top", gamemode, difficulty, n), (
+                "SELECT score, opponent_score, played_at FROM matches WHERE gamemode = ? AND difficulty = ? "
+                "ORDER BY score DESC, played_at LIMIT ?"), (gamemode, difficulty, n))
+        return self.cached(("top", gamemode, difficulty, n, since), (
+            "SELECT score, opponent_score, played_at FROM matches WHERE gamemode = ? AND difficulty = ? "
+            "AND played_at >= ? ORDER BY score DESC, played_at LIMIT ?"), (gamemode, difficulty, since, n))
+    def bests(self):
+        # Melhor placar de cada modo de jogo, em qualquer dificuldade
+        return self.cached(("bests",), "SELECT gamemode, MAX(score) FROM bests GROUP BY gamemode ORDER BY gamemode", ())
+    def history(self, limit=20):
+        return self.cached(("history", limit), (
+            "SELECT played_at, mode, gamemode, difficulty, score, opponent_score FROM matches "
+            "ORDER BY played_at DESC LIMIT ?"), (limit,))
+    def populate(self, count, seed=0, batch=100000):
+        # Partidas sintéticas para medir as consultas com a tabela cheia
+        rng = random.Random(seed)
+        gamemodes = ["Classic", "Time Attack", "Survival", "Tournament"]
+        difficulties = ["Easy", "Medium", "Hard"]
+        start = time.time() - 365 * 86400
+        for first in range(0, count, batch):
+            rows = [(start + rng.random() * 365 * 86400, "single", rng.choice(gamemodes), rng.choice(difficulties),
+                     rng.randint(0, 20), rng.randint(0, 20), rng.uniform(30, 600), None)
+                    for _ in range(min(batch, count - first))]
+            extra = (len(rows), sum(r[4] for r in rows), sum(r[5] for r in rows))
+            self.queue.put(("matches", rows, extra))
+            for key, value in zip(("games", "left_points", "right_points"), extra):
+                self.totals[key] += value
+        self.flush()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pong 1972 - Ultimate: estatísticas em SQLite")
+    parser.add_argument("--db", default=STATS_FILE)
+    parser.add_argument("--import", dest="import_path", help="importa um rankings.txt")
+    parser.add_argument("--top", nargs=2, metavar=("MODO", "DIFICULDADE"))
+    parser.add_argument("--populate", type=int, help="grava N partidas sintéticas e mede as consultas")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = StatsStore(args.db)
+    if args.import_path:
+        print("Recordes importados:", store.import_rankings(args.import_path))
+        store.flush()
+    if args.populate:
+        start = time.perf_counter()
+        store.populate(args.populate)
+        print("%d partidas gravadas em %.1f s" % (args.populate, time.perf_counter() - start))
+        for label, query in (("top 5", lambda: store.leaderboard("Classic", "Medium")),
+                             ("top 5 do mês", lambda: store.leaderboard("Classic", "Medium",
+                                                                        since=time.time() - 30 * 86400)),
+                             ("recordes", store.bests), ("histórico", store.history)):
+            start = time.perf_counter()
+            query()
+            store.version += 1  # mede a consulta, não o cache
+            print("%-13s %.2f ms" % (label, (time.perf_counter() - start) * 1000))
+    if args.top:
+        for score, opponent_score, played_at in store.leaderboard(*args.top, n=10):
+            print("%3d x %-3d %s" % (score, opponent_score, time.strftime("%Y-%m-%d %H:%M", time.localtime(played_at))))
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# Os testes rodam sem janela nem som, com os módulos da raiz do repositório no path
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,21 @@
+import engine
+from batch import max_divergence
+
+TOLERANCE = 1e-9
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+def matches(ai, count=12, gamemode="Classic"):
+    return [engine.Match("single", DIFFICULTIES[seed % 3], gamemode, seed=seed, ai=ai) for seed in range(count)]
+
+def test_predictive_ai_matches_scalar_engine():
+    assert max_divergence(matches("predictive"), 2400) < TOLERANCE
+
+def test_adaptive_ai_matches_scalar_engine():
+    assert max_divergence(matches("adaptive"), 2400) < TOLERANCE
+    assert max_divergence(matches("adaptive", gamemode="Survival"), 2400) < TOLERANCE
+
+def test_max_divergence_leaves_callers_matches_alone():
+    played = matches("predictive", count=3)
+    before = [(m.checksum(), m.controllers["right"].noise) for m in played]
+    max_divergence(played, 600)
+    assert [(m.checksum(), m.controllers["right"].noise) for m in played] == before
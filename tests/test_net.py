@@ -0,0 +1,38 @@
+import socket
+
+import net
+import protocol
+
+def connected_pair():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    client = socket.create_connection(server.getsockname())
+    peer, _ = server.accept()
+    server.close()
+    return client, peer
+
+def test_poll_does_not_shorten_the_send_timeout():
+    client, peer = connected_pair()
+    transport = net.TcpTransport(client)
+    assert transport.poll(0.001) == []
+    assert client.gettimeout() == net.TIMEOUT
+    peer.sendall(protocol.pack(protocol.PING, 1, 3, protocol.pack_ping(1.0)))
+    assert [m.type for m in transport.poll(1.0)] == [protocol.PING]
+    transport.close()
+    peer.close()
+
+def test_stalled_peer_is_a_disconnect(monkeypatch):
+    # O outro lado não lê: o buffer enche e o sendall estoura o timeout
+    monkeypatch.setattr(net, "TIMEOUT", 0.2)
+    client, peer = connected_pair()
+    transport = net.TcpTransport(client)
+    body = bytes(60000)
+    for _ in range(1000):
+        transport.queue.append(protocol.pack(protocol.SNAPSHOT, 1, 0, body))
+        transport.flush()
+        if not transport.connected:
+            break
+    assert not transport.connected
+    transport.close()
+    peer.close()
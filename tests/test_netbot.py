@@ -0,0 +1,14 @@
+import pytest
+
+import netbot
+import netem
+import pong
+
+@pytest.fixture(scope="module", autouse=True)
+def display():
+    pong.init_display()
+
+@pytest.mark.parametrize("transport, port", [("tcp", 23610), ("udp", 23620)])
+def test_input_reaches_host_within_a_tick_on_ideal(transport, port):
+    result = netbot.run("ideal", netem.PRESETS["ideal"], transport, duration=3.0, port=port)
+    assert netbot.check(result) == []
@@ -0,0 +1,34 @@
+import threading
+
+from netcode import RateCounter
+
+def test_rate_counter_counts_every_add_across_threads():
+    counter = RateCounter(window=0.0)
+    adds = 50000
+    done = threading.Event()
+    def network():
+        for _ in range(adds):
+            counter.add()
+    def main_loop():
+        now = 0.0
+        while not done.is_set():
+            now += 1.0
+            counter.update(now)
+    threads = [threading.Thread(target=network) for _ in range(4)]
+    reader = threading.Thread(target=main_loop)
+    reader.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    reader.join()
+    assert counter.total == 4 * adds
+
+def test_rate_over_the_last_full_window():
+    counter = RateCounter(window=1.0)
+    counter.update(0.0)
+    counter.add(30)
+    assert counter.update(0.5) == 0.0
+    counter.add(30)
+    assert counter.update(1.0) == 60.0
@@ -0,0 +1,56 @@
+import os
+import socket
+import time
+
+import pytest
+
+import pong
+import protocol
+
+def bad_version():
+    return protocol.HEADER.pack(protocol.VERSION + 1, protocol.PING, 1, 0, 0)
+
+def test_frames_split_across_reads():
+    data = protocol.pack(protocol.PING, 1, 7, protocol.pack_ping(1.5)) + protocol.pack(protocol.PONG, 2, 8,
+                                                                                    protocol.pack_ping(2.5))
+    reader = protocol.FrameReader()
+    assert reader.feed(data[:5]) == []
+    messages = reader.feed(data[5:])
+    assert [(m.type, m.tick, m.body) for m in messages] == [(protocol.PING, 7, 1.5), (protocol.PONG, 8, 2.5)]
+    assert not reader.buffer
+
+@pytest.mark.parametrize("frame", [bad_version(), protocol.HEADER.pack(protocol.VERSION, protocol.PING, 1, 0, 1) + b"x",
+                                   protocol.HEADER.pack(protocol.VERSION, 200, 1, 0, 0)])
+def test_bad_frame_drops_the_stream(frame):
+    reader = protocol.FrameReader()
+    with pytest.raises(protocol.ProtocolError):
+        reader.feed(frame + protocol.pack(protocol.PING, 2, 0, protocol.pack_ping(1.0)))
+    assert not reader.buffer
+    # O resto da conexão é recusado, em vez de reler o mesmo quadro para sempre
+    with pytest.raises(protocol.ProtocolError):
+        reader.feed(protocol.pack(protocol.PING, 3, 0, protocol.pack_ping(1.0)))
+
+def test_host_ends_session_on_bad_frame(tmp_path):
+    pong.init_display()
+    pong.replay_recorder.path = os.path.join(tmp_path, "replay.rpl")
+    port = 23640
+    host = pong.OnlineGame(True, "", port, "Medium", "Classic", "Classic")
+    try:
+        deadline = time.perf_counter() + 5
+        while True:
+            try:
+                client = socket.create_connection(("127.0.0.1", port), timeout=1)
+                break
+            except ConnectionRefusedError:
+                assert time.perf_counter() < deadline
+                time.sleep(0.05)
+        client.sendall(bad_version())
+        host.network_thread.join(5)
+        assert not host.network_thread.is_alive()
+        assert host.paused
+        client.settimeout(5)
+        while client.recv(4096):
+            pass  # o host fechou a conexão: recv chega ao EOF
+        client.close()
+    finally:
+        host.stop_network()
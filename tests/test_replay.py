@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+import pong
+
+@pytest.fixture
+def replay_path(tmp_path):
+    pong.init_display()
+    path = os.path.join(tmp_path, "replay.rpl")
+    pong.replay_recorder.path = path
+    game = pong.Game("single", "Medium", "Classic", "Classic", seed=5)
+    for _ in range(120):
+        game.tick()
+    pong.replay_recorder.stop()
+    yield path
+    pong.replay_recorder.stop()
+
+def test_online_client_and_spectator_keep_the_replay(replay_path):
+    with open(replay_path, "rb") as f:
+        recorded = f.read()
+    # Ninguém escuta na porta: as threads de rede só falham ao conectar
+    for scene in (pong.OnlineGame(False, "127.0.0.1", 23650, "Medium", "Classic", "Classic"),
+                  pong.SpectatorGame("127.0.0.1", 23651, "Classic")):
+        assert not scene.recording
+        scene.stop_network()
+    with open(replay_path, "rb") as f:
+        assert f.read() == recorded
+
+@pytest.mark.parametrize("cut", [0, 3, 20, 60])
+def test_viewer_shows_no_replay_for_truncated_file(replay_path, cut):
+    with open(replay_path, "rb") as f:
+        data = f.read()
+    with open(replay_path, "wb") as f:
+        f.write(data[:cut])
+    viewer = pong.ReplayViewer(replay_path, pong.themes["Classic"])
+    assert viewer.player is None
+    viewer.draw(pong.screen)
+    viewer.close()
+
+def test_viewer_shows_no_replay_for_foreign_file(replay_path):
+    with open(replay_path, "wb") as f:
+        f.write(b"rank:12\n" * 40)
+    viewer = pong.ReplayViewer(replay_path, pong.themes["Classic"])
+    assert viewer.player is None
+
+def test_viewer_plays_recorded_file(replay_path):
+    viewer = pong.ReplayViewer(replay_path, pong.themes["Classic"])
+    assert viewer.player is not None
+    viewer.update(0.5)
+    viewer.draw(pong.screen)
+    viewer.close()
@@ -0,0 +1,19 @@
+import os
+
+from statsdb import StatsStore
+
+def test_populate_keeps_totals_and_bests_consistent(tmp_path):
+    store = StatsStore(os.path.join(tmp_path, "stats.db"))
+    store.record_match("single", "Classic", "Medium", 25, 3, 60.0)
+    store.populate(2500, batch=1000)
+    db = store.reader
+    games, left, right = db.execute("SELECT COUNT(*), SUM(score), SUM(opponent_score) FROM matches").fetchone()
+    assert store.totals == {"games": games, "left_points": left, "right_points": right}
+    assert db.execute("SELECT games, left_points, right_points FROM totals").fetchone() == (games, left, right)
+    for gamemode, difficulty, score, match_id, achieved_at in db.execute("SELECT * FROM bests").fetchall():
+        assert db.execute("SELECT gamemode, difficulty, score, played_at FROM matches WHERE id = ?",
+                          (match_id,)).fetchone() == (gamemode, difficulty, score, achieved_at)
+        assert score == db.execute("SELECT MAX(score) FROM matches WHERE gamemode = ? AND difficulty = ?",
+                                   (gamemode, difficulty)).fetchone()[0]
+    assert db.execute("SELECT score FROM bests WHERE gamemode = 'Classic' AND difficulty = 'Medium'").fetchone() == (25,)
+    store.close()